@@ -0,0 +1,40 @@
+"""add (chat_id, timestamp, id) index on messages
+
+Revision ID: 0a97dd2ec253
+Revises: 3b7c1e9a4f20
+Create Date: 2026-10-18 15:31:07.218934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a97dd2ec253'
+down_revision: Union[str, None] = '3b7c1e9a4f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Serves history reads, latest-N windows and cursor pages in index order.
+    # Built CONCURRENTLY so messages stay writable; that needs autocommit.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_chat_id_timestamp_id',
+            'messages',
+            ['chat_id', 'timestamp', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_messages_chat_id_timestamp_id', table_name='messages', postgresql_concurrently=True
+        )
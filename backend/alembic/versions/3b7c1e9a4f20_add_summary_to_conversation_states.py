@@ -0,0 +1,30 @@
+"""add summary to conversation_states
+
+Revision ID: 3b7c1e9a4f20
+Revises: 8dfaff079983
+Create Date: 2026-10-18 10:12:41.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7c1e9a4f20'
+down_revision: Union[str, None] = '8dfaff079983'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('conversation_states', sa.Column('summary', sa.Text(), nullable=True))
+    op.add_column('conversation_states', sa.Column('summary_upto_id', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('conversation_states', 'summary_upto_id')
+    op.drop_column('conversation_states', 'summary')
@@ -0,0 +1,49 @@
+"""add conversation_states.version and messages.idempotency_key
+
+Revision ID: 5f2c8a71d0b4
+Revises: d41f6a2b9c73
+Create Date: 2026-10-18 18:05:41.332019
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2c8a71d0b4'
+down_revision: Union[str, None] = 'd41f6a2b9c73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Constant default / nullable column: both are metadata-only changes.
+    op.add_column(
+        'conversation_states',
+        sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+    )
+    op.add_column('messages', sa.Column('idempotency_key', sa.String(), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_messages_chat_id_idempotency_key',
+            'messages',
+            ['chat_id', 'idempotency_key'],
+            unique=True,
+            postgresql_where=sa.text('idempotency_key IS NOT NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'uq_messages_chat_id_idempotency_key',
+            table_name='messages',
+            postgresql_concurrently=True,
+        )
+    op.drop_column('messages', 'idempotency_key')
+    op.drop_column('conversation_states', 'version')
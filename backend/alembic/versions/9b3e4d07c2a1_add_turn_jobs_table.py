@@ -0,0 +1,64 @@
+"""add turn_jobs table
+
+Revision ID: 9b3e4d07c2a1
+Revises: 5f2c8a71d0b4
+Create Date: 2026-10-18 19:12:08.554173
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b3e4d07c2a1'
+down_revision: Union[str, None] = '5f2c8a71d0b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'turn_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('chat_id', sa.Integer(), nullable=False),
+        sa.Column('message_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('run_after', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('reply_id', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['chat_id'], ['chats.id'], ),
+        sa.ForeignKeyConstraint(['message_id'], ['messages.id'], ),
+        sa.ForeignKeyConstraint(['reply_id'], ['messages.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('message_id'),
+    )
+    op.create_index('ix_turn_jobs_chat_id_status', 'turn_jobs', ['chat_id', 'status'], unique=False)
+    op.create_index(
+        'ix_turn_jobs_queued_run_after',
+        'turn_jobs',
+        ['run_after', 'id'],
+        unique=False,
+        postgresql_where=sa.text("status = 'queued'"),
+    )
+    op.create_index(
+        'ix_turn_jobs_running_started_at',
+        'turn_jobs',
+        ['started_at'],
+        unique=False,
+        postgresql_where=sa.text("status = 'running'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_turn_jobs_running_started_at', table_name='turn_jobs')
+    op.drop_index('ix_turn_jobs_queued_run_after', table_name='turn_jobs')
+    op.drop_index('ix_turn_jobs_chat_id_status', table_name='turn_jobs')
+    op.drop_table('turn_jobs')
@@ -0,0 +1,62 @@
+"""tune chat indexes: drop redundant ones, index state and slot
+
+Revision ID: d41f6a2b9c73
+Revises: 0a97dd2ec253
+Create Date: 2026-10-18 15:40:12.907311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41f6a2b9c73'
+down_revision: Union[str, None] = '0a97dd2ec253'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built CONCURRENTLY so large tables stay writable; that needs autocommit.
+    with op.get_context().autocommit_block():
+        # Duplicates of the primary keys.
+        op.drop_index('ix_chats_id', table_name='chats', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_messages_id', table_name='messages', postgresql_concurrently=True, if_exists=True)
+        op.drop_index(
+            'ix_conversation_states_chat_id',
+            table_name='conversation_states',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        # Leading column of ix_messages_chat_id_timestamp_id.
+        op.drop_index('ix_messages_chat_id', table_name='messages', postgresql_concurrently=True, if_exists=True)
+
+        op.create_index(
+            'ix_conversation_states_state_name',
+            'conversation_states',
+            ['state_name'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_conversation_states_selected_slot',
+            'conversation_states',
+            ['selected_slot'],
+            unique=False,
+            postgresql_where=sa.text('selected_slot IS NOT NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_conversation_states_selected_slot', table_name='conversation_states', postgresql_concurrently=True)
+        op.drop_index('ix_conversation_states_state_name', table_name='conversation_states', postgresql_concurrently=True)
+        op.create_index('ix_messages_chat_id', 'messages', ['chat_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_conversation_states_chat_id', 'conversation_states', ['chat_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_messages_id', 'messages', ['id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_chats_id', 'chats', ['id'], unique=False, postgresql_concurrently=True)
@@ -0,0 +1,120 @@
+# backend/app/agents/admission.py
+"""
+Admission control in front of the agent runner.
+
+Every agent run holds one slot of its model's limit and one of the global
+limit (LLM_MAX_CONCURRENCY / LLM_MODEL_CONCURRENCY, per worker process).
+When no slot is free the turn waits in a bounded queue:
+
+  * queue already full            → OverloadedError 429, right away
+  * no slot within the timeout    → OverloadedError 503
+
+Both carry a Retry-After estimate from the queue depth and how long runs
+have recently held their slot. Fast-path and cached turns never get here.
+"""
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+
+from app.agents.config import (
+    LLM_MAX_CONCURRENCY,
+    LLM_MODEL_CONCURRENCY,
+    LLM_QUEUE_SIZE,
+    LLM_QUEUE_TIMEOUT,
+)
+from app.metrics import LLM_IN_FLIGHT, LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT_SECONDS, LLM_REJECTED
+
+
+class OverloadedError(Exception):
+    """No LLM capacity for this turn; status_code is 429 or 503."""
+
+    def __init__(self, model: str, reason: str, status_code: int, retry_after: int):
+        super().__init__(f"LLM capacity exhausted for {model} ({reason}); retry in {retry_after}s")
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_concurrency: int,
+        model_limits: dict[str, int],
+        queue_size: int,
+        queue_timeout: float,
+    ):
+        self.max_concurrency = max_concurrency
+        self.model_limits = {m: n for m, n in model_limits.items() if n > 0}
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._global = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self._models = {m: asyncio.Semaphore(n) for m, n in self.model_limits.items()}
+        self.waiting = 0
+        self._hold_seconds = 1.0    # moving average of how long a run holds its slot
+
+    def _gates(self, model: str) -> list[asyncio.Semaphore]:
+        # Always model first, then global, so waiters never deadlock.
+        return [g for g in (self._models.get(model), self._global) if g is not None]
+
+    def retry_after(self, model: str) -> int:
+        limit = self.model_limits.get(model) or self.max_concurrency or 1
+        return max(1, math.ceil(self._hold_seconds * (self.waiting + 1) / limit))
+
+    def _reject(self, model: str, reason: str, status_code: int) -> OverloadedError:
+        LLM_REJECTED.labels(model, reason).inc()
+        return OverloadedError(model, reason, status_code, self.retry_after(model))
+
+    def check(self, model: str) -> None:
+        """Raise OverloadedError (429) if a turn for `model` would be queued on a full queue."""
+        gates = self._gates(model)
+        if any(g.locked() for g in gates) and self.waiting >= self.queue_size:
+            raise self._reject(model, "queue_full", 429)
+
+    @asynccontextmanager
+    async def slot(self, model: str):
+        """Hold one LLM slot for `model` for the duration of the block."""
+        gates = self._gates(model)
+        acquired: list[asyncio.Semaphore] = []
+        if any(g.locked() for g in gates):
+            self.check(model)
+            self.waiting += 1
+            LLM_QUEUE_DEPTH.labels(model).inc()
+            started = time.perf_counter()
+            try:
+                async with asyncio.timeout(self.queue_timeout):
+                    for gate in gates:
+                        await gate.acquire()
+                        acquired.append(gate)
+            except BaseException as exc:
+                # Timed out or cancelled while queued: give back partial slots.
+                for gate in acquired:
+                    gate.release()
+                if isinstance(exc, TimeoutError):
+                    raise self._reject(model, "timeout", 503) from None
+                raise
+            finally:
+                self.waiting -= 1
+                LLM_QUEUE_DEPTH.labels(model).dec()
+                LLM_QUEUE_WAIT_SECONDS.labels(model).observe(time.perf_counter() - started)
+        else:
+            # Free slots: Semaphore.acquire() returns without suspending.
+            for gate in gates:
+                await gate.acquire()
+                acquired.append(gate)
+
+        LLM_IN_FLIGHT.labels(model).inc()
+        held = time.perf_counter()
+        try:
+            yield
+        finally:
+            for gate in acquired:
+                gate.release()
+            LLM_IN_FLIGHT.labels(model).dec()
+            self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * (time.perf_counter() - held)
+
+
+ADMISSION = AdmissionController(
+    LLM_MAX_CONCURRENCY, LLM_MODEL_CONCURRENCY, LLM_QUEUE_SIZE, LLM_QUEUE_TIMEOUT
+)
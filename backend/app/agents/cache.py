@@ -0,0 +1,151 @@
+# backend/app/agents/cache.py
+"""
+Optional response cache for identical agent runs.
+
+Keyed by FSM state, the normalised user utterance and the payload fields the
+state's reply depends on. Only runs whose tool arguments carry no text are
+stored: text arguments copy the user's own wording (e.g. a name), which the
+normalised key does not tell apart. A hit replays the recorded tool calls
+through the FSM (plus the pass-through step a templated reply takes) and
+returns the recorded reply, skipping Runner.run entirely. A replay that does
+not end in the recorded state is undone and counted as a miss. Entries
+expire after a TTL and the cache is LRU-bounded.
+
+On /metrics: chat_response_cache_lookups_total{result} (hit | miss),
+chat_response_cache_evictions_total and chat_response_cache_entries.
+"""
+
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from app.fsm.vaccine_fsm import VaccineConversation
+from app.agents.fastpath import advance_pass_through, normalize
+from app.agents.tools import replay_tool_call
+from app.metrics import CACHE_ENTRIES, CACHE_EVICTIONS, CACHE_LOOKUPS
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "600"))
+
+# Payload fields that change what a state's reply/tool calls mean.
+KEY_FIELDS: dict[str, tuple[str, ...]] = {
+    "offered_slots":      ("slots",),
+    "awaiting_selection": ("slots", "selected_slot"),
+    "confirming":         ("selected_slot",),
+    "completed":          ("selected_slot",),
+}
+
+
+@dataclass(frozen=True)
+class CachedTurn:
+    tool_calls: tuple[tuple[str, str], ...]    # (tool name, JSON arguments)
+    reply: str
+    state: str                                 # FSM state the turn ended in
+    expires_at: float
+
+
+def cache_key(conv: VaccineConversation, user_text: str) -> str:
+    fields = {f: conv.payload.get(f) for f in KEY_FIELDS.get(conv.state, ())}
+    return json.dumps([conv.state, normalize(user_text), fields], sort_keys=True, default=str)
+
+
+def tool_calls_from(result: Any) -> tuple[tuple[str, str], ...]:
+    return tuple(
+        (item.raw_item.name, item.raw_item.arguments)
+        for item in getattr(result, "new_items", [])
+        if getattr(item, "type", None) == "tool_call_item"
+    )
+
+
+def _strings(value) -> list[str]:
+    if isinstance(value, str):
+        return [value] if value else []
+    if isinstance(value, (list, tuple)):
+        return [v for v in value if isinstance(v, str) and v]
+    return []
+
+
+def _text_arguments(tool_calls: tuple[tuple[str, str], ...]) -> bool:
+    return any(
+        _strings(value)
+        for _, arguments in tool_calls
+        for value in json.loads(arguments or "{}").values()
+    )
+
+
+def is_cacheable(
+    state: str, payload: dict, reply: str, tool_calls: tuple[tuple[str, str], ...]
+) -> bool:
+    """
+    Never cache a run that a replay would get wrong for another user:
+    tool calls with text arguments ("Ana" must not replay as "ana"'s stored
+    "Ana"), or a reply that echoes payload outside the key: user-specific
+    values (e.g. their name) or values the turn generated (e.g. freshly
+    offered slots, which a replay would regenerate differently).
+    """
+    if _text_arguments(tool_calls):
+        return False
+    return not any(
+        v in reply
+        for k, value in payload.items()
+        if k not in KEY_FIELDS.get(state, ())
+        for v in _strings(value)
+    )
+
+
+class ResponseCache:
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, CachedTurn] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key: str, conv: VaccineConversation) -> str | None:
+        """On a hit, replay the cached tool calls on `conv` and return the reply."""
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at < time.monotonic():
+            if entry is not None:
+                self._drop(key)
+            self._miss()
+            return None
+        before = conv.checkpoint()
+        for name, arguments in entry.tool_calls:
+            replay_tool_call(conv, name, json.loads(arguments or "{}"))
+        # The agent's templated reply steps through pass-through states too.
+        advance_pass_through(conv)
+        if conv.state != entry.state:
+            conv.rollback(before)
+            self._drop(key)
+            self._miss()
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        CACHE_LOOKUPS.labels("hit").inc()
+        return entry.reply
+
+    def _miss(self) -> None:
+        self.misses += 1
+        CACHE_LOOKUPS.labels("miss").inc()
+
+    def _drop(self, key: str) -> None:
+        del self._entries[key]
+        CACHE_ENTRIES.dec()
+
+    def store(
+        self, key: str, tool_calls: tuple[tuple[str, str], ...], reply: str, state: str
+    ) -> None:
+        if key not in self._entries:
+            CACHE_ENTRIES.inc()
+        self._entries[key] = CachedTurn(tool_calls, reply, state, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._drop(next(iter(self._entries)))
+            CACHE_EVICTIONS.inc()
+
+
+RESPONSE_CACHE = ResponseCache()
@@ -1,9 +1,104 @@
 # backend/app/agents/config.py
 
-from agents import ModelSettings
+import json
+import os
+from dataclasses import dataclass
+from agents import ModelSettings, set_default_openai_api
 
 # LLM model name (change to o4-mini or whatever you prefer)
 MODEL_NAME = "gpt-4o"
 
 # Default settings: force tool use when required
-DEFAULT_MODEL_SETTINGS = ModelSettings(tool_choice="required")
\ No newline at end of file
+DEFAULT_MODEL_SETTINGS = ModelSettings(tool_choice="required")
+
+# OpenAI API the agents call: "responses" (SDK default) or "chat_completions",
+# e.g. for Chat Completions-only endpoints like benchmarks/mock_llm.py.
+# The endpoint itself comes from the client's own OPENAI_BASE_URL.
+OPENAI_DEFAULT_API = os.getenv("OPENAI_DEFAULT_API")
+if OPENAI_DEFAULT_API:
+    set_default_openai_api(OPENAI_DEFAULT_API)
+
+# ─── Per-state model routing ──────────────────────────────────────────────────
+# States whose agent just calls one fixed tool run on a small, fast model;
+# everything else uses MODEL_NAME. Override without code changes with
+# MODEL_ROUTES (inline JSON) or MODEL_ROUTES_FILE (path to a JSON file), e.g.
+#   {"asked_name": {"model": "gpt-4o-mini", "settings": {"temperature": 0}}}
+# "settings" are ModelSettings fields layered over DEFAULT_MODEL_SETTINGS.
+FAST_MODEL_NAME = os.getenv("FAST_MODEL_NAME", "gpt-4o-mini")
+
+DEFAULT_MODEL_ROUTES: dict[str, dict] = {
+    "start":              {"model": FAST_MODEL_NAME},
+    "got_age":            {"model": FAST_MODEL_NAME},
+    "eligible":           {"model": FAST_MODEL_NAME},
+    "awaiting_selection": {"model": FAST_MODEL_NAME},
+    "fallback":           {"model": FAST_MODEL_NAME},
+}
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    model: str
+    settings: ModelSettings
+
+
+def _load_route_overrides() -> dict[str, dict]:
+    raw = os.getenv("MODEL_ROUTES")
+    path = os.getenv("MODEL_ROUTES_FILE")
+    if path:
+        with open(path) as f:
+            raw = f.read()
+    return json.loads(raw) if raw else {}
+
+
+def _build_routes() -> dict[str, ModelRoute]:
+    routes = {}
+    for state, spec in {**DEFAULT_MODEL_ROUTES, **_load_route_overrides()}.items():
+        settings = DEFAULT_MODEL_SETTINGS.resolve(ModelSettings(**spec.get("settings", {})))
+        routes[state] = ModelRoute(model=spec.get("model", MODEL_NAME), settings=settings)
+    return routes
+
+
+MODEL_ROUTES: dict[str, ModelRoute] = _build_routes()
+_DEFAULT_ROUTE = ModelRoute(model=MODEL_NAME, settings=DEFAULT_MODEL_SETTINGS)
+
+
+def route_for(state: str) -> ModelRoute:
+    return MODEL_ROUTES.get(state, _DEFAULT_ROUTE)
+
+# ─── Prompt history window ────────────────────────────────────────────────────
+# 0 disables a limit. Messages beyond the window are dropped from the prompt;
+# the FSM payload (and, optionally, a running summary) stands in for them.
+HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", "20"))
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "3000"))
+
+# Summarise dropped turns into conversation_states.summary, in batches of at
+# least HISTORY_SUMMARY_BATCH messages, with a small model.
+HISTORY_SUMMARIZE = os.getenv("HISTORY_SUMMARIZE", "false").lower() in ("1", "true", "yes")
+HISTORY_SUMMARY_BATCH = int(os.getenv("HISTORY_SUMMARY_BATCH", "6"))
+SUMMARY_MODEL_NAME = os.getenv("SUMMARY_MODEL_NAME", "gpt-4o-mini")
+
+# ─── LLM admission control ────────────────────────────────────────────────────
+# Agent runs allowed in flight per worker process, overall and per model
+# (0 = unlimited). LLM_MODEL_CONCURRENCY is inline JSON, e.g. {"gpt-4o": 16}.
+# Turns beyond the limits wait in a queue of LLM_QUEUE_SIZE for at most
+# LLM_QUEUE_TIMEOUT seconds; past that they are rejected (429 / 503).
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+LLM_MODEL_CONCURRENCY: dict[str, int] = json.loads(os.getenv("LLM_MODEL_CONCURRENCY") or "{}")
+LLM_QUEUE_SIZE = int(os.getenv("LLM_QUEUE_SIZE", "256"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+
+# ─── LLM resilience ───────────────────────────────────────────────────────────
+# LLM_CALL_TIMEOUT    deadline per model request (streams: per chunk), seconds
+# LLM_TURN_BUDGET     model requests one turn may make (the SDK's max_turns)
+# LLM_HEDGE           send a second request when the first runs past the
+#                     model's recent p95 (after LLM_HEDGE_MIN_SAMPLES calls)
+# LLM_BREAKER_*       after FAILURES consecutive failed (or slower than
+#                     SLOW_SECONDS, 0 = off) requests a model's circuit opens
+#                     for COOLDOWN seconds; turns are answered from templates
+LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", "20"))
+LLM_TURN_BUDGET = int(os.getenv("LLM_TURN_BUDGET", "4"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() in ("1", "true", "yes")
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+LLM_BREAKER_SLOW_SECONDS = float(os.getenv("LLM_BREAKER_SLOW_SECONDS", "0"))
@@ -1,6 +1,7 @@
 # backend/app/agents/factory.py
 
-from agents import Agent
+from agents import Agent, FunctionToolResult, ModelSettings, RunContextWrapper
+from agents.agent import ToolsToFinalOutputResult
 from app.schemas import ConversationReply
 from app.fsm.vaccine_fsm import VaccineConversation
 from app.agents.tools import (
@@ -22,8 +23,13 @@ from app.agents.tools import (
     early_cancel,
     restart_after_fallback,
 )
-from app.agents.config import MODEL_NAME, DEFAULT_MODEL_SETTINGS
-from app.agents.instructions import STATE_INSTRUCTIONS
+from app.agents.config import MODEL_NAME, DEFAULT_MODEL_SETTINGS, route_for
+from app.agents.instructions import (
+    STATE_INSTRUCTIONS,
+    TRANSITION_REPLY_TEMPLATES,
+    render_transition_reply,
+)
+from app.agents.fastpath import advance_pass_through
 
 TOOLS_MAP: dict[str, list] = {
     "start":              [ask_intent],
@@ -42,7 +48,34 @@ TOOLS_MAP: dict[str, list] = {
     "fallback":           [restart_after_fallback],
 }
 
-def make_agent(state: str) -> Agent[VaccineConversation]:
+def templated_tool_reply(
+    context: RunContextWrapper[VaccineConversation],
+    results: list[FunctionToolResult],
+) -> ToolsToFinalOutputResult:
+    """
+    tool_use_behavior: after a tool with a reply template, finish the run with
+    the rendered text instead of asking the model to write it. A template
+    speaks for one tool call, so when the model issued several at once (e.g.
+    name and age) the model writes the reply and acknowledges each of them.
+    """
+    if len(results) != 1:
+        return ToolsToFinalOutputResult(is_final_output=False)
+    tool_name = results[0].tool.name
+    if tool_name not in TRANSITION_REPLY_TEMPLATES:
+        return ToolsToFinalOutputResult(is_final_output=False)
+    conv = context.context
+    advance_pass_through(conv)
+    text = render_transition_reply(tool_name, conv.state, conv.payload)
+    if text is None:
+        return ToolsToFinalOutputResult(is_final_output=False)
+    return ToolsToFinalOutputResult(is_final_output=True, final_output=ConversationReply(text=text))
+
+
+def make_agent(
+    state: str,
+    model: str = MODEL_NAME,
+    model_settings: ModelSettings = DEFAULT_MODEL_SETTINGS,
+) -> Agent[VaccineConversation]:
     instr = STATE_INSTRUCTIONS.get(state)
     tools = TOOLS_MAP.get(state, [])
     # All outputs are ConversationReply (strict Pydantic)
@@ -51,8 +84,45 @@ def make_agent(state: str) -> Agent[VaccineConversation]:
     return Agent[VaccineConversation](
         name=f"{state.capitalize()}Agent",
         instructions=instr,
-        model=MODEL_NAME,
-        model_settings=DEFAULT_MODEL_SETTINGS,
+        model=model,
+        model_settings=model_settings,
         tools=tools,
         output_type=output_type,
-    )
\ No newline at end of file
+        tool_use_behavior=templated_tool_reply,
+    )
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Process-wide agent registry
+# ──────────────────────────────────────────────────────────────────────────────
+# Agents are immutable once built, so one instance per (state, model, settings)
+# is shared by every request. Dynamic-instruction states (dynamic_confirming,
+# dynamic_offer_slots, dynamic_post_booking) keep their callable as
+# `instructions`, which the SDK still renders against the context on each run.
+
+_AGENTS: dict[tuple[str, str, str], Agent[VaccineConversation]] = {}
+
+
+def get_agent(
+    state: str,
+    model: str = MODEL_NAME,
+    model_settings: ModelSettings = DEFAULT_MODEL_SETTINGS,
+) -> Agent[VaccineConversation]:
+    key = (state, model, repr(model_settings))
+    agent = _AGENTS.get(key)
+    if agent is None:
+        agent = _AGENTS.setdefault(key, make_agent(state, model, model_settings))
+    return agent
+
+
+def get_routed_agent(state: str) -> Agent[VaccineConversation]:
+    """Agent for `state` on the model/settings chosen by the routing table."""
+    route = route_for(state)
+    return get_agent(state, route.model, route.settings)
+
+
+def warm_agents() -> int:
+    """Prebuild the routed agent of every known state; returns how many are cached."""
+    for state in set(TOOLS_MAP) | set(STATE_INSTRUCTIONS):
+        get_routed_agent(state)
+    return len(_AGENTS)
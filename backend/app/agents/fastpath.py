@@ -0,0 +1,169 @@
+# backend/app/agents/fastpath.py
+"""
+Rule-based pre-classifier that resolves trivially parseable turns without
+calling the LLM.
+
+When the user's message is an unambiguous yes/no or an in-range number for
+the current state, the matching FSM trigger is fired directly and the reply
+is rendered from STATE_REPLY_TEMPLATES. Anything else returns None and the
+turn goes to the agent as usual.
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable
+
+from app.fsm.vaccine_fsm import VaccineConversation
+from app.agents.instructions import render_state_reply
+from app.metrics import FAST_PATH_SAVED_SECONDS
+
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() in ("1", "true", "yes")
+
+YES_WORDS = frozenset({"yes", "y", "yeah", "yep", "yes please", "si", "sí"})
+NO_WORDS = frozenset({"no", "n", "nope", "no thanks", "no thank you"})
+
+# States the agents leave immediately with a fixed tool call; the fast path
+# follows them so the reply is for the state the user will actually answer.
+AUTO_ADVANCE: dict[str, str] = {
+    "got_age": "ask_allergy",
+    "awaiting_selection": "confirm",
+}
+
+_NUMBER = re.compile(r"^\d{1,3}$")
+
+
+def advance_pass_through(conv: VaccineConversation) -> None:
+    """Fire the fixed follow-up trigger if `conv` sits in a pass-through state."""
+    auto = AUTO_ADVANCE.get(conv.state)
+    if auto:
+        conv.trigger(auto)
+
+
+def normalize(text: str) -> str:
+    """Lowercase, trim, collapse whitespace and drop surrounding punctuation."""
+    text = " ".join(text.lower().split())
+    return text.strip(" .,!?¡¿;:\"'")
+
+
+def _yes_no(text: str) -> bool | None:
+    if text in YES_WORDS:
+        return True
+    if text in NO_WORDS:
+        return False
+    return None
+
+
+def _number(text: str) -> int | None:
+    return int(text) if _NUMBER.match(text) else None
+
+
+@dataclass(frozen=True)
+class FastPathDecision:
+    trigger: str
+    kwargs: dict = field(default_factory=dict)
+
+
+def _intent(text: str, payload: dict) -> FastPathDecision | None:
+    answer = _yes_no(text)
+    if answer is None:
+        return None
+    return FastPathDecision("affirm_intent" if answer else "deny_intent")
+
+
+def _allergy(text: str, payload: dict) -> FastPathDecision | None:
+    answer = _yes_no(text)
+    if answer is None:
+        return None
+    return FastPathDecision("answer_allergy", {"allergy": "yes" if answer else "no"})
+
+
+def _confirm(text: str, payload: dict) -> FastPathDecision | None:
+    answer = _yes_no(text)
+    if answer is None:
+        return None
+    return FastPathDecision("finish_yes" if answer else "finish_no")
+
+
+def _age(text: str, payload: dict) -> FastPathDecision | None:
+    age = _number(text)
+    if age is None or not 0 <= age <= 120:
+        return None
+    return FastPathDecision("provide_age", {"age": age})
+
+
+def _slot(text: str, payload: dict) -> FastPathDecision | None:
+    choice = _number(text)
+    if choice is None or not 1 <= choice <= len(payload.get("slots", [])):
+        return None
+    return FastPathDecision("select_slot", {"choice": choice})
+
+
+RULES: dict[str, Callable[[str, dict], FastPathDecision | None]] = {
+    "awaiting_intent": _intent,
+    "awaiting_allergy_response": _allergy,
+    "confirming": _confirm,
+    "got_name": _age,
+    "offered_slots": _slot,
+}
+
+
+def classify(state: str, user_text: str, payload: dict) -> FastPathDecision | None:
+    rule = RULES.get(state)
+    if rule is None:
+        return None
+    return rule(normalize(user_text), payload)
+
+
+def resolve(conv: VaccineConversation, user_text: str) -> str | None:
+    """
+    Apply a confident decision to `conv` and return the templated reply, or
+    return None (leaving `conv` untouched) so the caller falls back to the LLM.
+    """
+    if not FAST_PATH_ENABLED:
+        return None
+    decision = classify(conv.state, user_text, conv.payload)
+    if decision is None:
+        return None
+
+    before = conv.checkpoint()
+    if not conv.trigger(decision.trigger, **decision.kwargs):
+        return None
+    advance_pass_through(conv)
+
+    reply = render_state_reply(conv.state, conv.payload)
+    if reply is None:
+        conv.rollback(before)
+        return None
+    return reply
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Metrics
+# ──────────────────────────────────────────────────────────────────────────────
+
+@dataclass
+class FastPathStats:
+    """
+    Estimate of the LLM time saved by fast-path hits, exported as
+    chat_fastpath_saved_seconds_total{state} (hit rate: chat_turn_path_total).
+    """
+    # Exponential moving average of agent-run seconds per state.
+    agent_seconds: dict[str, float] = field(default_factory=dict)
+    alpha: float = 0.2
+
+    def record_hit(self, conv: VaccineConversation, state: str, elapsed: float) -> float:
+        """Estimated seconds saved; counted with the turn's other metrics once it is saved."""
+        saved = max(self.agent_seconds.get(state, 0.0) - elapsed, 0.0)
+        conv.pending_metrics.append(partial(FAST_PATH_SAVED_SECONDS.labels(state).inc, saved))
+        return saved
+
+    def record_miss(self, state: str, agent_elapsed: float) -> None:
+        prev = self.agent_seconds.get(state)
+        self.agent_seconds[state] = (
+            agent_elapsed if prev is None else prev + self.alpha * (agent_elapsed - prev)
+        )
+
+
+FAST_PATH_STATS = FastPathStats()
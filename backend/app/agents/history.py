@@ -0,0 +1,97 @@
+# backend/app/agents/history.py
+"""
+Bounded prompt history.
+
+The agent only sees the most recent messages that fit both a message-count
+and an (estimated) token budget. Older turns are represented by one context
+message carrying the FSM payload and, when enabled, a running summary that
+is persisted on conversation_states.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Sequence
+
+from agents import Agent, Runner
+
+from app.agents.config import (
+    HISTORY_MAX_MESSAGES,
+    HISTORY_MAX_TOKENS,
+    HISTORY_SUMMARIZE,
+    HISTORY_SUMMARY_BATCH,
+    SUMMARY_MODEL_NAME,
+)
+from app.agents.resilience import RESILIENT_RUN_CONFIG
+
+# Extra rows read beyond the window so messages that just fell out of it are
+# still available to the summariser.
+SUMMARY_LOOKBACK = 8
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap, tokenizer-free estimate (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+@dataclass(frozen=True)
+class HistoryPolicy:
+    max_messages: int = HISTORY_MAX_MESSAGES
+    max_tokens: int = HISTORY_MAX_TOKENS
+    summarize: bool = HISTORY_SUMMARIZE
+    summary_batch: int = HISTORY_SUMMARY_BATCH
+
+    @property
+    def fetch_limit(self) -> int | None:
+        """How many of the latest messages a turn needs to read (None = all)."""
+        if not self.max_messages:
+            return None
+        return self.max_messages + (SUMMARY_LOOKBACK if self.summarize else 0)
+
+    def window(self, messages: Sequence[Any]) -> tuple[list[Any], list[Any]]:
+        """
+        Split chronologically ordered messages (anything with .content) into
+        (kept, dropped). The newest message is always kept.
+        """
+        kept: list[Any] = []
+        tokens = 0
+        for m in reversed(messages):
+            cost = estimate_tokens(m.content)
+            if kept and (
+                (self.max_messages and len(kept) >= self.max_messages)
+                or (self.max_tokens and tokens + cost > self.max_tokens)
+            ):
+                break
+            kept.append(m)
+            tokens += cost
+        kept.reverse()
+        return kept, list(messages[: len(messages) - len(kept)])
+
+
+def context_message(payload: dict, summary: str | None) -> dict:
+    """Stand-in for dropped turns: known facts from the FSM plus the summary."""
+    facts = ", ".join(
+        f"{k}={v}" for k, v in payload.items() if k != "slots" and v is not None
+    )
+    lines = ["Earlier messages of this conversation are omitted."]
+    if facts:
+        lines.append(f"Known facts: {facts}.")
+    if summary:
+        lines.append(f"Summary so far: {summary}")
+    return {"role": "developer", "content": "\n".join(lines)}
+
+
+_summary_agent = Agent(
+    name="SummaryAgent",
+    instructions=(
+        "Update the running summary of a vaccination-scheduling chat. "
+        "Keep it under 80 words, factual, third person; "
+        "preserve anything the user asked for that is still unresolved."
+    ),
+    model=SUMMARY_MODEL_NAME,
+)
+
+
+async def summarize(previous: str | None, messages: Sequence[Any]) -> str:
+    transcript = "\n".join(f"{m.role}: {m.content}" for m in messages)
+    prompt = f"Current summary:\n{previous or '(none)'}\n\nNew messages:\n{transcript}"
+    result = await Runner.run(_summary_agent, prompt, max_turns=1, run_config=RESILIENT_RUN_CONFIG)
+    return str(result.final_output).strip()
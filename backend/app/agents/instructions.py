@@ -243,4 +243,143 @@ Acknowledge cancellation and say goodbye.
 ### Format
 “Understood — no problem. If you need anything else, feel free to reach out. Goodbye!”
 """,
-}
\ No newline at end of file
+}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Deterministic replies on entering a state
+# ──────────────────────────────────────────────────────────────────────────────
+# Used when a turn is resolved without the LLM (see app.agents.fastpath).
+# Wording mirrors the "Format" sections above.
+
+def reply_offer_slots(payload: Dict[str, Any]) -> str:
+    slots = payload.get("slots", [])
+    if not slots:
+        return "I'm sorry — there are no appointment slots available right now."
+    lines = "\n".join(f"{i+1}) {slot}" for i, slot in enumerate(slots))
+    return (
+        f"Here are the available appointment times:\n{lines}\n"
+        f"Please choose a slot by its number (1-{len(slots)})."
+    )
+
+
+def reply_confirming(payload: Dict[str, Any]) -> str:
+    slot = payload.get("selected_slot")
+    return f"You selected {slot}. Please confirm — reply yes or no."
+
+
+def reply_completed(payload: Dict[str, Any]) -> str:
+    slot = payload.get("selected_slot")
+    return (
+        f"Your appointment is confirmed for {slot}. Thank you! "
+        "How else may I assist you today?"
+    )
+
+
+def reply_got_name(payload: Dict[str, Any]) -> str:
+    name = payload.get("name") or "there"
+    return f"Thank you, {name}. How old are you? Please reply with a number, for example: 36."
+
+
+STATE_REPLY_TEMPLATES: Dict[str, Union[str, Callable[[Dict[str, Any]], str]]] = {
+    "asked_name": (
+        "Great! What is your full name? "
+        "Please reply with your first and last name, for example: John Doe."
+    ),
+    "got_name": reply_got_name,
+    "awaiting_allergy_response": (
+        "Thank you. Do you have any severe egg allergy? Please reply yes or no."
+    ),
+    "offered_slots": reply_offer_slots,
+    "confirming": reply_confirming,
+    "completed": reply_completed,
+    "ineligible": (
+        "I'm sorry — based on your answers, you're not eligible for the influenza "
+        "vaccine today. If you need more information, please consult your "
+        "healthcare provider. Goodbye!"
+    ),
+    "abort": (
+        "Understood — no problem. If you need anything else, feel free to reach out. "
+        "Goodbye!"
+    ),
+}
+
+
+def render_state_reply(state: str, payload: Dict[str, Any]) -> str | None:
+    """Template reply for `state`, or None when the state has no template."""
+    template = STATE_REPLY_TEMPLATES.get(state)
+    if template is None:
+        return None
+    return template(payload) if callable(template) else template
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Degraded mode (LLM unavailable)
+# ──────────────────────────────────────────────────────────────────────────────
+# The question each state is waiting on, re-asked word for word from the
+# instructions above when the model cannot be reached (see app.agents.resilience).
+
+DEGRADED_REPLY_TEMPLATES: Dict[str, Union[str, Callable[[Dict[str, Any]], str]]] = {
+    **STATE_REPLY_TEMPLATES,
+    "awaiting_intent": (
+        "Would you like to schedule an influenza vaccination today? Please reply yes or no."
+    ),
+    "asked_name": (
+        "What is your full name? Please reply with your first and last name, "
+        "for example: John Doe."
+    ),
+    "got_name": "How old are you? Please reply with a number, for example: 36.",
+    "eligible": reply_offer_slots,
+}
+
+DEGRADED_APOLOGY = "I'm sorry, I couldn't process that just now."
+
+
+def render_degraded_reply(state: str, payload: Dict[str, Any], moved: bool) -> str:
+    """
+    Reply for a turn answered without the model: the landed state's question,
+    prefixed with an apology when the user's message was not acted on.
+    """
+    template = DEGRADED_REPLY_TEMPLATES.get(state)
+    if template is None:
+        return f"{DEGRADED_APOLOGY} Please try again in a moment."
+    text = template(payload) if callable(template) else template
+    return text if moved else f"{DEGRADED_APOLOGY} {text}"
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Deterministic replies after a tool call
+# ──────────────────────────────────────────────────────────────────────────────
+# Tool (transition) → reply. When present, the agent run stops right after the
+# tool fires and this text is the reply, saving the second model call.
+# FROM_STATE means "the template of the state the FSM landed in".
+# Tools not listed (greeting, unclear/invalid input, fallback) still let the
+# model write the reply.
+
+FROM_STATE = object()
+
+TRANSITION_REPLY_TEMPLATES: Dict[str, Any] = {
+    "affirm_intent":     FROM_STATE,
+    "deny_intent": (
+        "No problem — I won't schedule a vaccination. "
+        "If you change your mind, just let me know. Goodbye!"
+    ),
+    "provide_name":      FROM_STATE,
+    "provide_age":       FROM_STATE,
+    "ask_allergy":       FROM_STATE,
+    "answer_allergy":    FROM_STATE,
+    "select_slot":       FROM_STATE,
+    "confirm_selection": FROM_STATE,
+    "finish_booking":    FROM_STATE,
+    "early_cancel":      FROM_STATE,
+}
+
+
+def render_transition_reply(tool_name: str, state: str, payload: Dict[str, Any]) -> str | None:
+    """Reply for a turn that ended with `tool_name`, or None to let the model answer."""
+    template = TRANSITION_REPLY_TEMPLATES.get(tool_name)
+    if template is None:
+        return None
+    if template is FROM_STATE:
+        return render_state_reply(state, payload)
+    return template(payload) if callable(template) else template
@@ -0,0 +1,254 @@
+# backend/app/agents/resilience.py
+"""
+Bounded-latency model calls.
+
+Agent runs get their models from RESILIENT_PROVIDER, which wraps each SDK
+model in ResilientModel:
+
+  * every request has a deadline (LLM_CALL_TIMEOUT; streams per chunk)
+  * with LLM_HEDGE, a request still running after the model's recent p95
+    gets a second identical request; the first answer wins, the other is
+    cancelled (non-streaming requests only)
+  * failures, timeouts and (optionally) slow answers feed a per-model
+    CircuitBreaker; while it is open, requests fail fast with CircuitOpenError
+
+The runner caps each turn at LLM_TURN_BUDGET model requests, and when a run
+fails with one of DEGRADED_ERRORS answers from degraded_reply() instead: a
+deterministic template for the FSM state, so the chat keeps moving while
+the provider is slow or down.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+
+import openai
+from agents import (
+    MaxTurnsExceeded,
+    Model,
+    ModelBehaviorError,
+    ModelProvider,
+    MultiProvider,
+    RunConfig,
+)
+
+from app.agents.config import (
+    LLM_BREAKER_COOLDOWN,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_SLOW_SECONDS,
+    LLM_CALL_TIMEOUT,
+    LLM_HEDGE,
+    LLM_HEDGE_MIN_SAMPLES,
+)
+from app.agents.fastpath import advance_pass_through
+from app.agents.instructions import render_degraded_reply
+from app.fsm.vaccine_fsm import VaccineConversation
+from app.metrics import LLM_CIRCUIT_OPEN, LLM_FAILURES, LLM_HEDGED
+
+
+class CircuitOpenError(Exception):
+    """The model's circuit breaker is open; no request was sent."""
+
+
+# Errors after which a turn is answered in degraded mode rather than failed.
+DEGRADED_ERRORS = (
+    CircuitOpenError,
+    TimeoutError,
+    MaxTurnsExceeded,
+    ModelBehaviorError,
+    openai.APIError,
+)
+
+
+class LatencyWindow:
+    """Recent request latencies of one model; p95 is refreshed every `every` samples."""
+
+    def __init__(self, size: int = 200, every: int = 10):
+        self._samples: deque[float] = deque(maxlen=size)
+        self._every = every
+        self._since = 0
+        self.p95: float | None = None
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self._since += 1
+        if self._since >= self._every and len(self._samples) >= LLM_HEDGE_MIN_SAMPLES:
+            ordered = sorted(self._samples)
+            self.p95 = ordered[min(math.ceil(0.95 * len(ordered)) - 1, len(ordered) - 1)]
+            self._since = 0
+
+
+class CircuitBreaker:
+    """
+    closed → open after `failures` consecutive failures. Once `cooldown`
+    seconds have passed one probe request goes through (re-arming the
+    cooldown for everyone else); its success closes the breaker, its
+    failure keeps it open.
+    """
+
+    def __init__(self, model: str, failures: int, cooldown: float):
+        self.model = model
+        self.failures = failures
+        self.cooldown = cooldown
+        self._consecutive = 0
+        self._opened_at: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        """Open and cooling down: requests would be refused right now."""
+        return self._opened_at is not None and time.monotonic() - self._opened_at < self.cooldown
+
+    def before_call(self) -> None:
+        if self._opened_at is None:
+            return
+        if self.is_open:
+            raise CircuitOpenError(f"circuit open for {self.model}")
+        self._opened_at = time.monotonic()     # this request is the probe
+
+    def record_success(self) -> None:
+        self._consecutive = 0
+        if self._opened_at is not None:
+            logging.info(f"[Breaker] {self.model} closed")
+            self._opened_at = None
+            LLM_CIRCUIT_OPEN.labels(self.model).set(0)
+
+    def record_failure(self, reason: str) -> None:
+        LLM_FAILURES.labels(self.model, reason).inc()
+        self._consecutive += 1
+        if self._opened_at is not None:
+            self._opened_at = time.monotonic()
+        elif self._consecutive >= self.failures:
+            logging.warning(f"[Breaker] {self.model} open for {self.cooldown:.0f}s ({reason})")
+            self._opened_at = time.monotonic()
+            LLM_CIRCUIT_OPEN.labels(self.model).set(1)
+
+
+class ResilientModel(Model):
+    """SDK model wrapper adding deadlines, hedging and the circuit breaker."""
+
+    def __init__(self, model: Model, name: str):
+        self.model = model
+        self.name = name
+        self.breaker = CircuitBreaker(name, LLM_BREAKER_FAILURES, LLM_BREAKER_COOLDOWN)
+        self.latency = LatencyWindow()
+
+    def _record(self, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        self.latency.add(elapsed)
+        if LLM_BREAKER_SLOW_SECONDS and elapsed > LLM_BREAKER_SLOW_SECONDS:
+            self.breaker.record_failure("slow")
+        else:
+            self.breaker.record_success()
+
+    async def _hedged(self, call):
+        first = asyncio.ensure_future(call())
+        pending, error = {first}, None
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.latency.p95)
+            if done:
+                return first.result()
+            hedge = asyncio.ensure_future(call())
+            pending.add(hedge)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        LLM_HEDGED.labels(self.name, "first" if task is first else "hedge").inc()
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def get_response(self, *args, **kwargs):
+        self.breaker.before_call()
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(LLM_CALL_TIMEOUT):
+                if LLM_HEDGE and self.latency.p95 is not None:
+                    response = await self._hedged(lambda: self.model.get_response(*args, **kwargs))
+                else:
+                    response = await self.model.get_response(*args, **kwargs)
+        except TimeoutError:
+            self.breaker.record_failure("timeout")
+            raise
+        except Exception:
+            self.breaker.record_failure("error")
+            raise
+        self._record(started)
+        return response
+
+    async def stream_response(self, *args, **kwargs):
+        self.breaker.before_call()
+        started = time.perf_counter()
+        stream = self.model.stream_response(*args, **kwargs)
+        try:
+            while True:
+                try:
+                    async with asyncio.timeout(LLM_CALL_TIMEOUT):
+                        event = await anext(stream)
+                except StopAsyncIteration:
+                    break
+                yield event
+        except TimeoutError:
+            self.breaker.record_failure("timeout")
+            raise
+        except Exception:
+            self.breaker.record_failure("error")
+            raise
+        finally:
+            await stream.aclose()
+        self._record(started)
+
+    def get_retry_advice(self, request):
+        return self.model.get_retry_advice(request)
+
+    async def close(self) -> None:
+        await self.model.close()
+
+    async def _cleanup_on_run_end(self, owner: object) -> None:
+        await self.model._cleanup_on_run_end(owner)
+
+
+class ResilientModelProvider(ModelProvider):
+    """The SDK's default provider, with every model wrapped once per name."""
+
+    def __init__(self):
+        self._provider = MultiProvider()
+        self._models: dict[str | None, ResilientModel] = {}
+
+    def get_model(self, model_name: str | None) -> Model:
+        model = self._models.get(model_name)
+        if model is None:
+            model = self._models.setdefault(
+                model_name,
+                ResilientModel(self._provider.get_model(model_name), str(model_name)),
+            )
+        return model
+
+    def breaker(self, model_name: str) -> CircuitBreaker:
+        return self.get_model(model_name).breaker
+
+    async def aclose(self) -> None:
+        await self._provider.aclose()
+
+
+RESILIENT_PROVIDER = ResilientModelProvider()
+RESILIENT_RUN_CONFIG = RunConfig(model_provider=RESILIENT_PROVIDER)
+
+# States whose agent always fires the same tool whatever the user says.
+_DEGRADED_AUTO = {"start": "ask_intent", "fallback": "restart_after_fallback"}
+
+
+def degraded_reply(conv: VaccineConversation, state: str) -> str:
+    """
+    Template reply for a turn the model could not handle. `state` is where
+    the turn started; tools that already ran are kept.
+    """
+    while conv.state in _DEGRADED_AUTO and conv.trigger(_DEGRADED_AUTO[conv.state]):
+        pass
+    advance_pass_through(conv)
+    return render_degraded_reply(conv.state, conv.payload, moved=conv.state != state)
@@ -1,65 +1,147 @@
 # backend/app/agents/runner.py
 
-import asyncio
 import logging
+import time
+from typing import AsyncIterator, NamedTuple
 from agents import Runner, RunContextWrapper
 from app.fsm.vaccine_fsm import VaccineConversation
-from app.agents.factory import make_agent
+from app.agents.factory import get_routed_agent
+from app.agents import fastpath
+from app.agents.admission import ADMISSION
+from app.agents.config import LLM_TURN_BUDGET
+from app.agents.cache import (
+    RESPONSE_CACHE,
+    RESPONSE_CACHE_ENABLED,
+    cache_key,
+    is_cacheable,
+    tool_calls_from,
+)
+from app.agents.resilience import (
+    DEGRADED_ERRORS,
+    RESILIENT_PROVIDER,
+    RESILIENT_RUN_CONFIG,
+    degraded_reply,
+)
+from app.agents.streaming import ReplyTextExtractor
+from app.agents.usage import (
+    CACHE_MODEL,
+    DEGRADED_MODEL,
+    FAST_PATH_MODEL,
+    MODEL_USAGE_STATS,
+    TurnMetricsHooks,
+)
+from app.logs import configure_logging, dump_sampled, log_dump
+from app.metrics import TURN_PATH, observe_phase
+from app.tracing import span
 from app.schemas import ConversationReply
 
 # Silence other libs
-for lib in ("openai", "urllib3", "agents", "transitions"):
+for lib in ("openai", "urllib3", "agents"):
     logging.getLogger(lib).setLevel(logging.WARNING)
 
-# Our concise logger
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s %(message)s",
-    datefmt="%H:%M:%S",
-)
+# Our concise logger (queued; see app/logs.py)
+configure_logging()
+
+
+class ResolvedTurn(NamedTuple):
+    state: str                  # FSM state the turn started in
+    reply: str | None           # fast-path / cached reply; None: the agent runs
+    key: str | None             # response cache key to store the agent's reply under
 
 
 class ConversationRunner:
     """
     FSM runner that logs system prompt + tools + I/O for easy debugging.
     """
-    def __init__(self, repo):
+    def __init__(self, repo, cache=None):
         self.repo = repo
         self.runner = Runner()
+        self.cache = cache if cache is not None else (
+            RESPONSE_CACHE if RESPONSE_CACHE_ENABLED else None
+        )
 
-    def run_step(self, conv: VaccineConversation, user_text: str) -> str:
-        # 1) FSM state & payload
-        logging.info(f"[FSM] state={conv.state!r}, payload={conv.payload!r}")
+    def _resolve_without_llm(self, conv: VaccineConversation, user_text: str, state: str):
+        """
+        Fast path first, then the response cache. Returns (reply or None, cache key).
+        """
+        # Deterministic fast path: clear yes/no or in-range numbers skip the LLM
+        started = time.perf_counter()
+        fast_reply = fastpath.resolve(conv, user_text)
+        if fast_reply is not None:
+            elapsed = time.perf_counter() - started
+            saved = fastpath.FAST_PATH_STATS.record_hit(conv, state, elapsed)
+            MODEL_USAGE_STATS.record(state, FAST_PATH_MODEL, elapsed)
+            conv.pending_metrics.append(TURN_PATH.labels(state, "fastpath").inc)
+            logging.info(f"[FastPath] {state!r} → {conv.state!r} (saved≈{saved * 1000:.0f}ms)")
+            return fast_reply, None
+
+        # Response cache: same state + utterance (+ relevant payload) as before
+        key = None
+        if self.cache is not None:
+            key = cache_key(conv, user_text)
+            cached = self.cache.lookup(key, conv)
+            if cached is not None:
+                MODEL_USAGE_STATS.record(state, CACHE_MODEL, time.perf_counter() - started)
+                conv.pending_metrics.append(TURN_PATH.labels(state, "cache").inc)
+                logging.info(f"[Cache] hit {state!r} → {conv.state!r}")
+                return cached, key
+        return None, key
 
-        # 2) Agent + instructions
-        agent = make_agent(conv.state)
-        instr = agent.instructions
+    def _prepare_agent(self, conv: VaccineConversation, history: list[dict]):
+        # Pick the right agent (and routed model) for this state
+        agent = get_routed_agent(conv.state)
         logging.info(f"[Agent] {agent.name}")
-        logging.info(f"[Prompt] {instr!r}")
 
-        # 3) Tools available
-        tool_names = [tool.name for tool in getattr(agent, "tools", [])]
-        logging.info(f"[Tools] {tool_names}")
+        # Build full chat-completion messages
+        messages = []
+        messages.extend(history)
 
-        # 4) User input
-        logging.info(f"[User] {user_text!r}")
+        # Prompt, allowed tools and history only for sampled turns, size-capped
+        if dump_sampled():
+            log_dump("Prompt", instructions=agent.instructions)
+            log_dump("Tools", tools=[t.name for t in getattr(agent, "tools", [])])
+            log_dump("message historial", messages=messages)
+        return agent, messages
 
-        # 5) Run the agent
-        coro = self.runner.run(agent, user_text, context=conv)
-        loop = asyncio.new_event_loop()
-        try:
-            result = loop.run_until_complete(coro)
-        finally:
-            loop.close()
+    def _finish(self, conv, state, agent, result, elapsed, key):
+        fastpath.FAST_PATH_STATS.record_miss(state, elapsed)
+        conv.pending_metrics.append(TURN_PATH.labels(state, "agent").inc)
+        observe_phase(state, "agent_run", elapsed)
+        usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+        MODEL_USAGE_STATS.record(state, str(agent.model), elapsed, usage)
 
-        # 6) Bot output
         out = getattr(result, "final_output", None) or getattr(result, "output", "")
         text = getattr(out, "text", str(out))
-        logging.info(f"[Bot] {text!r}")
+        logging.info(f"[Bot ({agent.name})] {text!r}")
 
+        if key is not None:
+            tool_calls = tool_calls_from(result)
+            if is_cacheable(state, conv.payload, text, tool_calls):
+                self.cache.store(key, tool_calls, text, conv.state)
         return out
-    
-    def run_step(
+
+    def _degraded(self, conv, state, reason) -> str:
+        """Answer from templates when the model is unavailable (see app.agents.resilience)."""
+        text = degraded_reply(conv, state)
+        conv.pending_metrics.append(TURN_PATH.labels(state, "degraded").inc)
+        MODEL_USAGE_STATS.record(state, DEGRADED_MODEL, 0.0)
+        logging.warning(f"[Degraded] {state!r} → {conv.state!r} ({reason!r})")
+        return text
+
+    def resolve_stream(self, conv: VaccineConversation, user_text: str) -> ResolvedTurn:
+        """
+        First half of a streamed turn, run before any response is sent: the
+        fast path and the cache, and only if the agent has to run, the
+        admission check (OverloadedError if this state's model queue is full).
+        """
+        logging.info(f"[FSM] state={conv.state!r}, payload={conv.payload!r}")
+        state = conv.state
+        reply, key = self._resolve_without_llm(conv, user_text, state)
+        if reply is None:
+            ADMISSION.check(str(get_routed_agent(conv.state).model))
+        return ResolvedTurn(state, reply, key)
+
+    async def run_step(
         self,
         conv: VaccineConversation,
         user_text: str,
@@ -67,33 +149,109 @@ class ConversationRunner:
     ) -> ConversationReply:
         # 1) FSM state & payload
         logging.info(f"[FSM] state={conv.state!r}, payload={conv.payload!r}")
+        state = conv.state
 
-        # 2) Pick the right agent for this state
-        agent = make_agent(conv.state)
-        instr  = agent.instructions
-        logging.info(f"[Agent] {agent.name}")
-        logging.info(f"[Prompt] {instr!r}")
+        reply, key = self._resolve_without_llm(conv, user_text, state)
+        if reply is not None:
+            return ConversationReply(text=reply)
 
-        # 3) Show allowed tools
-        tool_names = [t.name for t in getattr(agent, "tools", [])]
-        logging.info(f"[Tools] {tool_names}")
+        agent, messages = self._prepare_agent(conv, history)
+        model = str(agent.model)
+        if RESILIENT_PROVIDER.breaker(model).is_open:
+            return ConversationReply(text=self._degraded(conv, state, "circuit open"))
 
-        # 4) Build full chat-completion messages
-        messages = []
-        messages.extend(history)       
+        # Run via Runner — which will invoke tools, etc.
+        # Awaited on the caller's loop so a worker can hold many turns at once.
+        async with ADMISSION.slot(model):
+            started = time.perf_counter()
+            with span("agent.run", state=state, agent=agent.name, model=model) as run_span:
+                try:
+                    result = await self.runner.run(
+                        agent,
+                        messages,
+                        context=conv,
+                        max_turns=LLM_TURN_BUDGET,
+                        hooks=TurnMetricsHooks(state),
+                        run_config=RESILIENT_RUN_CONFIG,
+                    )
+                except DEGRADED_ERRORS as exc:
+                    run_span.set_attribute("degraded", type(exc).__name__)
+                    return ConversationReply(text=self._degraded(conv, state, exc))
+                run_span.set_attribute("state.to", conv.state)
+        return self._finish(conv, state, agent, result, time.perf_counter() - started, key)
 
-        logging.info(f"[message historial] {messages!r}")
+    async def stream_step(
+        self,
+        conv: VaccineConversation,
+        resolved: ResolvedTurn,
+        history: list[dict],
+    ) -> AsyncIterator[tuple[str, dict]]:
+        """
+        Streaming variant of run_step, after resolve_stream. Yields (event, data) pairs:
+          ("token", {"text"})        reply text as the model produces it
+          ("tool",  {"name"})        a tool call was issued
+          ("state", {"from", "to"})  a tool moved the FSM
+          ("reply", {"text", "state"}) the final reply, always last
+        """
+        state, reply, key = resolved
+        if reply is not None:
+            if conv.state != state:
+                yield "state", {"from": state, "to": conv.state}
+            yield "token", {"text": reply}
+            yield "reply", {"text": reply, "state": conv.state}
+            return
 
-        # 5) Run via Runner — which will invoke tools, etc.
-        coro = self.runner.run(agent, messages, context=conv, max_turns=50)
-        loop = asyncio.new_event_loop()
-        try:
-            result = loop.run_until_complete(coro)
-        finally:
-            loop.close()
+        agent, messages = self._prepare_agent(conv, history)
+        model = str(agent.model)
 
-        out = getattr(result, "final_output", None) or getattr(result, "output", "")
-        text = getattr(out, "text", str(out))
-        logging.info(f"[Bot ({agent.name})] {text!r}")
+        extractor = ReplyTextExtractor()
+        streamed = False
+        current = state
+        degraded = None
+        if RESILIENT_PROVIDER.breaker(model).is_open:
+            degraded = self._degraded(conv, state, "circuit open")
+        else:
+            async with ADMISSION.slot(model):
+                started = time.perf_counter()
+                with span("agent.run", state=state, agent=agent.name, model=model) as run_span:
+                    # The run loop task starts here and inherits the agent.run span.
+                    result = self.runner.run_streamed(
+                        agent,
+                        messages,
+                        context=conv,
+                        max_turns=LLM_TURN_BUDGET,
+                        hooks=TurnMetricsHooks(state),
+                        run_config=RESILIENT_RUN_CONFIG,
+                    )
+                    try:
+                        async for event in result.stream_events():
+                            if event.type == "raw_response_event":
+                                if getattr(event.data, "type", None) == "response.output_text.delta":
+                                    text = extractor.feed(event.data.delta)
+                                    if text:
+                                        streamed = True
+                                        yield "token", {"text": text}
+                            elif event.type == "run_item_stream_event":
+                                if event.name == "tool_called":
+                                    yield "tool", {"name": getattr(event.item.raw_item, "name", None)}
+                                elif event.name == "tool_output" and conv.state != current:
+                                    yield "state", {"from": current, "to": conv.state}
+                                    current = conv.state
+                    except DEGRADED_ERRORS as exc:
+                        run_span.set_attribute("degraded", type(exc).__name__)
+                        degraded = self._degraded(conv, state, exc)
+                    run_span.set_attribute("state.to", conv.state)
 
-        return out
\ No newline at end of file
+        if degraded is None:
+            out = self._finish(conv, state, agent, result, time.perf_counter() - started, key)
+            text = getattr(out, "text", str(out))
+        else:
+            # The reply event is authoritative if partial model text went out.
+            text, streamed = degraded, False
+        if conv.state != current:
+            # e.g. a templated reply that also stepped through a pass-through state
+            yield "state", {"from": current, "to": conv.state}
+        if not streamed:
+            # Templated tool replies never go through the model's text stream.
+            yield "token", {"text": text}
+        yield "reply", {"text": text, "state": conv.state}
@@ -0,0 +1,60 @@
+# backend/app/agents/streaming.py
+"""
+Helpers for streaming an agent turn.
+
+Agents answer with a ConversationReply, so the model streams JSON such as
+{"text": "Hello…"}. ReplyTextExtractor turns those raw deltas back into the
+plain reply text as it arrives.
+"""
+
+import re
+
+_TEXT_KEY = re.compile(r'"text"\s*:\s*"')
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class ReplyTextExtractor:
+    """Incrementally decode the `text` string of a streamed ConversationReply."""
+
+    def __init__(self):
+        self._prefix = ""       # JSON seen before the text value starts
+        self._inside = False
+        self._done = False
+        self._escape = ""       # pending escape sequence split across deltas
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def feed(self, delta: str) -> str:
+        """Consume one raw JSON delta; return newly decoded reply text."""
+        if self._done:
+            return ""
+        if not self._inside:
+            self._prefix += delta
+            match = _TEXT_KEY.search(self._prefix)
+            if not match:
+                return ""
+            self._inside = True
+            delta = self._prefix[match.end():]
+            self._prefix = ""
+
+        out = []
+        for ch in delta:
+            if self._escape:
+                self._escape += ch
+                if self._escape[1] == "u":
+                    if len(self._escape) == 6:
+                        out.append(chr(int(self._escape[2:], 16)))
+                        self._escape = ""
+                else:
+                    out.append(_ESCAPES.get(ch, ch))
+                    self._escape = ""
+            elif ch == "\\":
+                self._escape = ch
+            elif ch == '"':
+                self._done = True
+                break
+            else:
+                out.append(ch)
+        return "".join(out)
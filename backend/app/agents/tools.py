@@ -3,10 +3,24 @@ import logging
 from functools import wraps
 from agents import function_tool, RunContextWrapper
 from app.fsm.vaccine_fsm import VaccineConversation
+from app.tracing import span
+
+
+def traced_tool(func):
+    """Run the tool inside a `tool.<name>` span recording the FSM move."""
+    @wraps(func)
+    def wrapper(context: RunContextWrapper[VaccineConversation], *args, **kwargs):
+        conv = context.context
+        with span(f"tool.{func.__name__}", state=conv.state, tool=func.__name__) as tool_span:
+            result = func(context, *args, **kwargs)
+            tool_span.set_attribute("state.to", conv.state)
+            return result
+    return wrapper
 
 # ─── Intent ───────────────────────────────────────────────────────────────────
 
 @function_tool
+@traced_tool
 def ask_intent(
     context: RunContextWrapper[VaccineConversation],
 ) -> dict:
@@ -19,6 +33,7 @@ def ask_intent(
     return conv.payload
 
 @function_tool
+@traced_tool
 def affirm_intent(
     context: RunContextWrapper[VaccineConversation],
 ) -> dict:
@@ -31,6 +46,7 @@ def affirm_intent(
     return conv.payload
 
 @function_tool
+@traced_tool
 def deny_intent(
     context: RunContextWrapper[VaccineConversation],
 ) -> dict:
@@ -43,6 +59,7 @@ def deny_intent(
     return conv.payload
 
 @function_tool
+@traced_tool
 def unclear_intent(
     context: RunContextWrapper[VaccineConversation],
 ) -> dict:
@@ -58,6 +75,7 @@ def unclear_intent(
 # ─── Name ─────────────────────────────────────────────────────────────────────
 
 @function_tool
+@traced_tool
 def provide_name(
     context: RunContextWrapper[VaccineConversation],
     name: str,
@@ -71,6 +89,7 @@ def provide_name(
     return conv.payload
 
 @function_tool
+@traced_tool
 def invalid_name(
     context: RunContextWrapper[VaccineConversation],
 ) -> dict:
@@ -86,6 +105,7 @@ def invalid_name(
 # ─── Age ───────────────────────────────────────────────────────────────────────
 
 @function_tool
+@traced_tool
 def provide_age(
     context: RunContextWrapper[VaccineConversation],
     age: int,
@@ -99,6 +119,7 @@ def provide_age(
     return conv.payload
 
 @function_tool
+@traced_tool
 def invalid_age(
     context: RunContextWrapper[VaccineConversation],
 ) -> dict:
@@ -114,6 +135,7 @@ def invalid_age(
 # ─── Allergy ───────────────────────────────────────────────────────────────────
 
 @function_tool
+@traced_tool
 def answer_allergy(
     context: RunContextWrapper[VaccineConversation],
     allergy: str,
@@ -127,6 +149,7 @@ def answer_allergy(
     return conv.payload
 
 @function_tool
+@traced_tool
 def unclear_allergy(
     context: RunContextWrapper[VaccineConversation],
 ) -> dict:
@@ -142,6 +165,7 @@ def unclear_allergy(
 # ─── Slot Selection ────────────────────────────────────────────────────────────
 
 @function_tool
+@traced_tool
 def select_slot(
     context: RunContextWrapper[VaccineConversation],
     choice: int,
@@ -155,6 +179,7 @@ def select_slot(
     return {"selected_slot": conv.payload.get("selected_slot")}
 
 @function_tool
+@traced_tool
 def invalid_slot(
     context: RunContextWrapper[VaccineConversation],
 ) -> dict:
@@ -170,6 +195,7 @@ def invalid_slot(
 # ─── Confirmation ─────────────────────────────────────────────────────────────
 
 @function_tool
+@traced_tool
 def confirm_selection(
     context: RunContextWrapper[VaccineConversation],
 ) -> dict:
@@ -185,6 +211,7 @@ def confirm_selection(
 # ─── Finish Booking ────────────────────────────────────────────────────────────
 
 @function_tool
+@traced_tool
 def finish_booking(
     context: RunContextWrapper[VaccineConversation],
     yes: bool,
@@ -204,6 +231,7 @@ def finish_booking(
 # ─── Global Cancels & Fallback ─────────────────────────────────────────────────
 
 @function_tool
+@traced_tool
 def early_cancel(
     context: RunContextWrapper[VaccineConversation],
 ) -> dict:
@@ -216,6 +244,7 @@ def early_cancel(
     return conv.payload
 
 @function_tool
+@traced_tool
 def restart_after_fallback(
     context: RunContextWrapper[VaccineConversation],
 ) -> dict:
@@ -228,6 +257,7 @@ def restart_after_fallback(
     return conv.payload
 
 @function_tool
+@traced_tool
 def ask_allergy(
     context: RunContextWrapper[VaccineConversation],
 ) -> dict:
@@ -237,4 +267,22 @@ def ask_allergy(
     logging.info("[Tool] ask_allergy called")
     conv: VaccineConversation = context.context
     conv.ask_allergy()
-    return conv.payload
\ No newline at end of file
+    return conv.payload
+
+# ─── Replay ───────────────────────────────────────────────────────────────────
+# Re-apply a recorded tool call straight to the FSM (used by the response
+# cache). Most tools fire the trigger of the same name with the same kwargs.
+
+_REPLAY_OVERRIDES = {
+    "confirm_selection": lambda conv, args: conv.confirm(),
+    "finish_booking": lambda conv, args: (
+        conv.finish_yes() if args.get("yes") else conv.finish_no()
+    ),
+}
+
+
+def replay_tool_call(conv: VaccineConversation, name: str, arguments: dict) -> bool:
+    override = _REPLAY_OVERRIDES.get(name)
+    if override is not None:
+        return override(conv, arguments)
+    return conv.trigger(name, **arguments)
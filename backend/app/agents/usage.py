@@ -0,0 +1,89 @@
+# backend/app/agents/usage.py
+"""
+Per-turn record of which model served which FSM state, how long it took and
+how many tokens it used, exported per (state, model) on /metrics.
+"""
+
+import logging
+import time
+from typing import Any
+
+from agents import RunHooks
+
+from app.metrics import LLM_CALL_SECONDS, LLM_TOKENS, MODEL_TURN_SECONDS, TOOL_SECONDS
+from app.tracing import end_span, start_span
+
+# Pseudo-models for turns resolved without an LLM call.
+FAST_PATH_MODEL = "fastpath"
+CACHE_MODEL = "cache"
+DEGRADED_MODEL = "degraded"
+
+
+class ModelUsageStats:
+    """
+    Per-turn log line plus chat_model_turn_seconds{state, model} on /metrics
+    (its _count is turns per model). Tokens and model requests are counted
+    per request by TurnMetricsHooks (chat_llm_tokens_total, chat_llm_call_seconds).
+    """
+
+    def record(
+        self,
+        state: str,
+        model: str,
+        seconds: float,
+        usage: Any = None,
+    ) -> None:
+        MODEL_TURN_SECONDS.labels(state, model).observe(seconds)
+        requests = getattr(usage, "requests", 0)
+        input_tokens = getattr(usage, "input_tokens", 0)
+        output_tokens = getattr(usage, "output_tokens", 0)
+        logging.info(
+            f"[Turn] state={state} model={model} seconds={seconds:.3f} "
+            f"requests={requests} input_tokens={input_tokens} output_tokens={output_tokens}"
+        )
+
+
+MODEL_USAGE_STATS = ModelUsageStats()
+
+
+class TurnMetricsHooks(RunHooks):
+    """
+    Run hooks for one agent turn: time every model request and tool call and
+    count tokens, labelled with the state the turn started in. Each model
+    request also gets an `llm.call` span when tracing is enabled.
+    """
+
+    def __init__(self, state: str):
+        self.state = state
+        self._llm_started: dict[str, float] = {}
+        self._llm_spans: dict[str, Any] = {}
+        self._tool_started: dict[str, float] = {}
+
+    async def on_llm_start(self, context, agent, system_prompt, input_items) -> None:
+        self._llm_started[agent.name] = time.perf_counter()
+        self._llm_spans[agent.name] = start_span(
+            "llm.call", state=self.state, agent=agent.name, model=str(agent.model)
+        )
+
+    async def on_llm_end(self, context, agent, response) -> None:
+        model = str(agent.model)
+        started = self._llm_started.pop(agent.name, None)
+        if started is not None:
+            LLM_CALL_SECONDS.labels(self.state, model).observe(time.perf_counter() - started)
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            LLM_TOKENS.labels(self.state, model, "prompt").inc(usage.input_tokens)
+            LLM_TOKENS.labels(self.state, model, "completion").inc(usage.output_tokens)
+        end_span(
+            self._llm_spans.pop(agent.name, None),
+            input_tokens=getattr(usage, "input_tokens", None),
+            output_tokens=getattr(usage, "output_tokens", None),
+        )
+
+    async def on_tool_start(self, context, agent, tool) -> None:
+        self._tool_started[getattr(context, "tool_call_id", None) or tool.name] = time.perf_counter()
+
+    async def on_tool_end(self, context, agent, tool, result) -> None:
+        started = self._tool_started.pop(getattr(context, "tool_call_id", None) or tool.name, None)
+        if started is not None:
+            TOOL_SECONDS.labels(self.state, tool.name).observe(time.perf_counter() - started)
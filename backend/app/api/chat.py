@@ -1,13 +1,48 @@
 # backend/app/api/chat.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+import asyncio
+import json
+import time
+import uuid
+import weakref
+from contextlib import ExitStack, asynccontextmanager
 
-from app.schemas import Chat as ChatSchema, Message as MessageSchema, MessageCreate
-from app.repositories.base import ChatNotFoundError
-from app.dependencies import get_message_repository, get_chat_service
-from app.repositories.base import IMessageRepository
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Optional
+
+from pydantic import ValidationError
+
+from app.schemas import (
+    Chat as ChatSchema,
+    Message as MessageSchema,
+    MessageCreate,
+    TurnJob as TurnJobSchema,
+)
+from app.agents.admission import OverloadedError
+from app.events import EVENT_HUB, set_origin
+from app.repositories.base import ChatNotFoundError, ConcurrentTurnError
+from app.dependencies import get_async_message_repository, get_chat_service, get_job_repository
+from app.repositories.base import IAsyncMessageRepository
+from app.repositories.jobs import JobRepository
 from app.services.chat_service import ChatService
+from app.services.turn_jobs import JOB_POLL_INTERVAL
+
+# Upper bound for `limit` on the paginated listings.
+MAX_PAGE_SIZE = 200
+# Longest a GET on a job may wait for it to finish (?wait=, seconds).
+MAX_JOB_WAIT = 30
+# Idle seconds after which an event stream sends a keep-alive comment.
+EVENTS_HEARTBEAT = 15
 
 router = APIRouter(
     prefix="/chats",
@@ -16,59 +51,360 @@ router = APIRouter(
 )
 
 
+def overloaded(exc: OverloadedError) -> HTTPException:
+    """429 (queue full) / 503 (queue wait timed out) with Retry-After."""
+    return HTTPException(
+        status_code=exc.status_code,
+        detail=str(exc),
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def overloaded_event(exc: OverloadedError) -> dict:
+    """The same rejection as an `error` event, once a stream has started."""
+    return {"status": exc.status_code, "detail": str(exc), "retry_after": exc.retry_after}
+
+
+def turn_conflict(chat_id: int) -> HTTPException:
+    """409: another turn of the chat was saved while this one ran; nothing was stored."""
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Chat with id={chat_id} was updated by another request; resend the message",
+    )
+
+
+def turn_conflict_event(chat_id: int) -> dict:
+    return {"status": status.HTTP_409_CONFLICT, "detail": turn_conflict(chat_id).detail}
+
+
 @router.post("/", response_model=ChatSchema, status_code=status.HTTP_201_CREATED)
-def create_chat(repo: IMessageRepository = Depends(get_message_repository)):
+async def create_chat(repo: IAsyncMessageRepository = Depends(get_async_message_repository)):
     """
     Create a new chat and return its metadata.
     """
-    return repo.create_chat()
+    return await repo.create_chat()
 
 
 @router.get("/", response_model=List[ChatSchema])
-def list_chats(repo: IMessageRepository = Depends(get_message_repository)):
+async def list_chats(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[int] = None,
+    repo: IAsyncMessageRepository = Depends(get_async_message_repository),
+):
     """
-    List all existing chats.
+    List chats in creation order. Paginate with `limit`, passing the last
+    id of a page as `after_id` to get the next one.
     """
-    return repo.list_chats()
+    return await repo.list_chats(limit=limit, after_id=after_id)
+
+
+def job_json(job, reply=None) -> dict:
+    """Serialise a turn job, with its reply message once it has one."""
+    data = TurnJobSchema.model_validate(job, from_attributes=True)
+    if reply is not None:
+        data.reply = MessageSchema.model_validate(reply, from_attributes=True)
+    return data.model_dump(mode="json")
 
 
 @router.post(
     "/{chat_id}/messages",
     response_model=MessageSchema,
     status_code=status.HTTP_201_CREATED,
+    responses={202: {"model": TurnJobSchema, "description": "Turn queued (CHAT_TURN_MODE=queue)"}},
 )
-def post_message(
+async def post_message(
     chat_id: int,
     message_in: MessageCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     service: ChatService = Depends(get_chat_service),
+    jobs: Optional[JobRepository] = Depends(get_job_repository),
 ):
     """
     Send a user message to a chat and receive the bot response.
+    With an `Idempotency-Key` header, repeating the request (e.g. a client
+    retry after a timeout) returns the assistant message stored the first
+    time instead of running the turn again.
+    Under LLM overload nothing is stored and 429/503 with Retry-After is
+    returned; 409 if another request on the chat was saved in the meantime.
+
+    With CHAT_TURN_MODE=queue the user message is stored, the turn is left
+    to a worker and the answer is 202 with the job (Location: its URL).
     """
     try:
-        return service.send_user_message(chat_id, message_in.content)
+        if jobs is not None:
+            job = await jobs.enqueue(chat_id, message_in.content, idempotency_key)
+            found = await jobs.get(chat_id, job.id) if job.reply_id is not None else None
+            return JSONResponse(
+                job_json(*found) if found else job_json(job),
+                status_code=status.HTTP_202_ACCEPTED,
+                headers={"Location": f"{router.prefix}/{chat_id}/jobs/{job.id}"},
+            )
+        return await service.send_user_message(chat_id, message_in.content, idempotency_key)
     except ChatNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Chat with id={chat_id} not found",
         )
+    except OverloadedError as exc:
+        raise overloaded(exc)
+    except ConcurrentTurnError:
+        raise turn_conflict(chat_id)
+
+
+@router.get("/{chat_id}/jobs/{job_id}", response_model=TurnJobSchema)
+async def get_job(
+    chat_id: int,
+    job_id: int,
+    wait: float = Query(0, ge=0, le=MAX_JOB_WAIT),
+    jobs: Optional[JobRepository] = Depends(get_job_repository),
+):
+    """
+    Status of a queued turn; `reply` is the assistant message once it is
+    `done`. With `wait` (seconds) the request is held until the job is done
+    or failed, or the time is up.
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        found = await jobs.get(chat_id, job_id) if jobs is not None else None
+        if found is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Job with id={job_id} not found in chat {chat_id}",
+            )
+        job, reply = found
+        remaining = deadline - time.monotonic()
+        if job.status in ("done", "failed") or remaining <= 0:
+            return job_json(job, reply)
+        await asyncio.sleep(min(JOB_POLL_INTERVAL, remaining))
+
+
+def message_json(message) -> dict:
+    """Serialise a stored message the way the REST endpoints do."""
+    return MessageSchema.model_validate(message, from_attributes=True).model_dump(mode="json")
+
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def own_repository():
+    """
+    A repository of its own (async context manager) for long-lived
+    connections, which must not hold a request-scoped DB session.
+    """
+    return asynccontextmanager(get_async_message_repository)()
+
+
+@router.post("/{chat_id}/messages/stream")
+async def stream_message(
+    chat_id: int,
+    message_in: MessageCreate,
+    service: ChatService = Depends(get_chat_service),
+):
+    """
+    Send a user message and stream the bot response as Server-Sent Events:
+    `token`, `tool` and `state` while the agent runs, then `reply`, and
+    `message` with the persisted assistant message once the turn is saved.
+    If the LLM queue is full the request gets 429 up front; if the turn then
+    times out waiting for a slot, or another request on the chat is saved
+    first, the stream ends with an `error` event.
+    """
+    try:
+        events = await service.open_stream(chat_id, message_in.content)
+    except ChatNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Chat with id={chat_id} not found",
+        )
+    except OverloadedError as exc:
+        raise overloaded(exc)
+
+    async def body():
+        try:
+            async for event, data in events:
+                if event == "message":
+                    data = message_json(data)
+                yield sse_event(event, data)
+        except OverloadedError as exc:
+            yield sse_event("error", overloaded_event(exc))
+        except ConcurrentTurnError:
+            yield sse_event("error", turn_conflict_event(chat_id))
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{chat_id}/events")
+async def chat_events(
+    chat_id: int,
+    since_id: Optional[int] = None,
+    last_event_id: Optional[int] = Header(None),
+):
+    """
+    Server-Sent Events for everything stored in a chat, whichever request,
+    API process or turn worker stored it: `message` (a new message, with the
+    message id as the event id) and `state` (the FSM state after a change).
+    Starts with the current `state`, then the messages after `since_id` (or
+    the `Last-Event-ID` of a reconnecting EventSource).
+    """
+    since_id = last_event_id if last_event_id is not None else since_id
+    # Subscribe before reading so nothing committed meanwhile is missed.
+    subscription = ExitStack()
+    queue = subscription.enter_context(EVENT_HUB.subscribe(chat_id))
+    try:
+        # A repository of its own: the stream must not keep a DB session.
+        async with own_repository() as repo:
+            state = await ChatService(repo).current_state(chat_id)
+            backlog = await repo.get_messages(chat_id, since_id=since_id) if since_id is not None else []
+    except ChatNotFoundError:
+        subscription.close()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Chat with id={chat_id} not found",
+        )
+    except BaseException:
+        subscription.close()
+        raise
+
+    def message_event(data: dict) -> str:
+        return f"id: {data['id']}\n" + sse_event("message", data)
+
+    async def body():
+        try:
+            yield sse_event("state", {"state": state})
+            sent = set()
+            for message in backlog:
+                sent.add(message.id)
+                yield message_event(message_json(message))
+            while True:
+                try:
+                    batch = await asyncio.wait_for(queue.get(), EVENTS_HEARTBEAT)
+                except TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                for event in batch["events"]:
+                    if event["type"] == "state":
+                        yield sse_event("state", {"state": event["state"]})
+                    elif event["message"]["id"] not in sent:
+                        yield message_event(event["message"])
+        finally:
+            subscription.close()
+
+    stream = body()
+    # Unsubscribe even if the response is dropped before the body starts.
+    weakref.finalize(stream, subscription.close)
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get(
     "/{chat_id}/messages",
     response_model=List[MessageSchema],
 )
-def get_messages(
+async def get_messages(
     chat_id: int,
-    repo: IMessageRepository = Depends(get_message_repository),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[int] = None,
+    since_id: Optional[int] = None,
+    repo: IAsyncMessageRepository = Depends(get_async_message_repository),
 ):
     """
-    Retrieve all messages for a given chat.
+    Retrieve the messages of a chat, oldest first.
+    `limit` + `after_id` page through the history; `since_id` returns only
+    messages newer than the last one the client has.
     """
     try:
-        return repo.get_messages(chat_id)
+        return await repo.get_messages(
+            chat_id, limit=limit, after_id=after_id, since_id=since_id
+        )
     except ChatNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Chat with id={chat_id} not found",
-        )
\ No newline at end of file
+        )
+
+@router.websocket("/{chat_id}/ws")
+async def chat_socket(websocket: WebSocket, chat_id: int):
+    """
+    Conversation channel for one chat. The client sends
+    {"role": "user", "content": "..."}; the server pushes the same events as
+    the SSE endpoint as JSON objects ({"type": "token" | "tool" | "state" |
+    "reply" | "message" | "error", ...}). On connect it sends the current state.
+    Messages and state changes stored by other clients of the chat are pushed
+    as `message` / `state` events too.
+    Each message gets its own repository, so an idle socket holds no DB session.
+    """
+    try:
+        async with own_repository() as repo:
+            state = await ChatService(repo).current_state(chat_id)
+    except ChatNotFoundError:
+        await websocket.close(
+            code=status.WS_1008_POLICY_VIOLATION,
+            reason=f"Chat with id={chat_id} not found",
+        )
+        return
+
+    await websocket.accept()
+    # Tags this connection's writes, so the hub does not echo them back.
+    origin = uuid.uuid4().hex
+    set_origin(origin)
+    sending = asyncio.Lock()
+
+    async def send(data: dict) -> None:
+        async with sending:
+            await websocket.send_json(data)
+
+    async def forward(queue: asyncio.Queue) -> None:
+        try:
+            while True:
+                batch = await queue.get()
+                if batch["origin"] == origin:
+                    continue
+                for event in batch["events"]:
+                    await send(event)
+        except (WebSocketDisconnect, RuntimeError):
+            pass    # the receive loop sees the disconnect too
+
+    await send({"type": "state", "state": state})
+    with EVENT_HUB.subscribe(chat_id) as queue:
+        pump = asyncio.create_task(forward(queue))
+        try:
+            await converse(websocket, chat_id, send)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            pump.cancel()
+
+
+async def converse(websocket: WebSocket, chat_id: int, send) -> None:
+    """The WebSocket's receive loop: one streamed turn per user message."""
+    while True:
+        try:
+            message_in = MessageCreate.model_validate(await websocket.receive_json())
+        except (ValidationError, ValueError) as exc:
+            await send({"type": "error", "detail": str(exc)})
+            continue
+        if message_in.role != "user":
+            # Assistant messages are only ever written by the turn itself.
+            await send({"type": "error", "detail": "Only messages with role 'user' can be sent"})
+            continue
+
+        try:
+            async with own_repository() as repo:
+                events = await ChatService(repo).open_stream(chat_id, message_in.content)
+                async for event, data in events:
+                    if event == "message":
+                        await send({"type": "message", "message": message_json(data)})
+                    else:
+                        await send({"type": event, **data})
+        except OverloadedError as exc:
+            await send({"type": "error", **overloaded_event(exc)})
+        except ConcurrentTurnError:
+            await send({"type": "error", **turn_conflict_event(chat_id)})
@@ -1,13 +1,18 @@
 # backend/app/database.py
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: objects returned after commit (e.g. by commit_turn)
+# are serialised without a per-object refresh SELECT.
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
 Base = declarative_base()
 
 def get_db():
@@ -15,4 +20,38 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# ─── Async engine (asyncpg) ───────────────────────────────────────────────────
+# Built on first use so the sync-only backends never need asyncpg installed.
+
+_async_sessionmaker: async_sessionmaker[AsyncSession] | None = None
+
+
+def async_database_url(url: str) -> str:
+    """postgresql:// or postgresql+psycopg2:// → postgresql+asyncpg://"""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+def get_async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        async_engine = create_async_engine(
+            os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL),
+            pool_pre_ping=True,
+        )
+        # expire_on_commit=False: returned rows stay readable after commit
+        # without an implicit (and, under asyncio, illegal) lazy refresh.
+        _async_sessionmaker = async_sessionmaker(
+            async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_sessionmaker
+
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
@@ -1,28 +1,61 @@
 # backend/app/dependencies.py
 
 import os
+from typing import AsyncIterator
 from fastapi import Depends, HTTPException
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from .database import get_db
-from .repositories.base import IMessageRepository
+from .database import SessionLocal, get_async_sessionmaker
+from .repositories.base import IAsyncMessageRepository
+from .repositories.jobs import JobRepository
 from .repositories.sql import SQLMessageRepository
-from .repositories.memory import InMemoryMessageRepository
+from .repositories.sql_async import AsyncSQLMessageRepository
+from .repositories.memory import MEMORY_REPOSITORY
+from .repositories.threaded import ThreadedMessageRepository
+from .repositories.traced import TracedMessageRepository
+from .tracing import TRACING_ENABLED
 from app.services.chat_service import ChatService
+from app.services.turn_jobs import QUEUE_ENABLED
 
-def get_message_repository(
-    db: Session = Depends(get_db),
-) -> IMessageRepository:
-    backend = os.getenv("REPOSITORY_BACKEND", "sql")
-    if backend.lower() == "memory":
-        return InMemoryMessageRepository()
-    return SQLMessageRepository(db)
+def repository_backend() -> str:
+    """REPOSITORY_BACKEND: sql (psycopg2, default) | sql_async (asyncpg) | memory"""
+    return os.getenv("REPOSITORY_BACKEND", "sql").lower()
+
+def _traced(repo: IAsyncMessageRepository, backend: str) -> IAsyncMessageRepository:
+    return TracedMessageRepository(repo, backend) if TRACING_ENABLED else repo
+
+async def get_async_message_repository() -> AsyncIterator[IAsyncMessageRepository]:
+    """
+    Repository used by the chat endpoints. Blocking backends are wrapped so
+    their calls run in the threadpool instead of on the event loop.
+    """
+    backend = repository_backend()
+    if backend == "sql_async":
+        async with get_async_sessionmaker()() as db:
+            yield _traced(AsyncSQLMessageRepository(db), backend)
+    elif backend == "memory":
+        # Shared process-wide store; its calls never block, so no threadpool hop.
+        yield _traced(ThreadedMessageRepository(MEMORY_REPOSITORY, blocking=False), backend)
+    else:
+        db = SessionLocal()
+        try:
+            yield _traced(ThreadedMessageRepository(SQLMessageRepository(db)), backend)
+        finally:
+            await run_in_threadpool(db.close)
 
 def get_chat_service(
-    repo: IMessageRepository = Depends(get_message_repository),
+    repo: IAsyncMessageRepository = Depends(get_async_message_repository),
 ) -> ChatService:
     """
     Injects ChatService using the repository. 
     (The service now handles its own agent/runner internally.)
     """
-    return ChatService(repo)
\ No newline at end of file
+    return ChatService(repo)
+
+async def get_job_repository() -> AsyncIterator[JobRepository | None]:
+    """Turn job queue (asyncpg session); None unless CHAT_TURN_MODE=queue."""
+    if not QUEUE_ENABLED:
+        yield None
+        return
+    async with get_async_sessionmaker()() as db:
+        yield JobRepository(db)
@@ -0,0 +1,240 @@
+# backend/app/events.py
+"""
+Chat events (new messages, FSM state changes) pushed to streaming clients.
+
+Repositories report what each commit wrote as a batch of events for one chat:
+
+  {"type": "message", "message": {...}}   a stored message (as the REST API returns it)
+  {"type": "state", "state": "..."}       the chat's FSM state after the write
+
+Every process keeps an EventHub that fans batches out to the streams
+subscribed to that chat (GET /chats/{id}/events, the WebSocket).
+
+CHAT_EVENTS_NOTIFY=false (default): batches are published to the hub of the
+process that made the write. Enough for one API process with inline turns.
+
+CHAT_EVENTS_NOTIFY=true: SQL repositories send each batch with pg_notify on
+CHAT_EVENTS_CHANNEL inside the writing transaction (delivered only if it
+commits), and every API process LISTENs and publishes what it receives, so
+replies written by other API processes or by queue workers reach every
+client. Postgres serializes committing transactions that NOTIFY, hence opt-in.
+Payloads over NOTIFY's size limit carry message ids only; the listener reads
+those messages back.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+
+from app.metrics import CHAT_EVENTS_DROPPED, CHAT_EVENT_STREAMS
+from app.schemas import Message as MessageSchema
+
+CHAT_EVENTS_NOTIFY = os.getenv("CHAT_EVENTS_NOTIFY", "false").lower() in ("1", "true", "yes")
+CHAT_EVENTS_CHANNEL = os.getenv("CHAT_EVENTS_CHANNEL", "chat_events")
+CHAT_EVENTS_QUEUE = int(os.getenv("CHAT_EVENTS_QUEUE", "256"))
+
+# NOTIFY payloads must stay under 8000 bytes.
+NOTIFY_MAX_BYTES = 7900
+
+# Which connection caused the writes of the current context, so a WebSocket
+# can skip events for messages it already sent itself.
+_origin: ContextVar[str | None] = ContextVar("event_origin", default=None)
+
+
+def set_origin(origin: str | None) -> None:
+    _origin.set(origin)
+
+
+def message_data(message) -> dict:
+    return MessageSchema.model_validate(message, from_attributes=True).model_dump(mode="json")
+
+
+def write_events(messages=(), state_name: str | None = None) -> list[dict]:
+    """Events for one commit: the messages it stored, then the resulting state."""
+    events = [{"type": "message", "message": message_data(m)} for m in messages]
+    if state_name is not None:
+        events.append({"type": "state", "state": state_name})
+    return events
+
+
+def event_batch(chat_id: int, events: list[dict]) -> dict:
+    return {"chat_id": chat_id, "origin": _origin.get(), "events": events}
+
+
+def notify_payload(chat_id: int, events: list[dict]) -> str:
+    payload = json.dumps(event_batch(chat_id, events))
+    if len(payload.encode()) <= NOTIFY_MAX_BYTES:
+        return payload
+    # Too large: send message ids; the listener loads the rows.
+    slim = [
+        {"type": "message", "message_id": e["message"]["id"]} if e["type"] == "message" else e
+        for e in events
+    ]
+    return json.dumps(event_batch(chat_id, slim))
+
+
+def notify_query(chat_id: int, events: list[dict]):
+    """SELECT pg_notify(...) to run in the writing transaction, before its commit."""
+    return select(func.pg_notify(CHAT_EVENTS_CHANNEL, notify_payload(chat_id, events)))
+
+
+# ─── Per-process fan-out ──────────────────────────────────────────────────────
+
+class EventHub:
+    """Subscribers per chat, each with a bounded queue of event batches."""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: dict[int, set[asyncio.Queue]] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @contextmanager
+    def subscribe(self, chat_id: int):
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._subscribers.setdefault(chat_id, set()).add(queue)
+        CHAT_EVENT_STREAMS.inc()
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers[chat_id]
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[chat_id]
+            CHAT_EVENT_STREAMS.dec()
+
+    def _deliver(self, batch: dict) -> None:
+        for queue in self._subscribers.get(batch["chat_id"], ()):
+            try:
+                queue.put_nowait(batch)
+            except asyncio.QueueFull:
+                # A stream that stopped reading; it can resync with since_id.
+                CHAT_EVENTS_DROPPED.inc()
+
+    def publish(self, batch: dict) -> None:
+        """Deliver a batch; safe to call from threadpool threads."""
+        if self._loop is None or self._loop.is_closed():
+            return      # nobody has subscribed on a running loop of this process
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._deliver(batch)
+        else:
+            self._loop.call_soon_threadsafe(self._deliver, batch)
+
+
+EVENT_HUB = EventHub(CHAT_EVENTS_QUEUE)
+
+
+def publish_local(chat_id: int, events: list[dict]) -> None:
+    """After a commit: hand the events to this process's streams (unless NOTIFY carries them)."""
+    if events and not CHAT_EVENTS_NOTIFY:
+        EVENT_HUB.publish(event_batch(chat_id, events))
+
+
+# ─── LISTEN side ──────────────────────────────────────────────────────────────
+
+class EventListener:
+    """
+    Holds one asyncpg connection LISTENing on CHAT_EVENTS_CHANNEL and
+    publishes every batch to EVENT_HUB; reconnects if the connection drops.
+    """
+
+    def __init__(self, dsn: str, load_messages):
+        self.dsn = dsn
+        self.load_messages = load_messages      # async (ids) -> {id: message}
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _consume(self, received: asyncio.Queue) -> None:
+        while True:
+            payload = await received.get()
+            try:
+                await self._receive(payload)
+            except Exception:
+                logging.exception("[Events] bad notification dropped")
+
+    async def _receive(self, payload: str) -> None:
+        batch = json.loads(payload)
+        missing = [e["message_id"] for e in batch["events"] if "message_id" in e]
+        if missing:
+            rows = await self.load_messages(missing)
+            batch["events"] = [
+                {"type": "message", "message": message_data(rows[e["message_id"]])}
+                if "message_id" in e else e
+                for e in batch["events"]
+                if "message_id" not in e or e["message_id"] in rows
+            ]
+        EVENT_HUB.publish(batch)
+
+    async def _run(self) -> None:
+        import asyncpg
+
+        delay = 1.0
+        while True:
+            lost = asyncio.Event()
+            try:
+                conn = await asyncpg.connect(self.dsn)
+            except (OSError, asyncpg.PostgresError) as exc:
+                logging.warning(f"[Events] listener cannot connect ({exc!r}); retry in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+                continue
+            delay = 1.0
+            # One consumer per connection keeps batches in commit order.
+            received: asyncio.Queue = asyncio.Queue()
+            consumer = asyncio.create_task(self._consume(received))
+
+            def on_notify(_conn, _pid, _channel, payload):
+                received.put_nowait(payload)
+
+            conn.add_termination_listener(lambda _conn: lost.set())
+            try:
+                await conn.add_listener(CHAT_EVENTS_CHANNEL, on_notify)
+                logging.info(f"[Events] listening on {CHAT_EVENTS_CHANNEL!r}")
+                await lost.wait()
+                # Events sent while reconnecting are lost; streams resync with since_id.
+                logging.warning("[Events] listener connection lost; reconnecting")
+            finally:
+                consumer.cancel()
+                await conn.close()
+
+
+def listener_dsn(database_url: str) -> str:
+    """SQLAlchemy URL (any postgres driver) → plain libpq DSN for asyncpg."""
+    return make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+async def load_messages(ids: list[int]) -> dict:
+    from app.database import get_async_sessionmaker
+    from app.models import Message as MessageModel
+
+    async with get_async_sessionmaker()() as db:
+        rows = await db.scalars(select(MessageModel).where(MessageModel.id.in_(ids)))
+        return {m.id: m for m in rows}
+
+
+def start_listener() -> EventListener:
+    from app.database import DATABASE_URL
+
+    listener = EventListener(listener_dsn(DATABASE_URL), load_messages)
+    listener.start()
+    return listener
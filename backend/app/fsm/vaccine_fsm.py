@@ -1,183 +1,190 @@
 # backend/app/fsm/vaccine_fsm.py
 
-from transitions import Machine, State
-from datetime import datetime, timedelta
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
+
+from app.metrics import FSM_TRANSITIONS
 from app.repositories.memory import InMemorySlotRepository
 
 
+class Transition(NamedTuple):
+    """One edge of the FSM; callbacks are names of VaccineConversation methods."""
+    trigger: str
+    source: str
+    dest: str
+    conditions: tuple[str, ...] = ()
+    unless: tuple[str, ...] = ()
+    before: tuple[str, ...] = ()
+    after: tuple[str, ...] = ()
+
+
+class EventData(NamedTuple):
+    """What callbacks and conditions receive (mirrors `transitions`' send_event)."""
+    trigger: str
+    kwargs: dict
+
+
+STATES: tuple[str, ...] = (
+    "start",
+    "awaiting_intent",
+    "asked_name",
+    "got_name",
+    "got_age",
+    "awaiting_allergy_response",
+    "eligible",
+    "ineligible",
+    "offered_slots",
+    "awaiting_selection",
+    "confirming",
+    "completed",
+    "abort",
+    "fallback",
+)
+
+TRANSITIONS: tuple[Transition, ...] = (
+    # ─── Intent ───────────────────────────────────────────────────────────────
+    Transition("ask_intent", "start", "awaiting_intent"),
+    Transition("affirm_intent", "awaiting_intent", "asked_name"),
+    Transition("deny_intent", "awaiting_intent", "abort"),
+    Transition("unclear_intent", "awaiting_intent", "fallback"),
+
+    # ─── Name ─────────────────────────────────────────────────────────────────
+    Transition("provide_name", "asked_name", "got_name", before=("set_name",)),
+    Transition("invalid_name", "asked_name", "fallback"),
+
+    # ─── Age & Ask Allergy ────────────────────────────────────────────────────
+    Transition("provide_age", "got_name", "got_age", before=("set_age",)),
+    Transition("ask_allergy", "got_age", "awaiting_allergy_response"),
+    Transition("invalid_age", "got_age", "fallback"),
+
+    # ─── Allergy Answer ───────────────────────────────────────────────────────
+    Transition(
+        "answer_allergy", "awaiting_allergy_response", "ineligible",
+        conditions=("is_allergic_true",), before=("set_allergy",),
+    ),
+    Transition(
+        "answer_allergy", "awaiting_allergy_response", "eligible",
+        conditions=("is_allergic_false",), before=("set_allergy",),
+        after=("offer_slots",),
+    ),
+    Transition("unclear_allergy", "awaiting_allergy_response", "fallback"),
+
+    # ─── Slot Selection ──────────────────────────────────────────────────────
+    # (offer_slots itself moves eligible → offered_slots)
+    Transition(
+        "select_slot", "offered_slots", "awaiting_selection",
+        conditions=("is_valid_slot",), before=("set_selected_slot",),
+    ),
+    Transition(
+        "select_slot", "offered_slots", "offered_slots",
+        unless=("is_valid_slot",), before=("set_selected_slot",),
+    ),
+    Transition("invalid_slot", "offered_slots", "fallback"),
+
+    # ─── Confirmation ────────────────────────────────────────────────────────
+    Transition("confirm", "awaiting_selection", "confirming"),
+
+    # ─── Finish Booking ───────────────────────────────────────────────────────
+    Transition("finish_yes", "confirming", "completed"),
+    Transition("finish_no", "confirming", "offered_slots"),
+    Transition("reopen_slots", "confirming", "offered_slots"),
+
+    # ─── Early Cancel & Fallback ──────────────────────────────────────────────
+    Transition("early_cancel", "*", "abort"),
+    Transition("restart_after_fallback", "fallback", "start"),
+)
+
+
+def _compile(
+    transitions: tuple[Transition, ...],
+) -> Mapping[str, Mapping[str, tuple[Transition, ...]]]:
+    """
+    Build the read-only lookup trigger -> source state -> candidate transitions.
+    Candidates keep declaration order; the first whose conditions hold wins.
+    """
+    table: dict[str, dict[str, list[Transition]]] = {}
+    for t in transitions:
+        if t.dest not in STATES:
+            raise ValueError(f"Unknown destination state {t.dest!r} for {t.trigger!r}")
+        sources = STATES if t.source == "*" else (t.source,)
+        for source in sources:
+            table.setdefault(t.trigger, {}).setdefault(source, []).append(t)
+    return MappingProxyType({
+        trigger: MappingProxyType({src: tuple(ts) for src, ts in by_source.items()})
+        for trigger, by_source in table.items()
+    })
+
+
+# Compiled once per process and shared by every conversation.
+TRANSITION_TABLE = _compile(TRANSITIONS)
+
+_DEFAULT_SLOT_REPO = InMemorySlotRepository()
+
+# Labelled FSM_TRANSITIONS children, resolved once per (source, transition).
+_TRANSITION_COUNTERS: dict = {}
+
+
+def _transition_counter(source: str, t: Transition):
+    counter = _TRANSITION_COUNTERS.get((source, t))
+    if counter is None:
+        counter = _TRANSITION_COUNTERS[(source, t)] = FSM_TRANSITIONS.labels(source, t.trigger, t.dest)
+    return counter
+
+
 class VaccineConversation:
     """
     FSM for guiding a user through scheduling an influenza vaccination.
     Payload holds: name, age, allergy (bool), slots (list of str), selected_slot.
+
+    Instances only carry `state` and `payload`; the transition graph lives in
+    the module-level TRANSITION_TABLE, so creating one per turn is cheap.
+    Triggers the current state does not accept are ignored (return False).
+
+    Metric updates of the turn (transitions taken, the path that answered)
+    wait in `pending_metrics` until count_turn(), called once the turn is
+    saved: steps undone with rollback() or turns never saved are not counted.
     """
 
-    states = [
-        State(name="start"),
-        State(name="awaiting_intent"),
-        State(name="asked_name"),
-        State(name="got_name"),
-        State(name="got_age"),
-        State(name="awaiting_allergy_response"),
-        State(name="eligible"),
-        State(name="ineligible"),
-        State(name="offered_slots"),
-        State(name="awaiting_selection"),
-        State(name="confirming"),
-        State(name="completed"),
-        State(name="abort"),
-        State(name="fallback"),
-    ]
-
-    def __init__(self, payload: dict | None = None, slot_repo=None):
+    __slots__ = ("state", "payload", "slot_repo", "pending_metrics")
+
+    states = STATES
+
+    def __init__(self, payload: dict | None = None, slot_repo=None, state: str = "start"):
         self.payload = payload or {}
-        self.state = "start"
-        self.slot_repo = slot_repo or InMemorySlotRepository()
-
-        # ignore_invalid_triggers lets us call e.g. early_cancel()
-        self.machine = Machine(
-            model=self,
-            states=VaccineConversation.states,
-            initial="start",
-            send_event=True,
-            auto_transitions=False,
-            ignore_invalid_triggers=True,
-        )
-
-        # ─── Intent ───────────────────────────────────────────────────────────────
-        self.machine.add_transition(
-            trigger="ask_intent",
-            source="start",
-            dest="awaiting_intent",
-        )
-        self.machine.add_transition(
-            trigger="affirm_intent",
-            source="awaiting_intent",
-            dest="asked_name",
-        )
-        self.machine.add_transition(
-            trigger="deny_intent",
-            source="awaiting_intent",
-            dest="abort",
-        )
-        self.machine.add_transition(
-            trigger="unclear_intent",
-            source="awaiting_intent",
-            dest="fallback",
-        )
-
-        # ─── Name ─────────────────────────────────────────────────────────────────
-        self.machine.add_transition(
-            trigger="provide_name",
-            source="asked_name",            
-            dest="got_name",
-            before="set_name",
-        )
-        self.machine.add_transition(
-            trigger="invalid_name",
-            source="asked_name",
-            dest="fallback",
-        )
-
-        # ─── Age & Ask Allergy ────────────────────────────────────────────────────
-        # after provide_age → got_age
-        self.machine.add_transition(
-            trigger="provide_age",
-            source="got_name",
-            dest="got_age",
-            before="set_age",
-        )
-
-        # then this ask_allergy trigger
-        self.machine.add_transition(
-            trigger="ask_allergy",
-            source="got_age",
-            dest="awaiting_allergy_response",
-        )
-        self.machine.add_transition(
-            trigger="invalid_age",
-            source="got_age",
-            dest="fallback",
-        )
-
-        # ─── Allergy Answer ───────────────────────────────────────────────────────
-        self.machine.add_transition(
-            trigger="answer_allergy",
-            source="awaiting_allergy_response",
-            dest="ineligible",
-            conditions="is_allergic_true",
-            before="set_allergy",
-        )
-        self.machine.add_transition(
-            trigger="answer_allergy",
-            source="awaiting_allergy_response",
-            dest="eligible",
-            conditions="is_allergic_false",
-            before="set_allergy",
-            after="offer_slots",
-        )
-        self.machine.add_transition(
-            trigger="unclear_allergy",
-            source="awaiting_allergy_response",
-            dest="fallback",
-        )
-
-        # ─── Slot Selection ──────────────────────────────────────────────────────
-        # (offer_slots itself will call to_offered_slots())
-        self.machine.add_transition(
-            trigger="select_slot",
-            source="offered_slots",
-            dest="awaiting_selection",
-            conditions="is_valid_slot",
-            before="set_selected_slot",
-        )
-        self.machine.add_transition(
-            trigger="select_slot",
-            source="offered_slots",
-            dest="offered_slots",
-            unless="is_valid_slot",
-            before="set_selected_slot",
-        )
-        self.machine.add_transition(
-            trigger="invalid_slot",
-            source="offered_slots",
-            dest="fallback",
-        )
-
-        # ─── Confirmation ────────────────────────────────────────────────────────
-        self.machine.add_transition(
-            trigger="confirm",
-            source="awaiting_selection",
-            dest="confirming",
-        )
-
-        # ─── Finish Booking ───────────────────────────────────────────────────────
-        self.machine.add_transition(
-            trigger="finish_yes",
-            source="confirming",
-            dest="completed",
-        )
-        self.machine.add_transition(
-            trigger="finish_no",
-            source="confirming",
-            dest="offered_slots",
-        )
-        self.machine.add_transition(
-            trigger="reopen_slots",
-            source="confirming",
-            dest="offered_slots",
-        )
-
-        # ─── Early Cancel & Fallback ──────────────────────────────────────────────
-        self.machine.add_transition(
-            trigger="early_cancel",
-            source="*",
-            dest="abort",
-        )
-        self.machine.add_transition(
-            trigger="restart_after_fallback",
-            source="fallback",
-            dest="start",
-        )
+        self.state = state
+        self.slot_repo = slot_repo or _DEFAULT_SLOT_REPO
+        self.pending_metrics: list = []
+
+    def trigger(self, trigger: str, /, **kwargs) -> bool:
+        candidates = TRANSITION_TABLE.get(trigger, {}).get(self.state, ())
+        event = EventData(trigger=trigger, kwargs=kwargs)
+        for t in candidates:
+            if not all(getattr(self, c)(event) for c in t.conditions):
+                continue
+            if any(getattr(self, u)(event) for u in t.unless):
+                continue
+            for cb in t.before:
+                getattr(self, cb)(event)
+            self.pending_metrics.append(_transition_counter(self.state, t).inc)
+            self.state = t.dest
+            for cb in t.after:
+                getattr(self, cb)(event)
+            return True
+        return False
+
+    def checkpoint(self) -> tuple:
+        """What rollback() restores if a tentative step (fast path, cache replay) is abandoned."""
+        return self.state, dict(self.payload), len(self.pending_metrics)
+
+    def rollback(self, checkpoint: tuple) -> None:
+        self.state, self.payload, pending = checkpoint
+        del self.pending_metrics[pending:]
+
+    def count_turn(self) -> None:
+        """Apply the turn's pending metric updates; call once the turn is committed."""
+        for update in self.pending_metrics:
+            update()
+        self.pending_metrics.clear()
 
     # ─── CALLBACKS & CONDITIONS ─────────────────────────────────────────────────
 
@@ -200,7 +207,7 @@ class VaccineConversation:
     def offer_slots(self, event):
         slots = self.slot_repo.get_next_slots(days=3, per_day=3)
         self.payload["slots"] = slots
-        self.to_offered_slots()
+        self.state = "offered_slots"
 
     def set_selected_slot(self, event):
         choice = int(event.kwargs.get("choice"))
@@ -216,4 +223,17 @@ class VaccineConversation:
             slots = self.payload.get("slots", [])
             return 0 <= idx < len(slots)
         except Exception:
-            return False
\ No newline at end of file
+            return False
+
+
+def _make_trigger(name: str):
+    def fire(self: VaccineConversation, **kwargs) -> bool:
+        return self.trigger(name, **kwargs)
+    fire.__name__ = name
+    return fire
+
+
+# Bind one method per trigger (conv.ask_intent(), conv.select_slot(choice=2), …)
+for _name in TRANSITION_TABLE:
+    setattr(VaccineConversation, _name, _make_trigger(_name))
+del _name
@@ -0,0 +1,132 @@
+# backend/app/logs.py
+"""
+Logging setup: records are handed to a bounded queue and written by a
+background thread, so a turn never waits on stderr/disk I/O.
+
+LOG_FORMAT        text (default, "HH:MM:SS message") | json (one object per line)
+LOG_LEVEL         root level (INFO)
+LOG_QUEUE_SIZE    records buffered before new ones are dropped (10000)
+LOG_DUMP_SAMPLE   fraction of agent turns that dump prompt/tools/history (1.0)
+LOG_FIELD_MAX     characters kept per string in a dumped field (1000)
+LOG_DUMP_ITEMS    most recent list items kept in a dumped field (6)
+
+Dumps use a bounded repr (reprlib), so their cost does not grow with the
+length of the chat, and unsampled turns skip building them at all.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import reprlib
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_DUMP_SAMPLE = float(os.getenv("LOG_DUMP_SAMPLE", "1"))
+LOG_FIELD_MAX = int(os.getenv("LOG_FIELD_MAX", "1000"))
+LOG_DUMP_ITEMS = int(os.getenv("LOG_DUMP_ITEMS", "6"))
+
+_repr = reprlib.Repr()
+_repr.maxstring = LOG_FIELD_MAX
+_repr.maxother = LOG_FIELD_MAX
+_repr.maxlist = _repr.maxtuple = LOG_DUMP_ITEMS
+_repr.maxdict = 20
+_repr.maxlevel = 4
+
+
+def bounded_repr(value) -> str:
+    """repr() capped in string length and item count; lists keep their tail."""
+    if isinstance(value, str):
+        if len(value) <= LOG_FIELD_MAX:
+            return value
+        return f"{value[:LOG_FIELD_MAX]}…(+{len(value) - LOG_FIELD_MAX} chars)"
+    if isinstance(value, list) and len(value) > LOG_DUMP_ITEMS:
+        hidden = len(value) - LOG_DUMP_ITEMS
+        return f"[<{hidden} earlier>, {_repr.repr(value[-LOG_DUMP_ITEMS:])[1:]}"
+    return _repr.repr(value)
+
+
+def dump_sampled() -> bool:
+    """Whether this turn should dump its prompt/history (decide once per turn)."""
+    if not logging.getLogger().isEnabledFor(logging.INFO):
+        return False
+    return LOG_DUMP_SAMPLE >= 1 or random.random() < LOG_DUMP_SAMPLE
+
+
+def log_dump(tag: str, **fields) -> None:
+    """Log verbose fields under a [Tag]; callers check dump_sampled() first."""
+    logging.info(f"[{tag}]", extra={"fields": {k: bounded_repr(v) for k, v in fields.items()}})
+
+
+# ─── Formatters ───────────────────────────────────────────────────────────────
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(message)s", datefmt="%H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+# ─── Queue handler ────────────────────────────────────────────────────────────
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when full."""
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: QueueListener | None = None
+
+
+def configure_logging() -> None:
+    """
+    Route the root logger through the queue. Like basicConfig, this is a
+    no-op when the root logger already has handlers.
+    """
+    global _listener
+    root = logging.getLogger()
+    if root.handlers:
+        return
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    q: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    root.addHandler(DroppingQueueHandler(q))
+    root.setLevel(LOG_LEVEL)
+
+    _listener = QueueListener(q, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -1,10 +1,14 @@
 # backend/app/main.py
 
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
 from . import database, models, crud, schemas
 import pydantic
 from .api.chat import router as chat_router
+from .agents.factory import warm_agents
+from .events import CHAT_EVENTS_NOTIFY, start_listener
+from .metrics import render_metrics
+from .tracing import setup_tracing
 
 app = FastAPI()
 
@@ -19,8 +23,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Also enables FastAPI's request spans, which only record with a provider set.
+setup_tracing()
+
 app.include_router(chat_router)
 
+@app.on_event("startup")
+def prebuild_agents():
+    # Build every per-state agent up front so no request pays for it.
+    warm_agents()
+
+if CHAT_EVENTS_NOTIFY:
+    @app.on_event("startup")
+    async def listen_chat_events():
+        # Events committed by any API process or turn worker reach this one's streams.
+        app.state.event_listener = start_listener()
+
+    @app.on_event("shutdown")
+    async def stop_chat_events():
+        await app.state.event_listener.stop()
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/hello", response_model=schemas.Message)
 def hello():
     return {"message": "Hello from FastAPI!"}
@@ -0,0 +1,184 @@
+# backend/app/metrics.py
+"""
+Prometheus metrics for the chat turn, served as text on /metrics.
+
+Where the time goes, per FSM state (the state the turn started in):
+  chat_turn_seconds{state}                  whole turn, DB included
+  chat_turn_phase_seconds{state, phase}     db_load | agent_run | db_commit
+  chat_llm_call_seconds{state, model}       each model request inside a run
+  chat_model_turn_seconds{state, model}     each turn by who answered it (a model, or
+                                            fastpath | cache | degraded)
+  chat_tool_seconds{state, tool}            each function_tool execution
+  chat_turn_path_total{state, path}         fastpath | cache | agent | degraded
+  chat_fastpath_saved_seconds_total{state}  estimated agent time fast-path hits saved
+  (these two and fsm_transitions_total count saved turns only; see
+  VaccineConversation.count_turn)
+
+Where the money goes:
+  chat_llm_tokens_total{state, model, kind} kind = prompt | completion
+
+Response cache (RESPONSE_CACHE_ENABLED):
+  chat_response_cache_lookups_total{result} hit | miss
+  chat_response_cache_evictions_total       entries pushed out by RESPONSE_CACHE_SIZE
+  chat_response_cache_entries               entries held
+
+FSM:
+  fsm_transitions_total{state, trigger, dest}  (state = source state)
+
+LLM admission control:
+  chat_llm_queue_depth{model}               turns waiting for a slot
+  chat_llm_in_flight{model}                 agent runs holding a slot
+  chat_llm_queue_wait_seconds{model}        time spent waiting for a slot
+  chat_llm_rejected_total{model, reason}    reason = queue_full | timeout
+
+LLM resilience:
+  chat_llm_failures_total{model, reason}    timeout | error | slow
+  chat_llm_hedged_total{model, winner}      winner = first | hedge
+  chat_llm_circuit_open{model}              1 while the model's breaker is open
+
+Turn serialization:
+  chat_turn_lock_wait_seconds               time a turn queued behind another turn of its chat
+  chat_turn_conflicts_total                 turns refused (409): another worker committed first
+  chat_turn_replays_total                   retried requests answered with the stored reply
+  chat_turn_coalesced_total                 messages answered by a turn another message opened
+
+Queued turns (CHAT_TURN_MODE=queue, reported by the worker processes, each
+serving its own /metrics on JOB_METRICS_PORT):
+  chat_jobs_total{outcome}                  done | retried | failed
+  chat_job_wait_seconds                     queued (or due again) → claimed by a worker
+
+Pushed chat events (app/events.py):
+  chat_event_streams                        streams subscribed to chat events
+  chat_events_dropped_total                 event batches dropped for a stream that fell behind
+
+Fallback rate per state, e.g.:
+  sum by (state) (rate(fsm_transitions_total{dest="fallback"}[5m]))
+    / sum by (state) (rate(chat_turn_seconds_count[5m]))
+
+With several worker processes set PROMETHEUS_MULTIPROC_DIR so /metrics
+aggregates all of them.
+"""
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+
+# Turns range from sub-millisecond fast-path hits to multi-second agent runs.
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+TURN_SECONDS = Histogram(
+    "chat_turn_seconds", "Whole turn latency", ["state"], buckets=LATENCY_BUCKETS
+)
+TURN_PHASE_SECONDS = Histogram(
+    "chat_turn_phase_seconds", "Turn latency by phase", ["state", "phase"], buckets=LATENCY_BUCKETS
+)
+TURN_PATH = Counter(
+    "chat_turn_path", "How turns were resolved", ["state", "path"]
+)
+FAST_PATH_SAVED_SECONDS = Counter(
+    "chat_fastpath_saved_seconds", "Estimated agent-run time saved by fast-path hits", ["state"]
+)
+LLM_CALL_SECONDS = Histogram(
+    "chat_llm_call_seconds", "Latency of each model request", ["state", "model"], buckets=LATENCY_BUCKETS
+)
+MODEL_TURN_SECONDS = Histogram(
+    "chat_model_turn_seconds", "Turn latency by the model that answered", ["state", "model"],
+    buckets=LATENCY_BUCKETS,
+)
+TOOL_SECONDS = Histogram(
+    "chat_tool_seconds", "Latency of each tool call", ["state", "tool"], buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "chat_llm_tokens", "Model tokens used", ["state", "model", "kind"]
+)
+CACHE_LOOKUPS = Counter(
+    "chat_response_cache_lookups", "Response cache lookups", ["result"]
+)
+CACHE_EVICTIONS = Counter(
+    "chat_response_cache_evictions", "Response cache entries evicted (LRU)"
+)
+CACHE_ENTRIES = Gauge(
+    "chat_response_cache_entries", "Entries in the response cache", multiprocess_mode="livesum"
+)
+FSM_TRANSITIONS = Counter(
+    "fsm_transitions", "FSM transitions taken", ["state", "trigger", "dest"]
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "chat_llm_queue_depth", "Turns waiting for an LLM slot", ["model"], multiprocess_mode="livesum"
+)
+LLM_IN_FLIGHT = Gauge(
+    "chat_llm_in_flight", "Agent runs holding an LLM slot", ["model"], multiprocess_mode="livesum"
+)
+LLM_QUEUE_WAIT_SECONDS = Histogram(
+    "chat_llm_queue_wait_seconds", "Time waiting for an LLM slot", ["model"], buckets=LATENCY_BUCKETS
+)
+LLM_REJECTED = Counter(
+    "chat_llm_rejected", "Turns rejected by admission control", ["model", "reason"]
+)
+LLM_FAILURES = Counter(
+    "chat_llm_failures", "Failed or too slow model requests", ["model", "reason"]
+)
+LLM_HEDGED = Counter(
+    "chat_llm_hedged", "Model requests that sent a hedge", ["model", "winner"]
+)
+LLM_CIRCUIT_OPEN = Gauge(
+    "chat_llm_circuit_open", "Circuit breaker open (1) or closed (0)", ["model"], multiprocess_mode="max"
+)
+
+TURN_LOCK_WAIT_SECONDS = Histogram(
+    "chat_turn_lock_wait_seconds", "Time waiting for the chat's previous turn", buckets=LATENCY_BUCKETS
+)
+TURN_CONFLICTS = Counter(
+    "chat_turn_conflicts", "Turns refused because another turn of the chat committed first"
+)
+TURN_REPLAYS = Counter(
+    "chat_turn_replays", "Retried requests answered with the stored reply"
+)
+TURN_COALESCED = Counter(
+    "chat_turn_coalesced", "Messages merged into a turn opened by an earlier message"
+)
+JOBS = Counter(
+    "chat_jobs", "Queued turn jobs by outcome", ["outcome"]
+)
+JOB_WAIT_SECONDS = Histogram(
+    "chat_job_wait_seconds", "Time a turn job waited for a worker", buckets=LATENCY_BUCKETS
+)
+
+CHAT_EVENT_STREAMS = Gauge(
+    "chat_event_streams", "Streams subscribed to chat events", multiprocess_mode="livesum"
+)
+CHAT_EVENTS_DROPPED = Counter(
+    "chat_events_dropped", "Event batches dropped for a stream that fell behind"
+)
+
+
+def observe_phase(state: str, phase: str, seconds: float) -> None:
+    TURN_PHASE_SECONDS.labels(state, phase).observe(seconds)
+
+
+def _registry() -> CollectorRegistry:
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """(body, content type) in the Prometheus text exposition format."""
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+def serve_metrics(port: int) -> None:
+    """/metrics on its own HTTP port, for processes without the API (the turn worker)."""
+    start_http_server(port, registry=_registry())
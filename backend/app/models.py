@@ -1,6 +1,6 @@
 # backend/app/models.py
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index
 from sqlalchemy.dialects.postgresql import JSONB
 from .database import Base
 from datetime import datetime
@@ -15,18 +15,34 @@ class Item(Base):
 class Chat(Base):
     __tablename__ = "chats"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 
 class Message(Base):
     __tablename__ = "messages"
 
-    id = Column(Integer, primary_key=True, index=True)
-    chat_id = Column(Integer, ForeignKey("chats.id"), nullable=False, index=True)
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(Integer, ForeignKey("chats.id"), nullable=False)
     role = Column(String, nullable=False)               # "user" o "assistant"
     content = Column(Text, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Client-supplied Idempotency-Key of the request that posted this user message.
+    idempotency_key = Column(String, nullable=True)
+
+    __table_args__ = (
+        # History in (timestamp, id) order per chat: full reads, latest-N, cursor pages.
+        # Its chat_id prefix also serves the foreign key, so no separate index.
+        Index("ix_messages_chat_id_timestamp_id", "chat_id", "timestamp", "id"),
+        # A key is accepted once per chat; a retried request finds the stored turn.
+        Index(
+            "uq_messages_chat_id_idempotency_key",
+            "chat_id",
+            "idempotency_key",
+            unique=True,
+            postgresql_where=idempotency_key.isnot(None),
+        ),
+    )
 
 
 class ConversationState(Base):
@@ -36,10 +52,66 @@ class ConversationState(Base):
     """
     __tablename__ = "conversation_states"
 
-    chat_id       = Column(Integer, ForeignKey("chats.id"), primary_key=True, index=True)
-    state_name    = Column(String, nullable=False)
+    chat_id       = Column(Integer, ForeignKey("chats.id"), primary_key=True)
+    state_name    = Column(String, nullable=False, index=True)
     name          = Column(String, nullable=True)
     age           = Column(Integer, nullable=True)
     allergy       = Column(Boolean, nullable=True)
     selected_slot = Column(String, nullable=True)
-    payload       = Column(JSONB, nullable=False, default=dict)
\ No newline at end of file
+    payload       = Column(JSONB, nullable=False, default=dict)
+    # Running summary of turns that fell out of the prompt window,
+    # covering messages up to and including summary_upto_id.
+    summary         = Column(Text, nullable=True)
+    summary_upto_id = Column(Integer, nullable=True)
+    # Bumped on every write (apply_conversation_state); an UPDATE from a
+    # stale read matches no row (optimistic locking, see commit_turn).
+    version         = Column(Integer, nullable=False, server_default="1")
+
+    __table_args__ = (
+        # Only booked chats carry a slot; keep the index to those rows.
+        Index(
+            "ix_conversation_states_selected_slot",
+            "selected_slot",
+            postgresql_where=selected_slot.isnot(None),
+        ),
+    )
+    # Set explicitly so even a write that changes nothing else moves it.
+    __mapper_args__ = {"version_id_col": version, "version_id_generator": False}
+
+
+class TurnJob(Base):
+    """
+    A queued agent turn (CHAT_TURN_MODE=queue): the user message is stored
+    when the job is enqueued; a worker process answers it and sets reply_id.
+    """
+    __tablename__ = "turn_jobs"
+
+    id          = Column(Integer, primary_key=True)
+    chat_id     = Column(Integer, ForeignKey("chats.id"), nullable=False)
+    message_id  = Column(Integer, ForeignKey("messages.id"), nullable=False, unique=True)
+    status      = Column(String, nullable=False, default="queued")  # queued | running | done | failed
+    attempts    = Column(Integer, nullable=False, default=0)
+    run_after   = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at  = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at  = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    reply_id    = Column(Integer, ForeignKey("messages.id"), nullable=True)
+    error       = Column(Text, nullable=True)
+
+    __table_args__ = (
+        # Per-chat lookups: is a turn running, which jobs to claim together.
+        Index("ix_turn_jobs_chat_id_status", "chat_id", "status"),
+        # Workers scan only what is waiting (oldest first) or possibly
+        # abandoned by a crashed worker; finished jobs stay out of both.
+        Index(
+            "ix_turn_jobs_queued_run_after",
+            "run_after",
+            "id",
+            postgresql_where=status == "queued",
+        ),
+        Index(
+            "ix_turn_jobs_running_started_at",
+            "started_at",
+            postgresql_where=status == "running",
+        ),
+    )
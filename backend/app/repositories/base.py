@@ -1,8 +1,13 @@
 # backend/app/repositories/base.py
 
 from abc import ABC, abstractmethod
-from typing import List
-from app.models import Chat as ChatModel, Message as MessageModel
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+from app.models import (
+    Chat as ChatModel,
+    Message as MessageModel,
+    ConversationState as ConversationStateModel,
+)
 
 
 class ChatNotFoundError(Exception):
@@ -10,6 +15,34 @@ class ChatNotFoundError(Exception):
     pass
 
 
+class ConcurrentTurnError(Exception):
+    """
+    Raised by commit_turn when another turn of the same chat committed since
+    this one was loaded (or already stored its idempotency key).
+    Nothing from the losing turn is saved.
+    """
+    pass
+
+
+class PendingMessage(NamedTuple):
+    """A message written as part of a turn (see commit_turn)."""
+    role: str
+    content: str
+    timestamp: datetime
+    idempotency_key: Optional[str] = None
+
+
+def state_version(state: Optional[ConversationStateModel]) -> int:
+    """Version a turn loaded, for commit_turn's expected_version (0 = no state yet)."""
+    return state.version if state is not None else 0
+
+
+class TurnSnapshot(NamedTuple):
+    """Everything a turn reads up front: saved FSM state (or None) and history."""
+    state: Optional[ConversationStateModel]
+    messages: List[MessageModel]
+
+
 class IMessageRepository(ABC):
     @abstractmethod
     def create_chat(self) -> ChatModel:
@@ -17,8 +50,13 @@ class IMessageRepository(ABC):
         ...
 
     @abstractmethod
-    def list_chats(self) -> List[ChatModel]:
-        """Devuelve todos los chats existentes."""
+    def list_chats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None
+    ) -> List[ChatModel]:
+        """
+        Devuelve los chats en orden de creación (id ascendente).
+        Paginación por cursor: hasta `limit` chats con id > after_id.
+        """
         ...
 
     @abstractmethod
@@ -30,17 +68,137 @@ class IMessageRepository(ABC):
         ...
 
     @abstractmethod
-    def get_messages(self, chat_id: int) -> List[MessageModel]:
+    def get_messages(
+        self,
+        chat_id: int,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        since_id: Optional[int] = None,
+    ) -> List[MessageModel]:
+        """
+        Recupera los mensajes de un chat, ordenados por timestamp ascendente.
+        after_id: cursor, solo mensajes posteriores a ese mensaje en ese orden.
+        since_id: solo mensajes nuevos (id > since_id).
+        limit: como máximo N mensajes.
+        Lanza ChatNotFoundError si el chat no existe.
+        """
+        ...
+
+    @abstractmethod
+    def get_conversation_state(self, chat_id: int) -> Optional[ConversationStateModel]:
+        """Devuelve el estado FSM guardado del chat, o None si aún no existe."""
+        ...
+
+    @abstractmethod
+    def save_conversation_state(
+        self, chat_id: int, state_name: str, payload: Dict[str, Any]
+    ) -> None:
+        """Crea o actualiza (upsert) el estado FSM del chat y hace commit."""
+        ...
+
+    @abstractmethod
+    def load_turn(self, chat_id: int, history_limit: Optional[int] = None) -> TurnSnapshot:
         """
-        Recupera todos los mensajes de un chat, ordenados por timestamp ascendente.
+        Carga chat, estado FSM e historial en una o dos consultas.
+        Con history_limit solo trae los últimos N mensajes (en orden ascendente).
         Lanza ChatNotFoundError si el chat no existe.
+        Termina la transacción de lectura: la conexión no queda retenida
+        durante la ejecución del agente.
+        """
+        ...
+
+    @abstractmethod
+    def commit_turn(
+        self,
+        chat_id: int,
+        messages: List[PendingMessage],
+        state_name: str,
+        payload: Dict[str, Any],
+        summary: Optional[str] = None,
+        summary_upto_id: Optional[int] = None,
+        expected_version: Optional[int] = None,
+    ) -> List[MessageModel]:
+        """
+        Inserta los mensajes del turno y guarda el estado FSM en un único commit.
+        summary/summary_upto_id se actualizan solo si se pasan.
+        Con expected_version (la versión leída por load_turn, 0 si no había
+        estado) lanza ConcurrentTurnError si otro turno guardó antes.
+        Devuelve los mensajes creados, en orden.
         """
         ...
 
+    @abstractmethod
+    def find_reply(self, chat_id: int, idempotency_key: str) -> Optional[MessageModel]:
+        """
+        Respuesta del asistente al mensaje de usuario guardado con esta
+        Idempotency-Key, o None si la clave no se ha visto en el chat.
+        """
+        ...
+
+
+class IAsyncMessageRepository(ABC):
+    """
+    Same contract as IMessageRepository, awaited on the event loop.
+    ChatService only talks to this interface.
+    """
+
+    @abstractmethod
+    async def create_chat(self) -> ChatModel: ...
+
+    @abstractmethod
+    async def list_chats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None
+    ) -> List[ChatModel]: ...
+
+    @abstractmethod
+    async def add_message(self, chat_id: int, role: str, content: str) -> MessageModel: ...
+
+    @abstractmethod
+    async def get_messages(
+        self,
+        chat_id: int,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        since_id: Optional[int] = None,
+    ) -> List[MessageModel]: ...
+
+    @abstractmethod
+    async def get_conversation_state(
+        self, chat_id: int
+    ) -> Optional[ConversationStateModel]: ...
+
+    @abstractmethod
+    async def save_conversation_state(
+        self, chat_id: int, state_name: str, payload: Dict[str, Any]
+    ) -> None: ...
+
+    @abstractmethod
+    async def load_turn(
+        self, chat_id: int, history_limit: Optional[int] = None
+    ) -> TurnSnapshot: ...
+
+    @abstractmethod
+    async def commit_turn(
+        self,
+        chat_id: int,
+        messages: List[PendingMessage],
+        state_name: str,
+        payload: Dict[str, Any],
+        summary: Optional[str] = None,
+        summary_upto_id: Optional[int] = None,
+        expected_version: Optional[int] = None,
+    ) -> List[MessageModel]: ...
+
+    @abstractmethod
+    async def find_reply(
+        self, chat_id: int, idempotency_key: str
+    ) -> Optional[MessageModel]: ...
+
+
 class ISlotRepository(ABC):
     @abstractmethod
     def get_next_slots(self, days: int, per_day: int) -> List[str]:
         """
         Return up to `per_day` ISO-timestamp slots for each of the next `days` days.
         """
-        ...
\ No newline at end of file
+        ...
@@ -0,0 +1,216 @@
+# backend/app/repositories/jobs.py
+"""
+Postgres queue of agent turns (CHAT_TURN_MODE=queue, see app.services.turn_jobs).
+
+A worker claims a whole chat at a time: it locks the chat row with
+FOR UPDATE SKIP LOCKED (so workers never wait on each other) and takes every
+queued job of that chat, which one turn then answers. A chat with a running
+job is not claimed again until that job finishes or its lease runs out.
+"""
+
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, or_, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.events import CHAT_EVENTS_NOTIFY, notify_query, publish_local, write_events
+from app.models import (
+    Chat as ChatModel,
+    Message as MessageModel,
+    TurnJob as TurnJobModel,
+)
+from .base import ChatNotFoundError
+
+
+class JobClaim(NamedTuple):
+    chat_id: int
+    jobs: List[TurnJobModel]
+    messages: List[MessageModel]    # the jobs' user messages, in history order
+    claimed_at: datetime
+    recovered: bool                 # jobs taken over from a worker whose lease ran out
+
+
+class JobRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _by_key(self, chat_id: int, idempotency_key: str) -> Optional[TurnJobModel]:
+        query = (
+            select(TurnJobModel)
+            .join(MessageModel, MessageModel.id == TurnJobModel.message_id)
+            .where(MessageModel.chat_id == chat_id, MessageModel.idempotency_key == idempotency_key)
+        )
+        return (await self.db.execute(query)).scalars().first()
+
+    async def enqueue(
+        self, chat_id: int, content: str, idempotency_key: Optional[str] = None
+    ) -> TurnJobModel:
+        """
+        Store the user message and its job in one commit. A repeated
+        idempotency_key returns the job created the first time.
+        """
+        if idempotency_key is not None:
+            job = await self._by_key(chat_id, idempotency_key)
+            if job is not None:
+                return job
+        if await self.db.get(ChatModel, chat_id) is None:
+            raise ChatNotFoundError(f"Chat {chat_id} not found")
+        now = datetime.utcnow()
+        msg = MessageModel(
+            chat_id=chat_id, role="user", content=content, timestamp=now,
+            idempotency_key=idempotency_key,
+        )
+        try:
+            self.db.add(msg)
+            await self.db.flush()
+            job = TurnJobModel(
+                chat_id=chat_id, message_id=msg.id, status="queued",
+                attempts=0, run_after=now, created_at=now,
+            )
+            self.db.add(job)
+            await self.db.flush()
+            events = write_events([msg])
+            if CHAT_EVENTS_NOTIFY:
+                await self.db.execute(notify_query(chat_id, events))
+            await self.db.commit()
+        except IntegrityError:
+            # The same key was enqueued concurrently.
+            await self.db.rollback()
+            job = await self._by_key(chat_id, idempotency_key) if idempotency_key else None
+            if job is None:
+                raise
+        else:
+            publish_local(chat_id, events)
+        return job
+
+    async def get(
+        self, chat_id: int, job_id: int
+    ) -> Optional[Tuple[TurnJobModel, Optional[MessageModel]]]:
+        """(job, reply message or None); None if the chat has no such job."""
+        query = (
+            select(TurnJobModel, MessageModel)
+            .outerjoin(MessageModel, MessageModel.id == TurnJobModel.reply_id)
+            .where(TurnJobModel.id == job_id, TurnJobModel.chat_id == chat_id)
+            .execution_options(populate_existing=True)
+        )
+        found = (await self.db.execute(query)).first()
+        # End the read: a long-poll must not sit idle in a transaction.
+        await self.db.commit()
+        return tuple(found) if found is not None else None
+
+    async def claim(self, lease_seconds: float) -> Optional[JobClaim]:
+        """Take the next chat with work, or None if the queue is empty."""
+        now = datetime.utcnow()
+        expired = now - timedelta(seconds=lease_seconds)
+        abandoned = and_(TurnJobModel.status == "running", TurnJobModel.started_at < expired)
+        running = aliased(TurnJobModel)
+        busy = (
+            select(running.id)
+            .where(
+                running.chat_id == TurnJobModel.chat_id,
+                running.status == "running",
+                running.started_at >= expired,
+            )
+            .exists()
+        )
+        next_chat = (
+            select(TurnJobModel.chat_id)
+            .join(ChatModel, ChatModel.id == TurnJobModel.chat_id)
+            .where(
+                or_(and_(TurnJobModel.status == "queued", TurnJobModel.run_after <= now), abandoned),
+                ~busy,
+            )
+            .order_by(TurnJobModel.run_after, TurnJobModel.id)
+            .limit(1)
+            .with_for_update(of=ChatModel, skip_locked=True)
+        )
+        chat_id = (await self.db.execute(next_chat)).scalar()
+        if chat_id is None:
+            await self.db.commit()
+            return None
+
+        def take(*where):
+            return (
+                update(TurnJobModel)
+                .where(TurnJobModel.chat_id == chat_id, *where)
+                .values(status="running", started_at=now, attempts=TurnJobModel.attempts + 1)
+                .returning(TurnJobModel)
+                .execution_options(synchronize_session=False)
+            )
+
+        # Abandoned jobs first, on their own: their reply may already be saved.
+        jobs = list((await self.db.scalars(take(abandoned))).all())
+        recovered = bool(jobs)
+        if not recovered:
+            # Every queued job of the chat, backing-off ones included, so
+            # messages are answered in order.
+            jobs = list((await self.db.scalars(take(TurnJobModel.status == "queued"))).all())
+        if not jobs:
+            # SKIP LOCKED re-checks only the chat row: a worker that claimed
+            # this chat and committed meanwhile left nothing to take.
+            await self.db.commit()
+            return None
+        jobs.sort(key=lambda j: j.id)
+        message_ids = [j.message_id for j in jobs]
+        if not recovered:
+            # Like coalesced messages: they sort from when their turn starts,
+            # after any reply saved while they waited.
+            await self.db.execute(
+                update(MessageModel)
+                .where(MessageModel.id.in_(message_ids))
+                .values(timestamp=now)
+                .execution_options(synchronize_session=False)
+            )
+        messages = list((await self.db.scalars(
+            select(MessageModel)
+            .where(MessageModel.id.in_(message_ids))
+            .order_by(MessageModel.timestamp, MessageModel.id)
+            .execution_options(populate_existing=True)
+        )).all())
+        await self.db.commit()
+        return JobClaim(chat_id, jobs, messages, now, recovered)
+
+    async def reply_after(self, message: MessageModel) -> Optional[MessageModel]:
+        """First assistant message after `message` in history order."""
+        query = (
+            select(MessageModel)
+            .where(
+                MessageModel.chat_id == message.chat_id,
+                MessageModel.role == "assistant",
+                tuple_(MessageModel.timestamp, MessageModel.id) > tuple_(message.timestamp, message.id),
+            )
+            .order_by(MessageModel.timestamp.asc(), MessageModel.id.asc())
+            .limit(1)
+        )
+        return (await self.db.execute(query)).scalars().first()
+
+    async def _finish(self, job_ids: List[int], **values) -> None:
+        await self.db.execute(
+            update(TurnJobModel)
+            .where(TurnJobModel.id.in_(job_ids))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+
+    async def complete(self, job_ids: List[int], reply_id: int) -> None:
+        await self._finish(
+            job_ids, status="done", reply_id=reply_id, error=None, finished_at=datetime.utcnow()
+        )
+
+    async def retry(self, job_ids: List[int], delay: float, count_attempt: bool = True) -> None:
+        """Back to the queue after `delay` seconds; count_attempt=False gives the try back."""
+        values = dict(
+            status="queued",
+            started_at=None,
+            run_after=datetime.utcnow() + timedelta(seconds=delay),
+        )
+        if not count_attempt:
+            values["attempts"] = TurnJobModel.attempts - 1
+        await self._finish(job_ids, **values)
+
+    async def fail(self, job_ids: List[int], error: str) -> None:
+        await self._finish(job_ids, status="failed", error=error, finished_at=datetime.utcnow())
@@ -1,49 +1,236 @@
 # backend/app/repositories/memory.py
 
-from app.models import Chat as ChatModel, Message as MessageModel
-from .base import IMessageRepository, ChatNotFoundError, ISlotRepository
+from app.events import EVENT_HUB, event_batch, write_events
+from app.models import (
+    Chat as ChatModel,
+    Message as MessageModel,
+    ConversationState as ConversationStateModel,
+)
+from .base import (
+    IMessageRepository,
+    ChatNotFoundError,
+    ConcurrentTurnError,
+    ISlotRepository,
+    PendingMessage,
+    TurnSnapshot,
+    state_version,
+)
+from .sql import apply_conversation_state
+from bisect import bisect_right, insort
+from collections import OrderedDict
+from itertools import islice
 from datetime import datetime, timedelta
-from typing import List
+from typing import Dict, List, Tuple
+import os
+import threading
+import time
+
+
+# Keep at most this many chats; the least recently used are evicted (0 = no limit).
+# Chats with a turn in flight are never evicted, so the store can briefly hold more.
+MEMORY_MAX_CHATS = int(os.getenv("MEMORY_MAX_CHATS", "0"))
+# How long load_turn pins a chat against eviction if its commit_turn never comes
+# (a failed turn); longer than any turn with its LLM deadlines and queue wait.
+TURN_PIN_SECONDS = 300
 
 
 class InMemoryMessageRepository(IMessageRepository):
-    def __init__(self):
-        self._chats: List[ChatModel] = []
-        self._messages: List[MessageModel] = []
+    """
+    Process-wide store: chats and states indexed by id, one message list per
+    chat kept in (timestamp, id) order. A single lock makes it safe to share
+    across the threadpool. With max_chats, idle chats are evicted LRU-first;
+    a chat is pinned from load_turn to its commit_turn so a paid agent run
+    is never lost to eviction.
+    """
+
+    def __init__(self, max_chats: int | None = None):
+        self._lock = threading.RLock()
+        self._chats: Dict[int, ChatModel] = {}
+        self._messages: Dict[int, List[MessageModel]] = {}
+        self._message_index: Dict[int, MessageModel] = {}
+        self._states: Dict[int, ConversationStateModel] = {}
+        self._keyed: Dict[Tuple[int, str], MessageModel] = {}  # (chat_id, idempotency key)
+        self._recent: OrderedDict[int, None] = OrderedDict()  # LRU order of chat ids
+        self._pinned: Dict[int, float] = {}  # chat id → pin expiry (monotonic)
+        self._max_chats = max_chats or None
         self._next_chat_id = 1
         self._next_msg_id = 1
+        self.evictions = 0
 
-    def create_chat(self) -> ChatModel:
-        chat = ChatModel(id=self._next_chat_id, created_at=datetime.utcnow())
-        self._next_chat_id += 1
-        self._chats.append(chat)
-        return chat
-
-    def list_chats(self) -> List[ChatModel]:
-        return list(self._chats)
+    # ─── internals (call with the lock held) ──────────────────────────────────
 
-    def add_message(self, chat_id: int, role: str, content: str) -> MessageModel:
-        if not any(c.id == chat_id for c in self._chats):
+    def _touch(self, chat_id: int) -> None:
+        if chat_id not in self._chats:
             raise ChatNotFoundError(f"Chat {chat_id} not found")
+        self._recent.move_to_end(chat_id)
+
+    def _evict_idle(self) -> None:
+        if self._max_chats is None or len(self._chats) <= self._max_chats:
+            return
+        now = time.monotonic()
+        # Pinned chats were just touched, so the scan rarely gets far.
+        idle = (c for c in self._recent if self._pinned.get(c, 0) < now)
+        for chat_id in list(islice(idle, len(self._chats) - self._max_chats)):
+            del self._recent[chat_id]
+            self._pinned.pop(chat_id, None)
+            del self._chats[chat_id]
+            self._states.pop(chat_id, None)
+            for m in self._messages.pop(chat_id, []):
+                del self._message_index[m.id]
+                if m.idempotency_key is not None:
+                    del self._keyed[chat_id, m.idempotency_key]
+            self.evictions += 1
+
+    def _append(
+        self,
+        chat_id: int,
+        role: str,
+        content: str,
+        timestamp: datetime,
+        idempotency_key: str | None = None,
+    ) -> MessageModel:
         msg = MessageModel(
             id=self._next_msg_id,
             chat_id=chat_id,
             role=role,
             content=content,
-            timestamp=datetime.utcnow(),
+            timestamp=timestamp,
+            idempotency_key=idempotency_key,
         )
         self._next_msg_id += 1
-        self._messages.append(msg)
+        history = self._messages[chat_id]
+        if history and history[-1].timestamp > timestamp:
+            insort(history, msg, key=_order)
+        else:
+            history.append(msg)
+        self._message_index[msg.id] = msg
+        if idempotency_key is not None:
+            self._keyed[chat_id, idempotency_key] = msg
         return msg
 
-    def get_messages(self, chat_id: int) -> List[MessageModel]:
-        if not any(c.id == chat_id for c in self._chats):
-            raise ChatNotFoundError(f"Chat {chat_id} not found")
-        return sorted(
-            [m for m in self._messages if m.chat_id == chat_id],
-            key=lambda m: m.timestamp,
-        )
-    
+    def _store_state(self, chat_id: int, state_name: str, payload: dict, previous=None):
+        # A new row per save: rows handed out earlier are never mutated.
+        row = ConversationStateModel(chat_id=chat_id, version=state_version(previous))
+        apply_conversation_state(row, state_name, payload)
+        if previous is not None:
+            row.summary, row.summary_upto_id = previous.summary, previous.summary_upto_id
+        self._states[chat_id] = row
+        return row
+
+    # ─── IMessageRepository ───────────────────────────────────────────────────
+
+    def create_chat(self) -> ChatModel:
+        with self._lock:
+            chat = ChatModel(id=self._next_chat_id, created_at=datetime.utcnow())
+            self._next_chat_id += 1
+            self._chats[chat.id] = chat
+            self._messages[chat.id] = []
+            self._recent[chat.id] = None
+            self._evict_idle()
+            return chat
+
+    def list_chats(self, limit: int | None = None, after_id: int | None = None) -> List[ChatModel]:
+        with self._lock:
+            # Dicts keep insertion order, which is id order.
+            chats = [c for c in self._chats.values() if after_id is None or c.id > after_id]
+        return chats[:limit] if limit is not None else chats
+
+    def add_message(self, chat_id: int, role: str, content: str) -> MessageModel:
+        with self._lock:
+            self._touch(chat_id)
+            msg = self._append(chat_id, role, content, datetime.utcnow())
+        EVENT_HUB.publish(event_batch(chat_id, write_events([msg])))
+        return msg
+
+    def get_messages(
+        self,
+        chat_id: int,
+        limit: int | None = None,
+        after_id: int | None = None,
+        since_id: int | None = None,
+    ) -> List[MessageModel]:
+        with self._lock:
+            self._touch(chat_id)
+            messages = self._messages[chat_id]
+            if after_id is not None:
+                cursor = self._message_index.get(after_id)
+                if cursor is None or cursor.chat_id != chat_id:
+                    return []
+                messages = messages[bisect_right(messages, _order(cursor), key=_order):]
+            else:
+                messages = list(messages)
+        if since_id is not None:
+            messages = [m for m in messages if m.id > since_id]
+        return messages[:limit] if limit is not None else messages
+
+    def get_conversation_state(self, chat_id: int) -> ConversationStateModel | None:
+        with self._lock:
+            return self._states.get(chat_id)
+
+    def save_conversation_state(self, chat_id: int, state_name: str, payload: dict) -> None:
+        with self._lock:
+            self._store_state(chat_id, state_name, payload, self._states.get(chat_id))
+        EVENT_HUB.publish(event_batch(chat_id, write_events(state_name=state_name)))
+
+    def load_turn(self, chat_id: int, history_limit: int | None = None) -> TurnSnapshot:
+        with self._lock:
+            self._touch(chat_id)
+            self._pinned[chat_id] = time.monotonic() + TURN_PIN_SECONDS
+            messages = self._messages[chat_id]
+            if history_limit is None:
+                messages = list(messages)
+            else:
+                messages = messages[len(messages) - history_limit:] if history_limit else []
+            return TurnSnapshot(state=self._states.get(chat_id), messages=messages)
+
+    def commit_turn(
+        self,
+        chat_id: int,
+        messages: List[PendingMessage],
+        state_name: str,
+        payload: dict,
+        summary: str | None = None,
+        summary_upto_id: int | None = None,
+        expected_version: int | None = None,
+    ) -> List[MessageModel]:
+        with self._lock:
+            self._touch(chat_id)
+            self._pinned.pop(chat_id, None)
+            previous = self._states.get(chat_id)
+            if expected_version is not None and state_version(previous) != expected_version:
+                raise ConcurrentTurnError(f"Chat {chat_id} changed since the turn was loaded")
+            if any((chat_id, m.idempotency_key) in self._keyed for m in messages):
+                raise ConcurrentTurnError(f"Chat {chat_id}: idempotency key already used")
+            rows = [
+                self._append(chat_id, m.role, m.content, m.timestamp, m.idempotency_key)
+                for m in messages
+            ]
+            state = self._store_state(chat_id, state_name, payload, previous)
+            if summary is not None:
+                state.summary, state.summary_upto_id = summary, summary_upto_id
+        EVENT_HUB.publish(event_batch(chat_id, write_events(rows, state_name)))
+        return rows
+
+    def find_reply(self, chat_id: int, idempotency_key: str) -> MessageModel | None:
+        with self._lock:
+            keyed = self._keyed.get((chat_id, idempotency_key))
+            if keyed is None:
+                return None
+            history = self._messages[chat_id]
+            start = bisect_right(history, _order(keyed), key=_order)
+            return next(
+                (m for m in history[start:] if m.role == "assistant" and m.id > keyed.id), None
+            )
+
+
+def _order(message: MessageModel):
+    return (message.timestamp, message.id)
+
+
+# Shared by every request when REPOSITORY_BACKEND=memory.
+MEMORY_REPOSITORY = InMemoryMessageRepository(max_chats=MEMORY_MAX_CHATS)
+
+
 class InMemorySlotRepository(ISlotRepository):
     def get_next_slots(self, days: int, per_day: int) -> List[str]:
         slots: List[str] = []
@@ -1,14 +1,190 @@
 # backend/app/repositories/sql.py
 
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.models import Chat as ChatModel, Message as MessageModel
-from .base import IMessageRepository, ChatNotFoundError
+from sqlalchemy.orm.exc import StaleDataError
+from app.events import CHAT_EVENTS_NOTIFY, notify_query, publish_local, write_events
+from app.models import (
+    Chat as ChatModel,
+    Message as MessageModel,
+    ConversationState as ConversationStateModel,
+)
+from .base import (
+    IMessageRepository,
+    ChatNotFoundError,
+    ConcurrentTurnError,
+    PendingMessage,
+    TurnSnapshot,
+    state_version,
+)
 from datetime import datetime
 
 
+def turn_state_query(chat_id: int):
+    """Chat existence + its FSM state in one round-trip (LEFT JOIN)."""
+    return (
+        select(ChatModel.id, ConversationStateModel)
+        .outerjoin(ConversationStateModel, ConversationStateModel.chat_id == ChatModel.id)
+        .where(ChatModel.id == chat_id)
+    )
+
+
+def history_query(chat_id: int):
+    return (
+        select(MessageModel)
+        .where(MessageModel.chat_id == chat_id)
+        .order_by(MessageModel.timestamp.asc())
+    )
+
+
+def chats_page_query(limit: int | None = None, after_id: int | None = None):
+    """Chats in creation (= id) order, keyset-paginated on the primary key."""
+    query = select(ChatModel).order_by(ChatModel.id.asc())
+    if after_id is not None:
+        query = query.where(ChatModel.id > after_id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def messages_page_query(
+    chat_id: int,
+    limit: int | None = None,
+    after_id: int | None = None,
+    since_id: int | None = None,
+):
+    """
+    History in (timestamp, id) order.
+    after_id: keyset cursor — messages sorting after that message.
+    since_id: only messages inserted after it (id > since_id).
+    Both ride the (chat_id, timestamp, id) index.
+    """
+    query = history_query(chat_id).order_by(MessageModel.id.asc())
+    if after_id is not None:
+        cursor_ts = (
+            select(MessageModel.timestamp)
+            .where(MessageModel.id == after_id, MessageModel.chat_id == chat_id)
+            .scalar_subquery()
+        )
+        query = query.where(
+            tuple_(MessageModel.timestamp, MessageModel.id) > tuple_(cursor_ts, after_id)
+        )
+    if since_id is not None:
+        query = query.where(MessageModel.id > since_id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def latest_history_query(chat_id: int, limit: int):
+    """Newest `limit` messages, newest first; callers reverse the result."""
+    return (
+        select(MessageModel)
+        .where(MessageModel.chat_id == chat_id)
+        .order_by(MessageModel.timestamp.desc(), MessageModel.id.desc())
+        .limit(limit)
+    )
+
+
+def reply_query(chat_id: int, idempotency_key: str):
+    """First assistant message after the user message stored with this key."""
+    keyed = (
+        select(MessageModel.id)
+        .where(MessageModel.chat_id == chat_id, MessageModel.idempotency_key == idempotency_key)
+        .scalar_subquery()
+    )
+    return (
+        select(MessageModel)
+        .where(
+            MessageModel.chat_id == chat_id,
+            MessageModel.role == "assistant",
+            MessageModel.id > keyed,
+        )
+        .order_by(MessageModel.timestamp.asc(), MessageModel.id.asc())
+        .limit(1)
+    )
+
+
+# Commit failures that mean another turn of the chat got there first: the
+# state row's version moved (StaleDataError), or a concurrent first turn /
+# the same idempotency key inserted the conflicting row (IntegrityError).
+TURN_CONFLICT_ERRORS = (StaleDataError, IntegrityError)
+
+
+def check_turn_version(
+    chat_id: int, state_row: ConversationStateModel | None, expected_version: int | None
+) -> None:
+    if expected_version is not None and state_version(state_row) != expected_version:
+        raise ConcurrentTurnError(f"Chat {chat_id} changed since the turn was loaded")
+
+
+def build_turn_rows(
+    chat_id: int,
+    messages: list[PendingMessage],
+    state_row: ConversationStateModel | None,
+    state_name: str,
+    payload: dict,
+    summary: str | None = None,
+    summary_upto_id: int | None = None,
+) -> tuple[list[MessageModel], ConversationStateModel]:
+    """ORM objects for commit_turn; the caller adds them and commits once."""
+    rows = [
+        MessageModel(
+            chat_id=chat_id,
+            role=m.role,
+            content=m.content,
+            timestamp=m.timestamp,
+            idempotency_key=m.idempotency_key,
+        )
+        for m in messages
+    ]
+    if state_row is None:
+        state_row = ConversationStateModel(chat_id=chat_id)
+    apply_conversation_state(state_row, state_name, payload)
+    if summary is not None:
+        state_row.summary = summary
+        state_row.summary_upto_id = summary_upto_id
+    return rows, state_row
+
+
+def apply_conversation_state(row: ConversationStateModel, state_name: str, payload: dict):
+    """Copy FSM state onto a row, including the broken-out payload columns."""
+    row.version = (row.version or 0) + 1
+    row.state_name = state_name
+    # Fresh dict so SQLAlchemy sees the JSONB value as changed.
+    row.payload = dict(payload)
+
+    row.name          = payload.get("name")
+    row.age           = payload.get("age")
+    row.allergy       = payload.get("allergy")
+    row.selected_slot = payload.get("selected_slot")
+
+
 class SQLMessageRepository(IMessageRepository):
     def __init__(self, db: Session):
         self.db = db
+        # State rows (or None) seen by load_turn, reused by commit_turn so a
+        # turn on a brand-new chat does not re-SELECT a missing row.
+        self._turn_states: dict[int, ConversationStateModel | None] = {}
+
+    def _commit(self, chat_id: int, messages=(), state_name: str | None = None) -> None:
+        """Commit, announcing the stored messages / new state as chat events."""
+        self.db.flush()
+        events = write_events(messages, state_name)
+        if CHAT_EVENTS_NOTIFY:
+            self.db.execute(notify_query(chat_id, events))
+        self.db.commit()
+        publish_local(chat_id, events)
+
+    def _end_read(self) -> None:
+        """
+        End the read transaction so the pooled connection is returned while
+        the caller works (e.g. the agent run). Commit, not rollback: with
+        expire_on_commit=False the loaded rows stay usable, and version_id_col
+        still guards the later commit_turn.
+        """
+        self.db.commit()
 
     def create_chat(self) -> ChatModel:
         chat = ChatModel()
@@ -17,8 +193,8 @@ class SQLMessageRepository(IMessageRepository):
         self.db.refresh(chat)
         return chat
 
-    def list_chats(self) -> list[ChatModel]:
-        return self.db.query(ChatModel).order_by(ChatModel.created_at.asc()).all()
+    def list_chats(self, limit: int | None = None, after_id: int | None = None) -> list[ChatModel]:
+        return list(self.db.execute(chats_page_query(limit, after_id)).scalars().all())
 
     def add_message(self, chat_id: int, role: str, content: str) -> MessageModel:
         chat = self.db.query(ChatModel).get(chat_id)
@@ -26,17 +202,77 @@ class SQLMessageRepository(IMessageRepository):
             raise ChatNotFoundError(f"Chat {chat_id} not found")
         msg = MessageModel(chat_id=chat_id, role=role, content=content, timestamp=datetime.utcnow())
         self.db.add(msg)
-        self.db.commit()
+        self._commit(chat_id, [msg])
         self.db.refresh(msg)
         return msg
 
-    def get_messages(self, chat_id: int) -> list[MessageModel]:
+    def get_messages(
+        self,
+        chat_id: int,
+        limit: int | None = None,
+        after_id: int | None = None,
+        since_id: int | None = None,
+    ) -> list[MessageModel]:
         chat = self.db.query(ChatModel).get(chat_id)
         if not chat:
             raise ChatNotFoundError(f"Chat {chat_id} not found")
-        return (
-            self.db.query(MessageModel)
-            .filter(MessageModel.chat_id == chat_id)
-            .order_by(MessageModel.timestamp.asc())
-            .all()
-        )
\ No newline at end of file
+        query = messages_page_query(chat_id, limit, after_id, since_id)
+        messages = list(self.db.execute(query).scalars().all())
+        self._end_read()
+        return messages
+
+    def get_conversation_state(self, chat_id: int) -> ConversationStateModel | None:
+        return self.db.get(ConversationStateModel, chat_id)
+
+    def save_conversation_state(self, chat_id: int, state_name: str, payload: dict) -> None:
+        row = self.db.get(ConversationStateModel, chat_id)
+        if row is None:
+            row = ConversationStateModel(chat_id=chat_id)
+            self.db.add(row)
+        apply_conversation_state(row, state_name, payload)
+        self._commit(chat_id, state_name=state_name)
+
+    def load_turn(self, chat_id: int, history_limit: int | None = None) -> TurnSnapshot:
+        found = self.db.execute(turn_state_query(chat_id)).first()
+        if found is None:
+            raise ChatNotFoundError(f"Chat {chat_id} not found")
+        self._turn_states[chat_id] = found[1]
+        if history_limit is None:
+            messages = list(self.db.execute(history_query(chat_id)).scalars().all())
+        else:
+            query = latest_history_query(chat_id, history_limit)
+            messages = list(self.db.execute(query).scalars().all())
+            messages.reverse()
+        self._end_read()
+        return TurnSnapshot(state=found[1], messages=messages)
+
+    def commit_turn(
+        self,
+        chat_id: int,
+        messages: list[PendingMessage],
+        state_name: str,
+        payload: dict,
+        summary: str | None = None,
+        summary_upto_id: int | None = None,
+        expected_version: int | None = None,
+    ) -> list[MessageModel]:
+        if chat_id in self._turn_states:
+            state_row = self._turn_states.pop(chat_id)
+        else:
+            state_row = self.db.get(ConversationStateModel, chat_id)
+        check_turn_version(chat_id, state_row, expected_version)
+        rows, state_row = build_turn_rows(
+            chat_id, messages, state_row, state_name, payload, summary, summary_upto_id
+        )
+        self.db.add_all([*rows, state_row])
+        try:
+            self._commit(chat_id, rows, state_name)
+        except TURN_CONFLICT_ERRORS as exc:
+            self.db.rollback()
+            raise ConcurrentTurnError(f"Chat {chat_id}: concurrent turn ({exc.__class__.__name__})")
+        return rows
+
+    def find_reply(self, chat_id: int, idempotency_key: str) -> MessageModel | None:
+        reply = self.db.execute(reply_query(chat_id, idempotency_key)).scalars().first()
+        self._end_read()
+        return reply
@@ -0,0 +1,151 @@
+# backend/app/repositories/sql_async.py
+
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.events import CHAT_EVENTS_NOTIFY, notify_query, publish_local, write_events
+from app.models import (
+    Chat as ChatModel,
+    Message as MessageModel,
+    ConversationState as ConversationStateModel,
+)
+from .base import (
+    IAsyncMessageRepository,
+    ChatNotFoundError,
+    ConcurrentTurnError,
+    PendingMessage,
+    TurnSnapshot,
+)
+from .sql import (
+    TURN_CONFLICT_ERRORS,
+    apply_conversation_state,
+    build_turn_rows,
+    chats_page_query,
+    check_turn_version,
+    history_query,
+    latest_history_query,
+    messages_page_query,
+    reply_query,
+    turn_state_query,
+)
+
+
+class AsyncSQLMessageRepository(IAsyncMessageRepository):
+    """
+    SQLAlchemy AsyncSession (asyncpg) implementation.
+    The session is expected to use expire_on_commit=False (see database.py),
+    so no refresh round-trip is needed after commits.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        # State rows (or None) seen by load_turn, reused by commit_turn so a
+        # turn on a brand-new chat does not re-SELECT a missing row.
+        self._turn_states: dict[int, ConversationStateModel | None] = {}
+
+    async def _commit(self, chat_id: int, messages=(), state_name: str | None = None) -> None:
+        """Commit, announcing the stored messages / new state as chat events."""
+        await self.db.flush()
+        events = write_events(messages, state_name)
+        if CHAT_EVENTS_NOTIFY:
+            await self.db.execute(notify_query(chat_id, events))
+        await self.db.commit()
+        publish_local(chat_id, events)
+
+    async def _end_read(self) -> None:
+        """Return the connection to the pool between reads and commit_turn (see SQLMessageRepository._end_read)."""
+        await self.db.commit()
+
+    async def create_chat(self) -> ChatModel:
+        chat = ChatModel(created_at=datetime.utcnow())
+        self.db.add(chat)
+        await self.db.commit()
+        return chat
+
+    async def list_chats(
+        self, limit: int | None = None, after_id: int | None = None
+    ) -> list[ChatModel]:
+        result = await self.db.execute(chats_page_query(limit, after_id))
+        return list(result.scalars().all())
+
+    async def add_message(self, chat_id: int, role: str, content: str) -> MessageModel:
+        chat = await self.db.get(ChatModel, chat_id)
+        if not chat:
+            raise ChatNotFoundError(f"Chat {chat_id} not found")
+        msg = MessageModel(chat_id=chat_id, role=role, content=content, timestamp=datetime.utcnow())
+        self.db.add(msg)
+        await self._commit(chat_id, [msg])
+        return msg
+
+    async def get_messages(
+        self,
+        chat_id: int,
+        limit: int | None = None,
+        after_id: int | None = None,
+        since_id: int | None = None,
+    ) -> list[MessageModel]:
+        chat = await self.db.get(ChatModel, chat_id)
+        if not chat:
+            raise ChatNotFoundError(f"Chat {chat_id} not found")
+        result = await self.db.execute(messages_page_query(chat_id, limit, after_id, since_id))
+        messages = list(result.scalars().all())
+        await self._end_read()
+        return messages
+
+    async def get_conversation_state(self, chat_id: int) -> ConversationStateModel | None:
+        return await self.db.get(ConversationStateModel, chat_id)
+
+    async def save_conversation_state(self, chat_id: int, state_name: str, payload: dict) -> None:
+        row = await self.db.get(ConversationStateModel, chat_id)
+        if row is None:
+            row = ConversationStateModel(chat_id=chat_id)
+            self.db.add(row)
+        apply_conversation_state(row, state_name, payload)
+        await self._commit(chat_id, state_name=state_name)
+
+    async def load_turn(self, chat_id: int, history_limit: int | None = None) -> TurnSnapshot:
+        found = (await self.db.execute(turn_state_query(chat_id))).first()
+        if found is None:
+            raise ChatNotFoundError(f"Chat {chat_id} not found")
+        self._turn_states[chat_id] = found[1]
+        if history_limit is None:
+            messages = list((await self.db.execute(history_query(chat_id))).scalars().all())
+        else:
+            query = latest_history_query(chat_id, history_limit)
+            messages = list((await self.db.execute(query)).scalars().all())
+            messages.reverse()
+        await self._end_read()
+        return TurnSnapshot(state=found[1], messages=messages)
+
+    async def commit_turn(
+        self,
+        chat_id: int,
+        messages: list[PendingMessage],
+        state_name: str,
+        payload: dict,
+        summary: str | None = None,
+        summary_upto_id: int | None = None,
+        expected_version: int | None = None,
+    ) -> list[MessageModel]:
+        if chat_id in self._turn_states:
+            state_row = self._turn_states.pop(chat_id)
+        else:
+            state_row = await self.db.get(ConversationStateModel, chat_id)
+        check_turn_version(chat_id, state_row, expected_version)
+        rows, state_row = build_turn_rows(
+            chat_id, messages, state_row, state_name, payload, summary, summary_upto_id
+        )
+        self.db.add_all([*rows, state_row])
+        try:
+            await self._commit(chat_id, rows, state_name)
+        except TURN_CONFLICT_ERRORS as exc:
+            await self.db.rollback()
+            raise ConcurrentTurnError(f"Chat {chat_id}: concurrent turn ({exc.__class__.__name__})")
+        return rows
+
+    async def find_reply(self, chat_id: int, idempotency_key: str) -> MessageModel | None:
+        result = await self.db.execute(reply_query(chat_id, idempotency_key))
+        reply = result.scalars().first()
+        await self._end_read()
+        return reply
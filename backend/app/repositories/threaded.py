@@ -0,0 +1,66 @@
+# backend/app/repositories/threaded.py
+
+from starlette.concurrency import run_in_threadpool
+
+from .base import IAsyncMessageRepository, IMessageRepository
+
+
+async def _call_inline(func, *args):
+    return func(*args)
+
+
+class ThreadedMessageRepository(IAsyncMessageRepository):
+    """
+    Async facade over a blocking IMessageRepository: every call runs in the
+    threadpool so the event loop stays free while psycopg2 waits on Postgres.
+    With blocking=False (in-memory backend) calls run inline instead.
+    """
+
+    def __init__(self, repo: IMessageRepository, blocking: bool = True):
+        self.repo = repo
+        self._run = run_in_threadpool if blocking else _call_inline
+
+    async def create_chat(self):
+        return await self._run(self.repo.create_chat)
+
+    async def list_chats(self, limit: int | None = None, after_id: int | None = None):
+        return await self._run(self.repo.list_chats, limit, after_id)
+
+    async def add_message(self, chat_id: int, role: str, content: str):
+        return await self._run(self.repo.add_message, chat_id, role, content)
+
+    async def get_messages(
+        self,
+        chat_id: int,
+        limit: int | None = None,
+        after_id: int | None = None,
+        since_id: int | None = None,
+    ):
+        return await self._run(self.repo.get_messages, chat_id, limit, after_id, since_id)
+
+    async def get_conversation_state(self, chat_id: int):
+        return await self._run(self.repo.get_conversation_state, chat_id)
+
+    async def save_conversation_state(self, chat_id: int, state_name: str, payload: dict):
+        await self._run(self.repo.save_conversation_state, chat_id, state_name, payload)
+
+    async def load_turn(self, chat_id: int, history_limit: int | None = None):
+        return await self._run(self.repo.load_turn, chat_id, history_limit)
+
+    async def commit_turn(
+        self,
+        chat_id: int,
+        messages,
+        state_name: str,
+        payload: dict,
+        summary: str | None = None,
+        summary_upto_id: int | None = None,
+        expected_version: int | None = None,
+    ):
+        return await self._run(
+            self.repo.commit_turn,
+            chat_id, messages, state_name, payload, summary, summary_upto_id, expected_version,
+        )
+
+    async def find_reply(self, chat_id: int, idempotency_key: str):
+        return await self._run(self.repo.find_reply, chat_id, idempotency_key)
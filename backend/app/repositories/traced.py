@@ -0,0 +1,73 @@
+# backend/app/repositories/traced.py
+
+from app.tracing import span
+
+from .base import IAsyncMessageRepository
+
+
+class TracedMessageRepository(IAsyncMessageRepository):
+    """
+    Wraps an async repository so every call runs inside a `repo.<method>`
+    span (used only when tracing is enabled).
+    """
+
+    def __init__(self, repo: IAsyncMessageRepository, backend: str):
+        self.repo = repo
+        self.backend = backend
+
+    def _span(self, method: str, chat_id: int | None = None):
+        return span(f"repo.{method}", chat_id=chat_id, **{"db.backend": self.backend})
+
+    async def create_chat(self):
+        with self._span("create_chat"):
+            return await self.repo.create_chat()
+
+    async def list_chats(self, limit: int | None = None, after_id: int | None = None):
+        with self._span("list_chats"):
+            return await self.repo.list_chats(limit, after_id)
+
+    async def add_message(self, chat_id: int, role: str, content: str):
+        with self._span("add_message", chat_id):
+            return await self.repo.add_message(chat_id, role, content)
+
+    async def get_messages(
+        self,
+        chat_id: int,
+        limit: int | None = None,
+        after_id: int | None = None,
+        since_id: int | None = None,
+    ):
+        with self._span("get_messages", chat_id):
+            return await self.repo.get_messages(chat_id, limit, after_id, since_id)
+
+    async def get_conversation_state(self, chat_id: int):
+        with self._span("get_conversation_state", chat_id):
+            return await self.repo.get_conversation_state(chat_id)
+
+    async def save_conversation_state(self, chat_id: int, state_name: str, payload: dict):
+        with self._span("save_conversation_state", chat_id):
+            await self.repo.save_conversation_state(chat_id, state_name, payload)
+
+    async def load_turn(self, chat_id: int, history_limit: int | None = None):
+        with self._span("load_turn", chat_id):
+            return await self.repo.load_turn(chat_id, history_limit)
+
+    async def commit_turn(
+        self,
+        chat_id: int,
+        messages,
+        state_name: str,
+        payload: dict,
+        summary: str | None = None,
+        summary_upto_id: int | None = None,
+        expected_version: int | None = None,
+    ):
+        with self._span("commit_turn", chat_id) as s:
+            s.set_attribute("state", state_name)
+            return await self.repo.commit_turn(
+                chat_id, messages, state_name, payload, summary, summary_upto_id, expected_version
+            )
+
+    async def find_reply(self, chat_id: int, idempotency_key: str):
+        with self._span("find_reply", chat_id):
+            return await self.repo.find_reply(chat_id, idempotency_key)
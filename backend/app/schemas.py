@@ -1,7 +1,7 @@
 # backend/app/schemas.py
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Literal, Dict, Any
+from typing import Literal, Dict, Any, Optional
 
 class Item(BaseModel):
     id: int
@@ -37,6 +37,21 @@ class Message(MessageBase):
     class Config:
         orm_mode = True
 
+class TurnJob(BaseModel):
+    """A queued turn (CHAT_TURN_MODE=queue); reply is set once it is done."""
+    id: int
+    chat_id: int
+    message_id: int
+    status: Literal["queued", "running", "done", "failed"]
+    attempts: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    reply: Optional[Message] = None
+
+    class Config:
+        orm_mode = True
+
 class ConversationState(BaseModel):
     chat_id: int
     state_name: str
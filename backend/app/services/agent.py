@@ -5,6 +5,8 @@ import logging
 import openai
 from openai import OpenAIError
 
+from app.agents.config import LLM_CALL_TIMEOUT
+
 class MockAgent:
     """
     Agente de prueba que responde siempre "hello".
@@ -29,7 +31,8 @@ class OpenAIAgent:
             # Nueva llamada v1: openai.chat.completions.create(...)
             resp = openai.chat.completions.create(
                 model=self.model,
-                messages=messages
+                messages=messages,
+                timeout=LLM_CALL_TIMEOUT,
             )
             return resp.choices[0].message.content
         except OpenAIError as e:
@@ -0,0 +1,70 @@
+# backend/app/services/chat_locks.py
+"""
+Per-chat turn serialization inside one worker process.
+
+Each turn of a chat holds that chat's lock from loading its state until the
+turn is committed, so a double-submit or a client retry waits for the
+previous turn and then sees its messages and state instead of racing it.
+
+Across worker processes turns are not queued: the conversation_states
+version check in commit_turn refuses the later of two overlapping turns
+(ConcurrentTurnError → 409), and an Idempotency-Key retry gets the stored reply.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Callable
+
+from app.metrics import TURN_LOCK_WAIT_SECONDS
+
+
+class ChatLocks:
+    """asyncio.Lock per chat, kept only while a turn holds or waits on it."""
+
+    def __init__(self):
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._users: dict[int, int] = {}
+
+    def _unref(self, chat_id: int) -> None:
+        self._users[chat_id] -= 1
+        if not self._users[chat_id]:
+            del self._users[chat_id], self._locks[chat_id]
+
+    async def acquire(self, chat_id: int) -> Callable[[], None]:
+        """Wait for the chat's previous turns; returns a release function (safe to call twice)."""
+        lock = self._locks.setdefault(chat_id, asyncio.Lock())
+        self._users[chat_id] = self._users.get(chat_id, 0) + 1
+        if lock.locked():
+            started = time.perf_counter()
+            try:
+                await lock.acquire()
+            except BaseException:
+                self._unref(chat_id)
+                raise
+            finally:
+                TURN_LOCK_WAIT_SECONDS.observe(time.perf_counter() - started)
+        else:
+            await lock.acquire()
+
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                lock.release()
+                self._unref(chat_id)
+
+        return release
+
+    @asynccontextmanager
+    async def hold(self, chat_id: int):
+        release = await self.acquire(chat_id)
+        try:
+            yield
+        finally:
+            release()
+
+
+CHAT_LOCKS = ChatLocks()
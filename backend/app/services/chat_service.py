@@ -1,57 +1,250 @@
-from sqlalchemy.orm import Session
-from app.repositories.base import ChatNotFoundError, IMessageRepository
-from app.models import ConversationState
+import logging
+import time
+import weakref
+from datetime import datetime
+from typing import AsyncIterator
+from app.models import ConversationState as ConversationStateModel
+from app.repositories.base import (
+    ConcurrentTurnError,
+    IAsyncMessageRepository,
+    PendingMessage,
+    state_version,
+)
 from app.fsm.vaccine_fsm import VaccineConversation
+from app.agents.history import HistoryPolicy, context_message, summarize
+from app.agents.resilience import DEGRADED_ERRORS
 from app.agents.runner import ConversationRunner
+from app.metrics import TURN_CONFLICTS, TURN_REPLAYS, TURN_SECONDS, observe_phase
+from app.services.chat_locks import CHAT_LOCKS
+from app.services.coalesce import CHAT_COALESCE_WINDOW, COALESCER
+from app.tracing import activate, bind_chat, end_span, span, start_span
 
 class ChatService:
-    def __init__(self, repo: IMessageRepository):
+    def __init__(self, repo: IAsyncMessageRepository, history_policy: HistoryPolicy | None = None):
         self.repo = repo
         self.runner = ConversationRunner(repo)
+        self.history_policy = history_policy or HistoryPolicy()
 
-    def _load_conversation(self, chat_id: int) -> VaccineConversation:
-        session: Session = self.repo.db
-        state_row = session.query(ConversationState).get(chat_id)
+    @staticmethod
+    def _conversation_from(state_row: ConversationStateModel | None) -> VaccineConversation:
         if not state_row:
-            conv = VaccineConversation()
-            session.add(
-                ConversationState(
-                    chat_id=chat_id,
-                    state_name=conv.state,
-                    payload=conv.payload,
-                )
-            )
-            session.commit()
-            return conv
+            return VaccineConversation()
+        # Copy the payload so in-place FSM updates never alias the loaded row.
+        return VaccineConversation(payload=dict(state_row.payload), state=state_row.state_name)
+
+    async def current_state(self, chat_id: int) -> str:
+        """FSM state of a chat; raises ChatNotFoundError for unknown chats."""
+        turn = await self.repo.load_turn(chat_id, history_limit=1)
+        return self._conversation_from(turn.state).state
+
+    async def _begin_turn(self, chat_id: int, user_msgs: list[PendingMessage], until=None):
+        """
+        Load chat + state + recent history in one read and build the prompt
+        history (ending with user_msgs). With `until` (a stored message),
+        history stops there. Returns (conv, history, summary update, loaded version).
+        """
+        policy = self.history_policy
+        started = time.perf_counter()
+        turn = await self.repo.load_turn(chat_id, history_limit=policy.fetch_limit)
 
-        conv = VaccineConversation(payload=state_row.payload)
-        conv.state = state_row.state_name
-        return conv
+        conv = self._conversation_from(turn.state)
+        observe_phase(conv.state, "db_load", time.perf_counter() - started)
+        loaded = turn.messages
+        if until is not None:
+            last = (until.timestamp, until.id)
+            loaded = [m for m in loaded if (m.timestamp, m.id) <= last]
+        kept, dropped = policy.window([*loaded, *user_msgs])
+        truncated = policy.fetch_limit is not None and len(turn.messages) >= policy.fetch_limit
 
-    def _save_conversation(self, chat_id: int, conv: VaccineConversation):
-        session: Session = self.repo.db
-        state_row = session.query(ConversationState).get(chat_id)
+        summary = turn.state.summary if turn.state else None
+        summary_upto_id = turn.state.summary_upto_id if turn.state else None
+        new_summary = None
+        if policy.summarize:
+            floor = summary_upto_id or 0
+            # Stored messages only: user_msgs pushed out of the window are
+            # summarized once a later turn reads them back.
+            pending = [m for m in dropped if getattr(m, "id", None) and m.id > floor]
+            if truncated and loaded and loaded[0].id > floor:
+                # Unsummarized messages may be older than what load_turn read
+                # (e.g. a token budget tighter than the message window).
+                pending = await self._unsummarized(chat_id, floor, kept, until)
+            if len(pending) >= policy.summary_batch:
+                started = time.perf_counter()
+                try:
+                    new_summary = await summarize(summary, pending)
+                except DEGRADED_ERRORS as exc:
+                    # Model unavailable: keep the old summary, retry next turn.
+                    logging.warning(f"[Summary] skipped ({exc!r})")
+                else:
+                    summary, summary_upto_id = new_summary, max(m.id for m in pending)
+                observe_phase(conv.state, "summarize", time.perf_counter() - started)
 
-        state_row.state_name = conv.state
+        history = [{"role": m.role, "content": m.content} for m in kept]
+        if dropped or truncated:
+            history.insert(0, context_message(conv.payload, summary))
+        version = state_version(turn.state)
+        return conv, history, (new_summary, summary_upto_id), version
 
-        state_row.payload    = conv.payload
+    async def _unsummarized(self, chat_id: int, floor: int, kept: list, until=None) -> list:
+        """
+        Oldest messages after the summary (id > floor) that are not in the
+        prompt window, up to fetch_limit per turn so a long backlog is
+        summarized over several turns.
+        """
+        rows = await self.repo.get_messages(
+            chat_id, limit=self.history_policy.fetch_limit, since_id=floor
+        )
+        kept_ids = {getattr(m, "id", None) for m in kept}
+        if until is not None:
+            last = (until.timestamp, until.id)
+            rows = [m for m in rows if (m.timestamp, m.id) <= last]
+        return [m for m in rows if m.id not in kept_ids]
 
-        state_row.name          = conv.payload.get("name")
-        state_row.age           = conv.payload.get("age")
-        state_row.allergy       = conv.payload.get("allergy")
-        state_row.selected_slot = conv.payload.get("selected_slot")
+    async def _commit_turn(self, chat_id, state, conv, user_msgs, reply_text, summary_update, version):
+        new_summary, summary_upto_id = summary_update
+        started = time.perf_counter()
+        saved = await self.repo.commit_turn(
+            chat_id,
+            [*user_msgs, PendingMessage("assistant", reply_text, datetime.utcnow())],
+            conv.state,
+            conv.payload,
+            summary=new_summary,
+            summary_upto_id=summary_upto_id if new_summary is not None else None,
+            expected_version=version,
+        )
+        observe_phase(state, "db_commit", time.perf_counter() - started)
+        conv.count_turn()
+        return saved[-1]
 
-        session.commit()
+    async def _stored_reply(self, chat_id: int, idempotency_key: str | None):
+        """The reply already saved for this key (a retried request), or None."""
+        if idempotency_key is None:
+            return None
+        stored = await self.repo.find_reply(chat_id, idempotency_key)
+        if stored is not None:
+            TURN_REPLAYS.inc()
+            logging.info(f"[Turn] chat {chat_id}: replaying reply {stored.id} for a retried request")
+        return stored
 
-    def send_user_message(self, chat_id: int, content: str):
+    async def run_turn(self, chat_id: int, user_msgs: list[PendingMessage]):
+        """
+        One turn as a unit of work: a single read of chat + state + recent
+        history, one agent run over the new user message(s), then those
+        messages, the reply and the new state in one commit.
+        The caller holds the chat's turn lock. Returns the assistant message.
+        """
+        # Stamped now, not on arrival: messages that waited for the previous
+        # turn must still sort after its reply.
+        now = datetime.utcnow()
+        user_msgs = [m._replace(timestamp=now) for m in user_msgs]
+        return await self._turn(chat_id, user_msgs, "\n".join(m.content for m in user_msgs))
+
+    async def answer_queued(self, chat_id: int, queued: list):
+        """
+        Turn for user messages the job queue already stored (see
+        app.services.turn_jobs); history stops at the last of them, so
+        messages queued later are left to their own job.
+        """
+        return await self._turn(
+            chat_id, [], "\n".join(m.content for m in queued), until=queued[-1]
+        )
+
+    async def _turn(self, chat_id: int, user_msgs: list[PendingMessage], content: str, until=None):
+        started = time.perf_counter()
+        with span("chat.turn", queued=until is not None) as turn_span:
+            conv, history, summary_update, version = await self._begin_turn(
+                chat_id, user_msgs, until
+            )
+            state = conv.state
+            turn_span.set_attribute("state", state)
+            assistant_text = await self.runner.run_step(conv, content, history)
+            saved = await self._commit_turn(
+                chat_id, state, conv, user_msgs, assistant_text.text, summary_update, version
+            )
+            turn_span.set_attribute("state.to", conv.state)
+        TURN_SECONDS.labels(state).observe(time.perf_counter() - started)
+        return saved
+
+    async def send_user_message(self, chat_id: int, content: str, idempotency_key: str | None = None):
+        """
+        Post a user message and return the assistant's reply. Turns of a chat
+        run one at a time; with CHAT_COALESCE_WINDOW a burst of messages is
+        answered by a single turn (see app.services.coalesce). A request
+        repeating an idempotency_key gets the reply stored the first time,
+        without a new run.
+        Raises ConcurrentTurnError if another worker committed a turn meanwhile.
+        """
+        bind_chat(chat_id)
+        user_msg = PendingMessage("user", content, datetime.utcnow(), idempotency_key)
         try:
-            self.repo.add_message(chat_id, "user", content)
-        except ChatNotFoundError:
+            if CHAT_COALESCE_WINDOW > 0:
+                stored = await self._stored_reply(chat_id, idempotency_key)
+                if stored is not None:
+                    return stored
+                return await COALESCER.submit(chat_id, user_msg)
+            async with CHAT_LOCKS.hold(chat_id):
+                stored = await self._stored_reply(chat_id, idempotency_key)
+                if stored is not None:
+                    return stored
+                return await self.run_turn(chat_id, [user_msg])
+        except ConcurrentTurnError:
+            # Lost to a turn on another worker; if that was this request's
+            # first attempt, answer with its reply.
+            stored = await self._stored_reply(chat_id, idempotency_key)
+            if stored is None:
+                TURN_CONFLICTS.inc()
+                raise
+            return stored
+
+    async def open_stream(self, chat_id: int, content: str) -> AsyncIterator[tuple[str, dict]]:
+        """
+        Streaming turn. The turn is loaded eagerly (so ChatNotFoundError, or
+        OverloadedError when the LLM queue is full, is raised before any
+        response is sent); the returned iterator yields the
+        runner's events, then ("message", saved assistant message) once the
+        turn has been committed.
+        The chat's turn lock is held from here until the iterator finishes,
+        is closed, or is dropped without ever being started.
+        """
+        started = time.perf_counter()
+        bind_chat(chat_id)
+        release = await CHAT_LOCKS.acquire(chat_id)
+        turn_span = start_span("chat.turn", streaming=True)
+        try:
+            with activate(turn_span) as current_span:
+                user_msgs = [PendingMessage("user", content, datetime.utcnow())]
+                conv, history, summary_update, version = await self._begin_turn(chat_id, user_msgs)
+                current_span.set_attribute("state", conv.state)
+                # Fast-path and cached turns are resolved here and never queue for the LLM.
+                resolved = self.runner.resolve_stream(conv, content)
+        except BaseException:
+            end_span(turn_span)
+            release()
             raise
+        state = resolved.state
+
+        async def events():
+            try:
+                reply_text = None
+                with activate(turn_span, end=True) as current_span:
+                    async for event, data in self.runner.stream_step(conv, resolved, history):
+                        if event == "reply":
+                            reply_text = data["text"]
+                        yield event, data
+                    try:
+                        saved = await self._commit_turn(
+                            chat_id, state, conv, user_msgs, reply_text, summary_update, version
+                        )
+                    except ConcurrentTurnError:
+                        TURN_CONFLICTS.inc()
+                        raise
+                    current_span.set_attribute("state.to", conv.state)
+            finally:
+                release()
+            TURN_SECONDS.labels(state).observe(time.perf_counter() - started)
+            yield "message", saved
 
-        conv = self._load_conversation(chat_id)
-        raw_history = self.repo.get_messages(chat_id)
-        history = [{"role": m.role, "content": m.content} for m in raw_history]
-        assistant_text = self.runner.run_step(conv, content, history)
-        self._save_conversation(chat_id, conv)
-        return self.repo.add_message(chat_id, "assistant", assistant_text.text)
\ No newline at end of file
+        stream = events()
+        # A generator that is never iterated never runs its finally block.
+        weakref.finalize(stream, release)
+        return stream
@@ -0,0 +1,124 @@
+# backend/app/services/coalesce.py
+"""
+Optional coalescing of message bursts ("hi", "yes", "I want the vaccine").
+
+With CHAT_COALESCE_WINDOW > 0 (seconds), a message posted to a chat opens a
+batch; messages posted to the same chat before the batch's turn starts join
+it. Once the chat has been quiet for the window (or CHAT_COALESCE_MAX_WAIT
+after the batch opened, whichever is first), the batch waits for the chat's
+turn lock and runs one turn: every user message is stored, the agent runs
+once on all of them, and every request answers with that assistant message.
+Messages arriving while a turn is running form the next batch, except
+retries (same Idempotency-Key) of a message already in a batch, which wait
+for that batch's answer.
+
+Batches are per worker process; requests for the same chat landing on
+different workers are serialized by the version check instead.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+from app.metrics import TURN_COALESCED
+from app.repositories.base import PendingMessage
+from app.services.chat_locks import CHAT_LOCKS
+
+CHAT_COALESCE_WINDOW = float(os.getenv("CHAT_COALESCE_WINDOW", "0"))
+CHAT_COALESCE_MAX_WAIT = float(os.getenv("CHAT_COALESCE_MAX_WAIT", "2"))
+
+
+class _Batch:
+    def __init__(self):
+        self.messages: list[PendingMessage] = []
+        self.opened = self.last = time.monotonic()
+        self.result: asyncio.Future = asyncio.get_running_loop().create_future()
+        # Keyed messages found already answered when the turn started → that reply.
+        self.replays: dict[str, object] = {}
+
+
+class MessageCoalescer:
+    def __init__(self, window: float, max_wait: float):
+        self.window = window
+        self.max_wait = max(max_wait, window)
+        self._open: dict[int, _Batch] = {}
+        # (chat_id, idempotency key) → the open or running batch holding it
+        self._keyed: dict[tuple[int, str], _Batch] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, chat_id: int, message: PendingMessage):
+        """
+        Add `message` to the chat's open batch (opening one if needed) and
+        wait for the batch's assistant message. A retry of a message that
+        is still in a batch, open or running, waits for that batch instead.
+        """
+        key = message.idempotency_key
+        batch = self._keyed.get((chat_id, key)) if key is not None else None
+        if batch is None:
+            batch = self._open.get(chat_id)
+            if batch is None:
+                batch = self._open[chat_id] = _Batch()
+                task = asyncio.create_task(self._run(chat_id, batch))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            else:
+                TURN_COALESCED.inc()
+            batch.messages.append(message)
+            if key is not None:
+                self._keyed[chat_id, key] = batch
+            batch.last = time.monotonic()
+        # Shielded: a request that goes away must not cancel everyone's turn.
+        saved = await asyncio.shield(batch.result)
+        return batch.replays.get(key, saved)
+
+    def _close(self, chat_id: int, batch: _Batch) -> None:
+        if self._open.get(chat_id) is batch:
+            del self._open[chat_id]
+
+    def _forget(self, chat_id: int, batch: _Batch) -> None:
+        self._close(chat_id, batch)
+        for m in batch.messages:
+            if m.idempotency_key is not None and self._keyed.get((chat_id, m.idempotency_key)) is batch:
+                del self._keyed[chat_id, m.idempotency_key]
+
+    async def _run(self, chat_id: int, batch: _Batch) -> None:
+        # Imported here: the chat service and the dependencies import this module.
+        from app.dependencies import get_async_message_repository
+        from app.services.chat_service import ChatService
+
+        try:
+            while True:
+                deadline = min(batch.last + self.window, batch.opened + self.max_wait)
+                delay = deadline - time.monotonic()
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            # A repository of its own: the request that opened the batch may
+            # go away (and close its session) while the turn runs.
+            async with asynccontextmanager(get_async_message_repository)() as repo:
+                service = ChatService(repo)
+                async with CHAT_LOCKS.hold(chat_id):
+                    self._close(chat_id, batch)
+                    pending = []
+                    for m in batch.messages:
+                        stored = await service._stored_reply(chat_id, m.idempotency_key)
+                        if stored is not None:
+                            # Answered by a turn (maybe on another worker) since it was checked.
+                            batch.replays[m.idempotency_key] = stored
+                        else:
+                            pending.append(m)
+                    saved = await service.run_turn(chat_id, pending) if pending else None
+        except asyncio.CancelledError:
+            self._forget(chat_id, batch)
+            batch.result.cancel()
+            raise
+        except BaseException as exc:
+            self._forget(chat_id, batch)
+            batch.result.set_exception(exc)
+        else:
+            self._forget(chat_id, batch)
+            batch.result.set_result(saved)
+
+
+COALESCER = MessageCoalescer(CHAT_COALESCE_WINDOW, CHAT_COALESCE_MAX_WAIT)
@@ -0,0 +1,117 @@
+# backend/app/services/turn_jobs.py
+"""
+Queued agent turns, so API and agent workers scale separately.
+
+With CHAT_TURN_MODE=queue, POST /chats/{id}/messages stores the user message
+and a turn_jobs row in one commit and answers 202 with the job; clients poll
+GET /chats/{id}/jobs/{job_id} (?wait= long-polls until the job finishes).
+Worker processes (python -m app.worker) claim jobs from Postgres with
+SKIP LOCKED, run the turn and mark the jobs done with the reply's id.
+
+CHAT_TURN_MODE          inline (default): the request runs the turn | queue
+JOB_WORKER_CONCURRENCY  turns one worker process runs at once (16)
+JOB_POLL_INTERVAL       seconds between claims while the queue is empty (0.5)
+JOB_LEASE_SECONDS       a running job not finished by then is taken over (300)
+JOB_MAX_ATTEMPTS        failed tries before a job is marked failed (5)
+JOB_METRICS_PORT        port of the worker's own /metrics (9100; 0 = off)
+
+Overload (429/503) and turn conflicts requeue a job without using up a try.
+A worker that dies mid-turn leaves its jobs running until the lease runs
+out; the next claim first checks whether their reply was already saved.
+"""
+
+import asyncio
+import logging
+import os
+from contextlib import suppress
+
+from app.agents.admission import OverloadedError
+from app.database import get_async_sessionmaker
+from app.metrics import JOB_WAIT_SECONDS, JOBS
+from app.repositories.base import ChatNotFoundError, ConcurrentTurnError
+from app.repositories.jobs import JobClaim, JobRepository
+from app.services.chat_service import ChatService
+from app.tracing import bind_chat
+
+CHAT_TURN_MODE = os.getenv("CHAT_TURN_MODE", "inline").lower()
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "16"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_METRICS_PORT = int(os.getenv("JOB_METRICS_PORT", "9100"))
+
+QUEUE_ENABLED = CHAT_TURN_MODE == "queue"
+
+
+class TurnWorker:
+    """
+    `repositories` opens the message repository a turn runs on (an async
+    context manager factory, as the API's dependency provides it).
+    """
+
+    def __init__(self, repositories, concurrency: int = JOB_WORKER_CONCURRENCY):
+        self.repositories = repositories
+        self.concurrency = concurrency
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Claim and run turns until `stop` is set; running turns are finished first."""
+        logging.info(f"[Jobs] worker started ({self.concurrency} slots)")
+        await asyncio.gather(*(self._loop(stop) for _ in range(self.concurrency)))
+        logging.info("[Jobs] worker stopped")
+
+    async def _loop(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            try:
+                worked = await self.step()
+            except Exception:
+                logging.exception("[Jobs] claim failed")
+                worked = False
+            if not worked:
+                with suppress(TimeoutError):
+                    await asyncio.wait_for(stop.wait(), JOB_POLL_INTERVAL)
+
+    async def step(self) -> bool:
+        """Claim one chat's jobs and answer them. False if there was nothing to do."""
+        async with get_async_sessionmaker()() as db:
+            jobs = JobRepository(db)
+            claim = await jobs.claim(JOB_LEASE_SECONDS)
+            if claim is None:
+                return False
+            job_ids = [j.id for j in claim.jobs]
+            if not claim.recovered:
+                for job in claim.jobs:
+                    JOB_WAIT_SECONDS.observe((claim.claimed_at - job.run_after).total_seconds())
+            try:
+                reply = await self._answer(jobs, claim)
+            except ChatNotFoundError:
+                await jobs.fail(job_ids, "chat not found")
+                JOBS.labels("failed").inc(len(job_ids))
+            except OverloadedError as exc:
+                await jobs.retry(job_ids, exc.retry_after, count_attempt=False)
+                JOBS.labels("retried").inc(len(job_ids))
+            except ConcurrentTurnError:
+                await jobs.retry(job_ids, 0, count_attempt=False)
+                JOBS.labels("retried").inc(len(job_ids))
+            except Exception as exc:
+                attempts = max(j.attempts for j in claim.jobs)
+                logging.exception(f"[Jobs] chat {claim.chat_id}: attempt {attempts} failed")
+                if attempts >= JOB_MAX_ATTEMPTS:
+                    await jobs.fail(job_ids, repr(exc))
+                    JOBS.labels("failed").inc(len(job_ids))
+                else:
+                    await jobs.retry(job_ids, 2 ** attempts)
+                    JOBS.labels("retried").inc(len(job_ids))
+            else:
+                await jobs.complete(job_ids, reply.id)
+                JOBS.labels("done").inc(len(job_ids))
+        return True
+
+    async def _answer(self, jobs: JobRepository, claim: JobClaim):
+        bind_chat(claim.chat_id)
+        if claim.recovered:
+            saved = await jobs.reply_after(claim.messages[-1])
+            if saved is not None:
+                logging.info(f"[Jobs] chat {claim.chat_id}: reply {saved.id} was already saved")
+                return saved
+        async with self.repositories() as repo:
+            return await ChatService(repo).answer_queued(claim.chat_id, claim.messages)
@@ -0,0 +1,140 @@
+# backend/app/tracing.py
+"""
+OpenTelemetry spans for a chat turn, nested as:
+
+  POST /chats/{chat_id}/messages      the request (FastAPI's own instrumentation,
+                                      active once a provider is installed)
+    chat.turn                         ChatService: chat_id, state
+      repo.load_turn                  every repository call (TracedMessageRepository)
+      agent.run                       Runner.run / run_streamed: agent, model
+        llm.call                      each model request (TurnMetricsHooks)
+        tool.<name>                   each function_tool (tools.traced_tool)
+      repo.commit_turn
+
+Every span started while a chat is bound (bind_chat) carries its chat_id.
+
+TRACING_EXPORTER: none (default) | file | otlp
+  file  one JSON span per line, appended to TRACING_FILE (traces.jsonl)
+  otlp  OTLP/HTTP to OTEL_EXPORTER_OTLP_ENDPOINT (default http://localhost:4318);
+        benchmarks/otlp_sink.py is a local collector stand-in
+The standard OTEL_TRACES_SAMPLER / OTEL_TRACES_SAMPLER_ARG apply.
+
+Disabled, span() returns a shared null context after one flag check: the SDK
+is never imported and no OpenTelemetry context is touched.
+"""
+
+import logging
+import os
+import threading
+from contextlib import nullcontext
+from contextvars import ContextVar
+
+from opentelemetry import trace
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+TRACING_ENABLED = TRACING_EXPORTER not in ("", "none", "off")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "healthgen-chat")
+
+# Resolves to the real tracer once setup_tracing() installs a provider.
+tracer = trace.get_tracer("app")
+
+_NOOP = nullcontext(trace.INVALID_SPAN)
+_chat_id: ContextVar[int | None] = ContextVar("trace_chat_id", default=None)
+
+
+def _attributes(attributes: dict) -> dict:
+    chat_id = _chat_id.get()
+    if chat_id is not None:
+        attributes.setdefault("chat_id", chat_id)
+    return {k: v for k, v in attributes.items() if v is not None}
+
+
+def span(name: str, **attributes):
+    """Context manager: a child span of the current one, made current."""
+    if not TRACING_ENABLED:
+        return _NOOP
+    return tracer.start_as_current_span(name, attributes=_attributes(attributes))
+
+
+def start_span(name: str, **attributes):
+    """A span ended later by end_span (for hook pairs); None when disabled."""
+    if not TRACING_ENABLED:
+        return None
+    return tracer.start_span(name, attributes=_attributes(attributes))
+
+
+def activate(span_, end: bool = False):
+    """Context manager making a start_span() span current; ends it on exit if end."""
+    if span_ is None:
+        return _NOOP
+    return trace.use_span(span_, end_on_exit=end)
+
+
+def end_span(span_, **attributes) -> None:
+    if span_ is None:
+        return
+    for key, value in attributes.items():
+        if value is not None:
+            span_.set_attribute(key, value)
+    span_.end()
+
+
+def bind_chat(chat_id: int) -> None:
+    """Tag every span started from here on (in this context) with chat_id."""
+    if TRACING_ENABLED:
+        _chat_id.set(chat_id)
+
+
+# ─── Exporters ────────────────────────────────────────────────────────────────
+
+def _file_exporter(path: str):
+    from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+    class JsonLinesSpanExporter(SpanExporter):
+        """Appends finished spans to a file, one JSON object per line."""
+
+        def __init__(self):
+            self._lock = threading.Lock()
+            self._out = open(path, "a", encoding="utf-8")
+
+        def export(self, spans):
+            lines = "".join(s.to_json(indent=None) + "\n" for s in spans)
+            with self._lock:
+                self._out.write(lines)
+                self._out.flush()
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self):
+            with self._lock:
+                self._out.close()
+
+    return JsonLinesSpanExporter()
+
+
+def _otlp_exporter():
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+    return OTLPSpanExporter()
+
+
+def setup_tracing() -> None:
+    """Install the SDK tracer provider and exporter chosen by TRACING_EXPORTER."""
+    if not TRACING_ENABLED:
+        return
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    if TRACING_EXPORTER == "file":
+        exporter = _file_exporter(TRACING_FILE)
+    elif TRACING_EXPORTER == "otlp":
+        exporter = _otlp_exporter()
+    else:
+        raise ValueError(f"Unknown TRACING_EXPORTER {TRACING_EXPORTER!r} (none | file | otlp)")
+
+    provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+    # Spans are exported from a background thread, off the request path.
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    logging.info(f"[Tracing] exporting spans via {TRACING_EXPORTER}")
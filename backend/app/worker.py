@@ -0,0 +1,51 @@
+# backend/app/worker.py
+"""
+Agent turn worker for CHAT_TURN_MODE=queue (see app/services/turn_jobs.py).
+
+    python -m app.worker
+
+Runs JOB_WORKER_CONCURRENCY turns at a time against the same DATABASE_URL
+and REPOSITORY_BACKEND as the API. SIGTERM/SIGINT stop claiming new jobs and
+let running turns finish. Exits right away unless CHAT_TURN_MODE=queue: with
+inline turns nothing is ever enqueued. Job, turn and LLM metrics are served
+on JOB_METRICS_PORT (/metrics), as the worker has no API to serve them.
+"""
+
+import asyncio
+import logging
+import signal
+from contextlib import asynccontextmanager
+
+from app.agents.factory import warm_agents
+from app.dependencies import get_async_message_repository, repository_backend
+from app.logs import configure_logging
+from app.metrics import serve_metrics
+from app.services.turn_jobs import JOB_METRICS_PORT, QUEUE_ENABLED, TurnWorker
+from app.tracing import setup_tracing
+
+
+def check_config() -> None:
+    if not QUEUE_ENABLED:
+        raise SystemExit("The turn worker only runs with CHAT_TURN_MODE=queue")
+    if repository_backend() == "memory":
+        raise SystemExit("The turn worker needs a SQL REPOSITORY_BACKEND (sql or sql_async)")
+
+
+async def main() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await TurnWorker(asynccontextmanager(get_async_message_repository)).run(stop)
+
+
+if __name__ == "__main__":
+    check_config()
+    configure_logging()
+    setup_tracing()
+    if JOB_METRICS_PORT:
+        serve_metrics(JOB_METRICS_PORT)
+        logging.info(f"[Jobs] metrics on :{JOB_METRICS_PORT}/metrics")
+    warm_agents()
+    logging.info("[Jobs] agents ready")
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+# backend/benchmarks/bench_fsm.py
+"""
+Per-turn cost of materialising a VaccineConversation.
+
+"before" rebuilds a `transitions.Machine` from the same transition table for
+every conversation (what ChatService._load_conversation used to do);
+"after" is the compiled, shared table.
+
+Needs the `transitions` package (requirements-dev.txt); the app no longer does.
+
+Usage (from backend/):
+    DATABASE_URL=sqlite:// python -m benchmarks.bench_fsm [-n 5000]
+"""
+
+import argparse
+import timeit
+
+from transitions import Machine
+
+from app.fsm.vaccine_fsm import STATES, TRANSITIONS, VaccineConversation
+from app.repositories.memory import InMemorySlotRepository
+
+
+class _LegacyConversation:
+    """Per-instance `transitions.Machine`, as built before the table was compiled."""
+
+    def __init__(self, payload=None):
+        self.payload = payload or {}
+        self.slot_repo = InMemorySlotRepository()
+        self.machine = Machine(
+            model=self,
+            states=list(STATES),
+            initial="start",
+            send_event=True,
+            auto_transitions=False,
+            ignore_invalid_triggers=True,
+        )
+        for t in TRANSITIONS:
+            self.machine.add_transition(
+                trigger=t.trigger,
+                source=t.source,
+                dest=t.dest,
+                conditions=list(t.conditions),
+                unless=list(t.unless),
+                before=list(t.before),
+                after=list(t.after),
+            )
+
+
+# Reuse the real callbacks/conditions so both cases do the same work.
+for _t in TRANSITIONS:
+    for _cb in (*_t.conditions, *_t.unless, *_t.before, *_t.after):
+        setattr(_LegacyConversation, _cb, getattr(VaccineConversation, _cb))
+
+
+def _turn(factory):
+    conv = factory({"name": "Jane Doe", "age": 36})
+    conv.state = "got_name"
+    conv.provide_age(age=36)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=5000, help="iterations per case")
+    args = parser.parse_args()
+
+    cases = {
+        "before (Machine per turn)": lambda: _turn(_LegacyConversation),
+        "after  (compiled table)  ": lambda: _turn(VaccineConversation),
+    }
+    for label, fn in cases.items():
+        best = min(timeit.repeat(fn, number=args.n, repeat=3))
+        print(f"{label}  {best / args.n * 1e6:8.2f} µs/turn")
+
+
+if __name__ == "__main__":
+    main()
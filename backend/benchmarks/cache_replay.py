@@ -0,0 +1,89 @@
+# backend/benchmarks/cache_replay.py
+"""
+Guard for the response cache: a cached turn must leave the FSM where the
+agent run it replays left it.
+
+Each case runs twice through ConversationRunner.run_step against
+benchmarks.mock_llm (started as a subprocess unless --llm-url is given),
+on fresh conversations with the same state, payload and utterance: the
+first run goes to the agent and fills the cache, the second may be served
+from it. Prints both end states and whether the second run was a hit;
+exits 1 if a hit ends anywhere else than the agent run did.
+
+Usage (from backend/):
+    DATABASE_URL=sqlite:// python -m benchmarks.cache_replay [--llm-port 8100]
+"""
+
+import argparse
+import asyncio
+import os
+
+from benchmarks.load_chat import _start_mock
+
+# (FSM state, payload, what the user says)
+CASES: tuple[tuple[str, dict, str], ...] = (
+    ("start", {}, "Hi there"),
+    ("awaiting_intent", {}, "Yes, I'd like to book a flu shot"),
+    ("got_name", {"name": "Jane Doe"}, "I'm 36 years old"),
+    ("awaiting_allergy_response", {"name": "Jane Doe", "age": 36}, "No, I'm not allergic to eggs"),
+    (
+        "offered_slots",
+        {"name": "Jane Doe", "age": 36, "allergy": "no", "slots": ["Mon 10:00", "Mon 11:00", "Mon 12:00"]},
+        "The second one works for me",
+    ),
+)
+
+
+async def _check() -> bool:
+    # Imported here so OPENAI_* is set before the SDK builds its client.
+    from app.agents.cache import ResponseCache
+    from app.agents.runner import ConversationRunner
+    from app.fsm.vaccine_fsm import VaccineConversation
+
+    cache = ResponseCache()
+    runner = ConversationRunner(repo=None, cache=cache)
+    ok = True
+    print(f"{'state':<27}{'agent run →':<28}{'second run →':<28}served by")
+    for state, payload, text in CASES:
+        ends = []
+        for _ in range(2):
+            conv = VaccineConversation(dict(payload), state=state)
+            hits = cache.hits
+            await runner.run_step(conv, text, [{"role": "user", "content": text}])
+            ends.append((conv.state, cache.hits > hits))
+        (first, _), (second, hit) = ends
+        bad = hit and second != first
+        ok = ok and not bad
+        print(f"{state:<27}{first:<28}{second:<28}{'cache' if hit else 'agent'}{'  MISMATCH' if bad else ''}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-url", help="use a running mock LLM (…/v1) instead of spawning one")
+    parser.add_argument("--llm-port", type=int, default=8100)
+    args = parser.parse_args()
+
+    mock = None
+    if not args.llm_url:
+        args.latency, args.token_latency, args.jitter, args.script = 0.0, 0.0, 0.0, None
+        mock = _start_mock(args)
+        args.llm_url = f"http://127.0.0.1:{args.llm_port}/v1"
+    os.environ["OPENAI_BASE_URL"] = args.llm_url
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+    os.environ["OPENAI_DEFAULT_API"] = "chat_completions"
+    os.environ["OPENAI_AGENTS_DISABLE_TRACING"] = "1"
+
+    import logging
+    logging.disable(logging.INFO)
+    try:
+        ok = asyncio.run(_check())
+    finally:
+        if mock is not None:
+            mock.terminate()
+            mock.wait()
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# backend/benchmarks/explain_indexes.py
+"""
+EXPLAIN check for the chat hot paths on a large dataset.
+
+Seeds --chats chats with --per-chat messages each (1M messages by default)
+inside a transaction, ANALYZEs, runs EXPLAIN (FORMAT JSON) on the queries a
+turn and the listing endpoints issue, and fails if any of them does not
+read through one of its expected indexes (or falls back to a Seq Scan).
+The transaction is rolled back at the end unless --keep is given.
+
+Usage (from backend/, against a migrated Postgres database):
+    python -m benchmarks.explain_indexes [--chats 100000] [--per-chat 10] [--keep]
+"""
+
+import argparse
+import json
+import time
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql
+
+from app.database import engine
+from app.models import ConversationState as ConversationStateModel
+from app.repositories.sql import (
+    chats_page_query,
+    history_query,
+    latest_history_query,
+    messages_page_query,
+    turn_state_query,
+)
+
+INDEX_NODES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+# Each in-progress state holds ~1% of chats; everything else is completed.
+RARE_STATES = ("asked_name", "got_name", "awaiting_allergy_response", "offered_slots", "confirming")
+
+SEED_SQL = [
+    """
+    INSERT INTO chats (created_at)
+    SELECT TIMESTAMP '2025-01-01' + make_interval(secs => g)
+    FROM generate_series(1, :chats) AS g
+    """,
+    # Fresh stats before joining against the new chats; with the tiny
+    # pre-seed estimate the planner picks a quadratic nested loop.
+    "ANALYZE chats",
+    """
+    INSERT INTO messages (chat_id, role, content, timestamp)
+    SELECT c.id,
+           CASE WHEN g % 2 = 1 THEN 'user' ELSE 'assistant' END,
+           'seed message ' || g,
+           c.created_at + make_interval(secs => g)
+    FROM chats AS c CROSS JOIN generate_series(1, :per_chat) AS g
+    WHERE c.id > :base
+    """,
+    """
+    INSERT INTO conversation_states (chat_id, state_name, payload, selected_slot)
+    SELECT id,
+           CASE WHEN id % 100 < :rare THEN (:states)[1 + id % 100] ELSE 'completed' END,
+           '{}'::jsonb,
+           CASE WHEN id % 100 >= :rare THEN to_char(created_at, 'YYYY-MM-DD"T"HH24:00:00') END
+    FROM chats
+    WHERE id > :base
+    """,
+    "ANALYZE messages",
+    "ANALYZE conversation_states",
+]
+
+
+def _sql(query) -> str:
+    return str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def _scans(plan: dict):
+    """Yield (node type, relation, index) for every scan node in a plan tree."""
+    yield plan["Node Type"], plan.get("Relation Name"), plan.get("Index Name")
+    for child in plan.get("Plans", []):
+        yield from _scans(child)
+
+
+def _seed(conn, chats: int, per_chat: int) -> int:
+    base = conn.execute(text("SELECT coalesce(max(id), 0) FROM chats")).scalar_one()
+    params = {
+        "chats": chats,
+        "per_chat": per_chat,
+        "base": base,
+        "rare": len(RARE_STATES),
+        "states": list(RARE_STATES),
+    }
+    started = time.perf_counter()
+    for statement in SEED_SQL:
+        conn.execute(text(statement), params)
+    print(f"seeded {chats} chats / {chats * per_chat} messages in {time.perf_counter() - started:.1f}s")
+    return base
+
+
+def _hot_queries(chat_id: int, cursor_id: int):
+    """(label, query, indexes allowed to serve it)"""
+    history = {"ix_messages_chat_id_timestamp_id"}
+    return [
+        ("turn state", turn_state_query(chat_id), {"chats_pkey", "conversation_states_pkey"}),
+        ("latest history", latest_history_query(chat_id, 20), history),
+        ("full history", history_query(chat_id), history),
+        ("messages page", messages_page_query(chat_id, 50, after_id=cursor_id), history | {"messages_pkey"}),
+        ("messages since", messages_page_query(chat_id, since_id=cursor_id), history | {"messages_pkey"}),
+        ("chats page", chats_page_query(50, after_id=chat_id), {"chats_pkey"}),
+        (
+            "chats by state",
+            select(func.count()).where(ConversationStateModel.state_name == "confirming"),
+            {"ix_conversation_states_state_name"},
+        ),
+        (
+            "chats by slot",
+            select(ConversationStateModel.chat_id).where(
+                ConversationStateModel.selected_slot == "2025-01-01T10:00:00"
+            ),
+            {"ix_conversation_states_selected_slot"},
+        ),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=100_000)
+    parser.add_argument("--per-chat", type=int, default=10)
+    parser.add_argument("--keep", action="store_true", help="commit the seeded rows")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("explain_indexes needs a Postgres DATABASE_URL")
+
+    failures = []
+    conn = engine.connect()
+    trans = conn.begin()
+    try:
+        base = _seed(conn, args.chats, args.per_chat)
+        chat_id = conn.execute(
+            text("SELECT id FROM chats WHERE id > :base ORDER BY id OFFSET :n LIMIT 1"),
+            {"base": base, "n": args.chats // 2},
+        ).scalar_one()
+        cursor_id = conn.execute(
+            text("SELECT id FROM messages WHERE chat_id = :c ORDER BY timestamp, id OFFSET :n LIMIT 1"),
+            {"c": chat_id, "n": args.per_chat // 2},
+        ).scalar_one()
+
+        for label, query, allowed in _hot_queries(chat_id, cursor_id):
+            plan = conn.execute(text("EXPLAIN (FORMAT JSON) " + _sql(query))).scalar_one()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            scans = list(_scans(plan[0]["Plan"]))
+            used = {index for node, _, index in scans if node in INDEX_NODES and index}
+            seq = sorted({rel for node, rel, _ in scans if node == "Seq Scan"})
+            ok = bool(used & allowed) and not seq
+            print(f"{'ok  ' if ok else 'FAIL'} {label:<16} indexes={sorted(used)} seq_scans={seq}")
+            if not ok:
+                failures.append(label)
+    finally:
+        if args.keep:
+            trans.commit()
+        else:
+            trans.rollback()
+        conn.close()
+
+    assert not failures, f"hot queries not served by an index: {failures}"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# backend/benchmarks/load_chat.py
+"""
+End-to-end load test: full vaccine-booking conversations through the API.
+
+Each conversation creates a chat and walks CONVERSATION (start → completed)
+through POST /chats/{id}/messages (or the SSE endpoint with --stream). The
+real ConversationRunner path runs against benchmarks.mock_llm, which is
+started as a subprocess unless --llm-url points at a running one.
+
+By default the FastAPI app runs in-process (httpx ASGITransport), so SQL
+statements can be counted on the app's engines; with --base-url the test
+drives an already running server instead (no DB counts). The app uses its
+usual REPOSITORY_BACKEND, so the database must be migrated (or use memory).
+
+Reports throughput, p50/p95/p99 latency per FSM state, errors, and SQL
+statements per turn. With --stream --base-url it also reports time to first
+token (ASGITransport buffers whole responses, so in-process it cannot).
+
+Usage (from backend/):
+    DATABASE_URL=... python -m benchmarks.load_chat [-n 1000] [-c 100] [--latency 0.3] [--stream]
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+# (FSM state the turn starts in, what the user says)
+CONVERSATION: tuple[tuple[str, str], ...] = (
+    ("start", "Hi there"),
+    ("awaiting_intent", "Yes, I'd like to book a flu shot"),
+    ("asked_name", "My name is Jane Doe"),
+    ("got_name", "I'm 42 years old"),
+    ("awaiting_allergy_response", "No, I'm not allergic to eggs"),
+    ("offered_slots", "The second one works for me"),
+    ("confirming", "Yes, please confirm it"),
+)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class LoadStats:
+    def __init__(self):
+        self.latency: dict[str, list[float]] = defaultdict(list)
+        self.first_token: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter[str] = Counter()
+        self.turns = 0
+        self.completed = 0
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+async def _turn(client: httpx.AsyncClient, chat_id: int, state: str, text: str,
+                stream: bool, stats: LoadStats) -> bool:
+    body = {"role": "user", "content": text}
+    started = time.perf_counter()
+    if not stream:
+        response = await client.post(f"/chats/{chat_id}/messages", json=body)
+        ok = response.status_code == 201
+    else:
+        ok = first = False
+        async with client.stream("POST", f"/chats/{chat_id}/messages/stream", json=body) as response:
+            async for line in response.aiter_lines():
+                if line == "event: token" and not first:
+                    first = True
+                    stats.first_token[state].append(time.perf_counter() - started)
+                ok = ok or line == "event: message"
+        ok = ok and response.status_code == 200
+    stats.turns += 1
+    if not ok:
+        stats.errors[f"{state}: HTTP {response.status_code}"] += 1
+        return False
+    stats.latency[state].append(time.perf_counter() - started)
+    return True
+
+
+async def _conversation(client: httpx.AsyncClient, stream: bool, stats: LoadStats) -> None:
+    try:
+        response = await client.post("/chats/")
+        chat_id = response.json()["id"]
+        for state, text in CONVERSATION:
+            if not await _turn(client, chat_id, state, text, stream, stats):
+                return
+        stats.completed += 1
+    except Exception as exc:  # keep the run going; report at the end
+        stats.errors[type(exc).__name__] += 1
+
+
+async def run_load(client: httpx.AsyncClient, conversations: int, concurrency: int,
+                   stream: bool) -> tuple[LoadStats, float]:
+    stats = LoadStats()
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with gate:
+            await _conversation(client, stream, stats)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(conversations)))
+    return stats, time.perf_counter() - started
+
+
+def _start_mock(args) -> subprocess.Popen:
+    cmd = [
+        sys.executable, "-m", "benchmarks.mock_llm",
+        "--port", str(args.llm_port),
+        "--latency", str(args.latency),
+        "--token-latency", str(args.token_latency),
+        "--jitter", str(args.jitter),
+    ]
+    if args.script:
+        cmd += ["--script", args.script]
+    proc = subprocess.Popen(cmd, env={**os.environ, "DATABASE_URL": os.getenv("DATABASE_URL", "sqlite://")})
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{args.llm_port}/health", timeout=1)
+            return proc
+        except httpx.TransportError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit("mock LLM server did not start")
+
+
+def _report(stats: LoadStats, elapsed: float, statements: int | None, args) -> None:
+    turns = sum(len(v) for v in stats.latency.values())
+    print(
+        f"\n{args.conversations} conversations (concurrency {args.concurrency}) in {elapsed:.2f}s: "
+        f"{stats.completed} completed, {turns} turns → {turns / elapsed:.1f} turns/s, "
+        f"{stats.completed / elapsed:.2f} conversations/s"
+    )
+    header = f"{'state':<27}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    show_ttft = bool(stats.first_token) and bool(args.base_url)
+    if show_ttft:
+        header += f"{'ttft p50':>10}{'ttft p95':>10}"
+    print(header)
+    for state, _ in CONVERSATION:
+        values = stats.latency.get(state, [])
+        row = f"{state:<27}{len(values):>7}" + "".join(
+            f"{percentile(values, p) * 1000:>10.1f}" for p in (50, 95, 99)
+        )
+        if show_ttft:
+            ttft = stats.first_token.get(state, [])
+            row += "".join(f"{percentile(ttft, p) * 1000:>10.1f}" for p in (50, 95))
+        print(row)
+    if statements is not None and stats.turns:
+        print(f"SQL statements: {statements} total, {statements / stats.turns:.2f} per turn "
+              f"(incl. chat creation)")
+    if stats.errors:
+        print("errors:", dict(stats.errors))
+
+
+async def _in_process(args) -> None:
+    # Imported here so OPENAI_* is set before the SDK builds its client.
+    from sqlalchemy import event
+
+    from app.agents.factory import warm_agents
+    from app.database import engine, get_async_sessionmaker
+    from app.dependencies import repository_backend
+    from app.main import app
+
+    warm_agents()
+    counter = StatementCounter()
+    engines = [engine]
+    if repository_backend() == "sql_async":
+        engines.append(get_async_sessionmaker().kw["bind"].sync_engine)
+    for eng in engines:
+        event.listen(eng, "before_cursor_execute", counter)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=None) as client:
+        stats, elapsed = await run_load(client, args.conversations, args.concurrency, args.stream)
+    _report(stats, elapsed, counter.count if repository_backend() != "memory" else None, args)
+
+
+async def _remote(args) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=None, limits=limits) as client:
+        stats, elapsed = await run_load(client, args.conversations, args.concurrency, args.stream)
+    _report(stats, elapsed, None, args)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--conversations", type=int, default=1000)
+    parser.add_argument("-c", "--concurrency", type=int, default=100)
+    parser.add_argument("--stream", action="store_true", help="use the SSE endpoint")
+    parser.add_argument("--base-url", help="drive a running API instead of the in-process app")
+    parser.add_argument("--llm-url", help="use a running mock LLM (…/v1) instead of spawning one")
+    parser.add_argument("--llm-port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--token-latency", type=float, default=0.005)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--script", help="per-state overrides for the mock LLM")
+    args = parser.parse_args()
+
+    mock = None
+    if not args.llm_url and not args.base_url:
+        mock = _start_mock(args)
+        args.llm_url = f"http://127.0.0.1:{args.llm_port}/v1"
+    if args.llm_url:
+        os.environ["OPENAI_BASE_URL"] = args.llm_url
+        os.environ.setdefault("OPENAI_API_KEY", "mock")
+        os.environ["OPENAI_DEFAULT_API"] = "chat_completions"
+        os.environ["OPENAI_AGENTS_DISABLE_TRACING"] = "1"
+
+    import logging
+    logging.disable(logging.INFO)
+    try:
+        asyncio.run(_remote(args) if args.base_url else _in_process(args))
+    finally:
+        if mock is not None:
+            mock.terminate()
+            mock.wait()
+
+
+if __name__ == "__main__":
+    main()
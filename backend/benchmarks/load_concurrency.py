@@ -0,0 +1,123 @@
+# backend/benchmarks/load_concurrency.py
+"""
+Concurrency ceiling of one worker for N simultaneous agent turns.
+
+The model call is replaced by a fixed sleep (`--latency`) so only the request
+path is measured:
+
+  before  sync endpoint → threadpool worker → new event loop per turn
+          (capped by the AnyIO threadpool FastAPI uses, 40 tokens by default)
+  after   async endpoint → `await ConversationRunner.run_step` on the server loop
+
+Admission control (app/agents/admission.py) is off by default so "after"
+shows the request path's own ceiling. With --admission the configured limits
+apply: at most LLM_MAX_CONCURRENCY runs are in flight and turns beyond
+LLM_QUEUE_SIZE waiting are rejected (429, or 503 after LLM_QUEUE_TIMEOUT);
+rejections are counted and reported, not raised.
+
+Usage (from backend/):
+    DATABASE_URL=sqlite:// python -m benchmarks.load_concurrency [-c 400] [--latency 0.5] [--admission]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from collections import Counter
+
+import anyio
+from agents import Runner
+
+import app.agents.runner as runner_module
+from app.agents.admission import AdmissionController, OverloadedError
+from app.agents.runner import ConversationRunner
+from app.fsm.vaccine_fsm import VaccineConversation
+from app.schemas import ConversationReply
+
+
+class _FakeResult:
+    def __init__(self, text: str):
+        self.final_output = ConversationReply(text=text)
+
+
+def _patch_runner(latency: float) -> None:
+    async def fake_run(cls, agent, messages, context=None, **kwargs):
+        await asyncio.sleep(latency)
+        return _FakeResult("ok")
+
+    Runner.run = classmethod(fake_run)
+
+
+def _disable_admission() -> None:
+    runner_module.ADMISSION = AdmissionController(0, {}, 0, 0)
+
+
+def _legacy_turn(runner: ConversationRunner, history: list[dict]) -> None:
+    # What run_step did before: a private loop per call, inside a worker thread.
+    conv = VaccineConversation(state="asked_name")
+    coro = runner.runner.run(None, history, context=conv, max_turns=50)
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+async def _before(concurrency: int) -> tuple[float, Counter]:
+    runner = ConversationRunner(repo=None)
+    history = [{"role": "user", "content": "Jane Doe"}]
+    start = time.perf_counter()
+    async with anyio.create_task_group() as tg:
+        for _ in range(concurrency):
+            tg.start_soon(anyio.to_thread.run_sync, _legacy_turn, runner, history)
+    return time.perf_counter() - start, Counter()
+
+
+async def _after(concurrency: int) -> tuple[float, Counter]:
+    runner = ConversationRunner(repo=None)
+    history = [{"role": "user", "content": "Jane Doe"}]
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(
+            runner.run_step(VaccineConversation(state="asked_name"), "Jane Doe", history)
+            for _ in range(concurrency)
+        ),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - start
+    rejected = Counter()
+    for result in results:
+        if isinstance(result, OverloadedError):
+            rejected[result.status_code] += 1
+        elif isinstance(result, BaseException):
+            raise result
+    return elapsed, rejected
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-c", "--concurrency", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.5, help="simulated LLM seconds")
+    parser.add_argument(
+        "--admission", action="store_true", help="keep the configured admission control (LLM_*)"
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    _patch_runner(args.latency)
+    if not args.admission:
+        _disable_admission()
+
+    for label, case in (("before (threadpool)", _before), ("after  (async)     ", _after)):
+        elapsed, rejected = asyncio.run(case(args.concurrency))
+        done = args.concurrency - sum(rejected.values())
+        in_flight = done * args.latency / elapsed
+        print(
+            f"{label}  {done} turns in {elapsed:6.2f}s  "
+            f"→ {done / elapsed:7.1f} turns/s, ~{in_flight:5.0f} in flight"
+            + "".join(f", {n} rejected ({code})" for code, n in sorted(rejected.items()))
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# backend/benchmarks/mock_llm.py
+"""
+Local stand-in for the OpenAI Chat Completions API, for load tests.
+
+The FSM state of each request is recognised from the tools the agent offers
+(each state has its own set, see TOOLS_MAP), and the reply is scripted per
+state:
+
+  * no tool output yet   → the state's scripted tool call
+  * after a tool output  → a ConversationReply JSON ({"text": ...})
+
+Latency is simulated as time-to-first-token (`--latency` ± `--jitter`) plus
+`--token-latency` per streamed chunk; both `stream=true` and plain responses
+are supported. Per-state overrides come from a JSON file (`--script`):
+
+    {"got_name": {"tool": "provide_age", "arguments": {"age": 30}, "latency": 0.8}}
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8100/v1 and
+OPENAI_DEFAULT_API=chat_completions.
+
+Usage (from backend/):
+    DATABASE_URL=sqlite:// python -m benchmarks.mock_llm [--port 8100] [--latency 0.3] [--token-latency 0.01]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import Counter
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.agents.factory import TOOLS_MAP
+from app.agents.history import estimate_tokens
+
+# state → tool call the "model" makes on the user's first message in that state
+DEFAULT_SCRIPT: dict[str, dict] = {
+    "start":                     {"tool": "ask_intent", "arguments": {}},
+    "awaiting_intent":           {"tool": "affirm_intent", "arguments": {}},
+    "asked_name":                {"tool": "provide_name", "arguments": {"name": "Jane Doe"}},
+    "got_name":                  {"tool": "provide_age", "arguments": {"age": 42}},
+    "got_age":                   {"tool": "ask_allergy", "arguments": {}},
+    "awaiting_allergy_response": {"tool": "answer_allergy", "arguments": {"allergy": "no"}},
+    "eligible":                  {"tool": "select_slot", "arguments": {"choice": 1}},
+    "offered_slots":             {"tool": "select_slot", "arguments": {"choice": 2}},
+    "awaiting_selection":        {"tool": "confirm_selection", "arguments": {}},
+    "confirming":                {"tool": "finish_booking", "arguments": {"yes": True}},
+    "ineligible":                {"tool": "early_cancel", "arguments": {}},
+    "fallback":                  {"tool": "restart_after_fallback", "arguments": {}},
+}
+
+DEFAULT_REPLY = "Hello! Would you like to schedule a vaccination appointment?"
+
+_STATE_BY_TOOLS = {
+    frozenset(t.name for t in tools): state for state, tools in TOOLS_MAP.items() if tools
+}
+
+
+def detect_state(body: dict) -> str:
+    tools = frozenset(
+        t.get("function", {}).get("name") for t in body.get("tools") or ()
+    )
+    return _STATE_BY_TOOLS.get(tools, "unknown")
+
+
+def _chunks(text: str, size: int = 4):
+    for i in range(0, len(text), size):
+        yield text[i:i + size]
+
+
+class MockLLM:
+    def __init__(self, latency: float, token_latency: float, jitter: float, script: dict):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.jitter = jitter
+        self.script = {**DEFAULT_SCRIPT, **script}
+        self.requests: Counter[str] = Counter()
+
+    def _delay(self, state: str) -> float:
+        base = self.script.get(state, {}).get("latency", self.latency)
+        return max(base + random.uniform(-self.jitter, self.jitter), 0.0)
+
+    def plan(self, body: dict) -> tuple[str, dict | None, str | None]:
+        """(state, tool call or None, reply text or None) for one request."""
+        messages = body.get("messages", [])
+        state = detect_state(body)
+        self.requests[state] += 1
+        step = self.script.get(state)
+        if step is None or (messages and messages[-1].get("role") == "tool"):
+            reply = (step or {}).get("reply", DEFAULT_REPLY)
+            return state, None, json.dumps({"text": reply})
+        call = {
+            "id": f"call_{uuid.uuid4().hex[:24]}",
+            "type": "function",
+            "function": {"name": step["tool"], "arguments": json.dumps(step.get("arguments", {}))},
+        }
+        return state, call, None
+
+    @staticmethod
+    def _usage(messages: list[dict], completion: str) -> dict:
+        prompt = sum(estimate_tokens(json.dumps(m)) for m in messages)
+        done = estimate_tokens(completion)
+        return {"prompt_tokens": prompt, "completion_tokens": done, "total_tokens": prompt + done}
+
+    async def complete(self, body: dict) -> dict:
+        messages = body.get("messages", [])
+        state, call, text = self.plan(body)
+        completion = text or call["function"]["arguments"]
+        await asyncio.sleep(self._delay(state) + self.token_latency * len(list(_chunks(completion))))
+        message = {"role": "assistant", "content": text}
+        if call:
+            message["tool_calls"] = [call]
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if call else "stop",
+            }],
+            "usage": self._usage(messages, completion),
+        }
+
+    async def stream(self, body: dict):
+        messages = body.get("messages", [])
+        state, call, text = self.plan(body)
+        base = {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+        }
+
+        def frame(delta: dict, finish: str | None = None, usage: dict | None = None) -> str:
+            chunk = {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+            if usage is not None:
+                chunk = {**base, "choices": [], "usage": usage}
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        await asyncio.sleep(self._delay(state))
+        yield frame({"role": "assistant", "content": "" if text else None})
+        if call:
+            completion = call["function"]["arguments"]
+            yield frame({"tool_calls": [{
+                "index": 0, "id": call["id"], "type": "function",
+                "function": {"name": call["function"]["name"], "arguments": ""},
+            }]})
+            for piece in _chunks(completion):
+                await asyncio.sleep(self.token_latency)
+                yield frame({"tool_calls": [{"index": 0, "function": {"arguments": piece}}]})
+            yield frame({}, "tool_calls")
+        else:
+            completion = text
+            for piece in _chunks(completion):
+                await asyncio.sleep(self.token_latency)
+                yield frame({"content": piece})
+            yield frame({}, "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield frame({}, usage=self._usage(messages, completion))
+        yield "data: [DONE]\n\n"
+
+
+def create_app(mock: MockLLM) -> FastAPI:
+    app = FastAPI(title="mock-llm")
+
+    @app.get("/health")
+    async def health():
+        return {"ok": True}
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": dict(mock.requests)}
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "mock", "object": "model"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if body.get("stream"):
+            return StreamingResponse(mock.stream(body), media_type="text/event-stream")
+        return JSONResponse(await mock.complete(body))
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds to first token")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="seconds per streamed chunk")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--script", help="JSON file with per-state overrides")
+    args = parser.parse_args()
+
+    script = {}
+    if args.script:
+        with open(args.script, encoding="utf-8") as fh:
+            script = json.load(fh)
+
+    import uvicorn
+    mock = MockLLM(args.latency, args.token_latency, args.jitter, script)
+    uvicorn.run(create_app(mock), host=args.host, port=args.port, log_level="warning", backlog=4096)
+
+
+if __name__ == "__main__":
+    main()
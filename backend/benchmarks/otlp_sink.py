@@ -0,0 +1,129 @@
+# backend/benchmarks/otlp_sink.py
+"""
+Local stand-in for an OpenTelemetry collector (OTLP/HTTP, protobuf).
+
+Accepts POST /v1/traces from the app (TRACING_EXPORTER=otlp), prints one
+indented line per span grouped by trace, and keeps per-span-name counts and
+average durations on GET /stats. With --out every span is also appended to
+a JSON-lines file.
+
+Usage (from backend/):
+    python -m benchmarks.otlp_sink [--port 4318] [--out spans.jsonl] [--quiet]
+    TRACING_EXPORTER=otlp OTEL_EXPORTER_OTLP_ENDPOINT=http://127.0.0.1:4318 uvicorn app.main:app
+"""
+
+import argparse
+import gzip
+import json
+from collections import defaultdict
+
+from fastapi import FastAPI, Request, Response
+from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import (
+    ExportTraceServiceRequest,
+    ExportTraceServiceResponse,
+)
+
+
+def _value(any_value):
+    kind = any_value.WhichOneof("value")
+    return getattr(any_value, kind) if kind else None
+
+
+def decode(body: bytes) -> list[dict]:
+    """Flatten an ExportTraceServiceRequest into plain span dicts."""
+    request = ExportTraceServiceRequest()
+    request.ParseFromString(body)
+    spans = []
+    for resource_spans in request.resource_spans:
+        for scope_spans in resource_spans.scope_spans:
+            for s in scope_spans.spans:
+                spans.append({
+                    "trace_id": s.trace_id.hex(),
+                    "span_id": s.span_id.hex(),
+                    "parent_id": s.parent_span_id.hex() or None,
+                    "name": s.name,
+                    "start_ns": s.start_time_unix_nano,
+                    "duration_ms": (s.end_time_unix_nano - s.start_time_unix_nano) / 1e6,
+                    "attributes": {a.key: _value(a.value) for a in s.attributes},
+                    "error": s.status.code == s.status.STATUS_CODE_ERROR,
+                })
+    return spans
+
+
+def _print_trees(spans: list[dict]) -> None:
+    by_parent = defaultdict(list)
+    ids = {s["span_id"] for s in spans}
+    for s in sorted(spans, key=lambda s: s["start_ns"]):
+        by_parent[s["parent_id"] if s["parent_id"] in ids else None].append(s)
+
+    def show(s, depth):
+        attrs = " ".join(f"{k}={v}" for k, v in s["attributes"].items())
+        flag = " ERROR" if s["error"] else ""
+        print(f"{'  ' * depth}{s['name']:<{40 - 2 * depth}} {s['duration_ms']:>9.2f}ms  {attrs}{flag}")
+        for child in by_parent.get(s["span_id"], ()):
+            show(child, depth + 1)
+
+    for root in by_parent[None]:
+        show(root, 0)
+
+
+class SpanSink:
+    def __init__(self, out: str | None, quiet: bool):
+        self.out = open(out, "a", encoding="utf-8") if out else None
+        self.quiet = quiet
+        self.count: dict[str, int] = defaultdict(int)
+        self.total_ms: dict[str, float] = defaultdict(float)
+
+    def add(self, spans: list[dict]) -> None:
+        for s in spans:
+            self.count[s["name"]] += 1
+            self.total_ms[s["name"]] += s["duration_ms"]
+            if self.out:
+                self.out.write(json.dumps(s) + "\n")
+        if self.out:
+            self.out.flush()
+        if not self.quiet:
+            _print_trees(spans)
+
+    def stats(self) -> dict:
+        return {
+            name: {"count": n, "avg_ms": round(self.total_ms[name] / n, 3)}
+            for name, n in sorted(self.count.items())
+        }
+
+
+def create_app(sink: SpanSink) -> FastAPI:
+    app = FastAPI(title="otlp-sink")
+
+    @app.post("/v1/traces")
+    async def traces(request: Request):
+        body = await request.body()
+        if request.headers.get("content-encoding") == "gzip":
+            body = gzip.decompress(body)
+        sink.add(decode(body))
+        return Response(
+            ExportTraceServiceResponse().SerializeToString(),
+            media_type="application/x-protobuf",
+        )
+
+    @app.get("/stats")
+    async def stats():
+        return sink.stats()
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--out", help="append every span to this JSON-lines file")
+    parser.add_argument("--quiet", action="store_true", help="do not print span trees")
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(SpanSink(args.out, args.quiet)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
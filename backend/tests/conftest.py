@@ -0,0 +1,68 @@
+# backend/tests/conftest.py
+"""
+Backend tests. They run against the migrated Postgres database in
+DATABASE_URL (alembic upgrade head) and are skipped without one; use a
+database of its own, the job tests clear unfinished jobs. The model is never
+called (the agent_run fixture stands in for agents.Runner.run).
+
+    pip install -r requirements-dev.txt && pytest
+"""
+
+import asyncio
+import os
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("OPENAI_AGENTS_DISABLE_TRACING", "1")
+# Unreachable: a run that is not stubbed gets the degraded template reply.
+os.environ.setdefault("OPENAI_BASE_URL", "http://127.0.0.1:9/v1")
+
+POSTGRES = os.getenv("DATABASE_URL", "").startswith(("postgresql", "postgres://"))
+
+# The app builds its engine at import time; without a database there is nothing to collect.
+collect_ignore_glob = [] if POSTGRES else ["test_*.py"]
+
+
+def pytest_report_header(config):
+    if not POSTGRES:
+        return "DATABASE_URL is not a Postgres URL: backend tests skipped"
+
+
+def run(coro):
+    """asyncio.run, then drop the async engine's connections (they belong to this loop)."""
+    from app.database import get_async_sessionmaker
+
+    async def main():
+        try:
+            return await coro
+        finally:
+            await get_async_sessionmaker().kw["bind"].dispose()
+
+    return asyncio.run(main())
+
+
+class AgentRun:
+    """Stand-in for Runner.run: answers `reply`, calling `during()` first if set."""
+
+    def __init__(self):
+        self.reply = "ok"
+        self.during = None
+        self.calls = 0
+
+    async def __call__(self, cls, agent, messages, context=None, **kwargs):
+        from app.schemas import ConversationReply
+
+        self.calls += 1
+        if self.during is not None:
+            await self.during()
+        return type("Result", (), {"final_output": ConversationReply(text=self.reply)})()
+
+
+@pytest.fixture
+def agent_run(monkeypatch):
+    from agents import Runner
+
+    fake = AgentRun()
+    monkeypatch.setattr(Runner, "run", classmethod(fake))
+    return fake
@@ -0,0 +1,27 @@
+# backend/tests/test_chat_socket.py
+"""The per-chat WebSocket (GET /chats/{id}/ws)."""
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def test_socket_only_accepts_user_messages():
+    # Streamed runs are not stubbed: the turn ends with the degraded template reply.
+    with TestClient(app) as client:
+        chat_id = client.post("/chats/").json()["id"]
+        with client.websocket_connect(f"/chats/{chat_id}/ws") as ws:
+            assert ws.receive_json()["type"] == "state"
+            ws.send_json({"role": "assistant", "content": "You are booked for Monday."})
+            assert ws.receive_json() == {
+                "type": "error", "detail": "Only messages with role 'user' can be sent",
+            }
+            ws.send_json({"role": "user", "content": "Hi there"})
+            events = [ws.receive_json()]
+            while events[-1]["type"] != "message":
+                events.append(ws.receive_json())
+        history = client.get(f"/chats/{chat_id}/messages").json()
+
+    reply = events[-1]["message"]
+    assert reply["role"] == "assistant"
+    assert [(m["role"], m["content"]) for m in history] == [("user", "Hi there"), ("assistant", reply["content"])]
@@ -0,0 +1,30 @@
+# backend/tests/test_response_cache.py
+"""What the response cache (app.agents.cache) may store and replay."""
+
+import json
+
+from app.agents.cache import ResponseCache, cache_key, is_cacheable
+from app.fsm.vaccine_fsm import VaccineConversation
+
+
+def _calls(tool, **arguments):
+    return ((tool, json.dumps(arguments)),)
+
+
+def test_text_arguments_are_never_cached():
+    # "Ana" and "ana" share a key; replaying one's name for the other is wrong.
+    conv = VaccineConversation(state="asked_name")
+    assert cache_key(conv, "Ana") == cache_key(conv, "ana")
+    assert not is_cacheable("asked_name", {}, "Thanks! How old are you?", _calls("provide_name", name="Ana"))
+
+
+def test_number_arguments_replay():
+    calls = _calls("provide_age", age=36)
+    assert is_cacheable("got_name", {"name": "Jane Doe"}, "Do you have an egg allergy?", calls)
+
+    cache = ResponseCache()
+    key = cache_key(VaccineConversation({"name": "Jane Doe"}, state="got_name"), "I'm 36")
+    cache.store(key, calls, "Do you have an egg allergy?", "awaiting_allergy_response")
+    conv = VaccineConversation({"name": "John Roe"}, state="got_name")
+    assert cache.lookup(key, conv) == "Do you have an egg allergy?"
+    assert (conv.state, conv.payload["age"], conv.payload["name"]) == ("awaiting_allergy_response", 36, "John Roe")
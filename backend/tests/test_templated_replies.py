@@ -0,0 +1,38 @@
+# backend/tests/test_templated_replies.py
+"""Templated replies that end an agent run after a tool call (app.agents.factory)."""
+
+from agents import FunctionToolResult, RunContextWrapper
+
+from app.agents.factory import templated_tool_reply
+from app.agents.tools import provide_age, provide_name
+from app.fsm.vaccine_fsm import VaccineConversation
+
+
+def _results(conv, *calls):
+    """Run each (tool, FSM trigger, arguments) on `conv` as the tool would."""
+    results = []
+    for tool, trigger, arguments in calls:
+        getattr(conv, trigger)(**arguments)
+        results.append(FunctionToolResult(tool=tool, output=conv.payload, run_item=None))
+    return results
+
+
+def test_single_tool_call_ends_the_run_with_its_template():
+    conv = VaccineConversation(state="asked_name")
+    results = _results(conv, (provide_name, "provide_name", {"name": "Jane Doe"}))
+    outcome = templated_tool_reply(RunContextWrapper(context=conv), results)
+    assert outcome.is_final_output
+    assert outcome.final_output.text
+
+
+def test_several_tool_calls_are_answered_by_the_model():
+    conv = VaccineConversation(state="asked_name")
+    results = _results(
+        conv,
+        (provide_name, "provide_name", {"name": "Jane Doe"}),
+        (provide_age, "provide_age", {"age": 36}),
+    )
+    outcome = templated_tool_reply(RunContextWrapper(context=conv), results)
+    assert not outcome.is_final_output
+    # The FSM keeps both updates for the model's reply.
+    assert (conv.payload["name"], conv.payload["age"]) == ("Jane Doe", 36)
@@ -0,0 +1,74 @@
+# backend/tests/test_turn_connections.py
+"""A turn must not hold a pooled connection while the agent runs."""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.database import SessionLocal, engine, get_async_sessionmaker
+from app.repositories.base import ConcurrentTurnError, PendingMessage
+from app.repositories.sql import SQLMessageRepository
+from app.repositories.sql_async import AsyncSQLMessageRepository
+from app.repositories.threaded import ThreadedMessageRepository
+from app.services.chat_service import ChatService
+from conftest import run
+
+
+def _open(backend):
+    """(repository, the engine whose pool it draws from, close)"""
+    if backend == "sql_async":
+        db = get_async_sessionmaker()()
+        return AsyncSQLMessageRepository(db), db.bind.sync_engine, db.close
+    db = SessionLocal()
+
+    async def close():
+        db.close()
+
+    return ThreadedMessageRepository(SQLMessageRepository(db)), engine, close
+
+
+@pytest.mark.parametrize("backend", ["sql", "sql_async"])
+def test_no_connection_checked_out_during_agent_run(backend, agent_run):
+    checked_out = []
+
+    async def turns():
+        repo, engine, close = _open(backend)
+
+        async def during():
+            checked_out.append(engine.pool.checkedout())
+
+        agent_run.during = during
+        try:
+            chat = await repo.create_chat()
+            service = ChatService(repo)
+            for text in ("Hello there", "What can you do?", "Tell me more"):
+                await service.send_user_message(chat.id, text, idempotency_key=f"k-{text}")
+        finally:
+            await close()
+
+    run(turns())
+    assert checked_out == [0, 0, 0]
+
+
+@pytest.mark.parametrize("backend", ["sql", "sql_async"])
+def test_turn_conflict_detected_after_read_ends(backend, agent_run):
+    """Two workers' turns on one chat, both loaded before either commits: one loses."""
+    async def turns():
+        first, _, close_first = _open(backend)
+        second, _, close_second = _open(backend)
+        try:
+            chat = await first.create_chat()
+            await ChatService(first).send_user_message(chat.id, "Hello there")
+            agent_run.during = asyncio.Barrier(2).wait
+            return await asyncio.gather(
+                ChatService(first).run_turn(chat.id, [PendingMessage("user", "one", datetime.utcnow())]),
+                ChatService(second).run_turn(chat.id, [PendingMessage("user", "two", datetime.utcnow())]),
+                return_exceptions=True,
+            )
+        finally:
+            await close_first()
+            await close_second()
+
+    results = run(turns())
+    assert sum(isinstance(r, ConcurrentTurnError) for r in results) == 1
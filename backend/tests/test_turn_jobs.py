@@ -0,0 +1,185 @@
+# backend/tests/test_turn_jobs.py
+"""Queued turns (CHAT_TURN_MODE=queue): claiming, retries and the 202 + long-poll API."""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import httpx
+import pytest
+from sqlalchemy import delete, select, update
+
+import app.services.turn_jobs as turn_jobs
+from app.database import get_async_sessionmaker
+from app.dependencies import get_async_message_repository, get_job_repository
+from app.main import app
+from app.models import Chat as ChatModel, TurnJob as TurnJobModel
+from app.repositories.jobs import JobRepository
+from app.services.turn_jobs import TurnWorker
+from conftest import run
+
+
+def _worker() -> TurnWorker:
+    return TurnWorker(asynccontextmanager(get_async_message_repository))
+
+
+async def _new_chat() -> int:
+    async with get_async_sessionmaker()() as db:
+        chat = ChatModel()
+        db.add(chat)
+        await db.commit()
+        return chat.id
+
+
+async def _enqueue(chat_id: int, *contents: str) -> list[int]:
+    async with get_async_sessionmaker()() as db:
+        return [(await JobRepository(db).enqueue(chat_id, c)).id for c in contents]
+
+
+async def _jobs(job_ids: list[int]) -> list[TurnJobModel]:
+    async with get_async_sessionmaker()() as db:
+        rows = await db.scalars(
+            select(TurnJobModel).where(TurnJobModel.id.in_(job_ids)).order_by(TurnJobModel.id)
+        )
+        return list(rows)
+
+
+async def _make_due(job_ids: list[int]) -> None:
+    """Skip a retry's backoff."""
+    async with get_async_sessionmaker()() as db:
+        await db.execute(
+            update(TurnJobModel)
+            .where(TurnJobModel.id.in_(job_ids))
+            .values(run_after=TurnJobModel.created_at)
+        )
+        await db.commit()
+
+
+@pytest.fixture(autouse=True)
+def empty_queue():
+    """Claims take the oldest due chat, so jobs left in the test database would be claimed first."""
+    async def clear():
+        async with get_async_sessionmaker()() as db:
+            await db.execute(delete(TurnJobModel).where(TurnJobModel.status.in_(("queued", "running"))))
+            await db.commit()
+
+    run(clear())
+
+
+def test_competing_claims_take_a_chat_once():
+    async def race():
+        chat_id = await _new_chat()
+        job_ids = await _enqueue(chat_id, "one", "two", "three")
+        sessions = [get_async_sessionmaker()() for _ in range(2)]
+        try:
+            claims = await asyncio.gather(*(JobRepository(db).claim(60) for db in sessions))
+        finally:
+            for db in sessions:
+                await db.close()
+        return job_ids, claims
+
+    job_ids, claims = run(race())
+    taken = [c for c in claims if c is not None]
+    assert len(taken) == 1
+    assert sorted(j.id for j in taken[0].jobs) == job_ids
+    assert [m.content for m in taken[0].messages] == ["one", "two", "three"]
+
+
+def test_chat_with_a_running_turn_is_not_claimed(agent_run):
+    async def workers():
+        chat_id = await _new_chat()
+        first_ids = await _enqueue(chat_id, "first")
+        running, release = asyncio.Event(), asyncio.Event()
+
+        async def during():
+            running.set()
+            await release.wait()
+
+        agent_run.during = during
+        first = asyncio.create_task(_worker().step())
+        await running.wait()
+        later_ids = await _enqueue(chat_id, "second")
+        # Another worker skips the chat while its turn runs...
+        assert await _worker().step() is False
+        agent_run.during = None
+        release.set()
+        assert await first is True
+        # ...and answers the new job once it is done.
+        assert await _worker().step() is True
+        return await _jobs(first_ids + later_ids)
+
+    jobs = run(workers())
+    assert agent_run.calls == 2
+    assert [j.status for j in jobs] == ["done", "done"]
+    assert jobs[0].reply_id != jobs[1].reply_id
+
+
+def test_job_fails_after_max_attempts(agent_run, monkeypatch):
+    monkeypatch.setattr(turn_jobs, "JOB_MAX_ATTEMPTS", 2)
+
+    async def broken():
+        raise RuntimeError("model exploded")
+
+    agent_run.during = broken
+
+    async def attempts():
+        chat_id = await _new_chat()
+        job_ids = await _enqueue(chat_id, "hello")
+        seen = []
+        for _ in range(2):
+            assert await _worker().step() is True
+            seen.append(await _jobs(job_ids))
+            await _make_due(job_ids)
+        # Failed jobs are never claimed again.
+        assert await _worker().step() is False
+        return seen
+
+    (retried,), (failed,) = run(attempts())
+    assert (retried.status, retried.attempts) == ("queued", 1)
+    assert (failed.status, failed.attempts) == ("failed", 2)
+    assert "model exploded" in failed.error
+    assert failed.reply_id is None
+
+
+def test_post_answers_202_and_long_poll_returns_the_reply(agent_run):
+    async def get_jobs():
+        async with get_async_sessionmaker()() as db:
+            yield JobRepository(db)
+
+    app.dependency_overrides[get_job_repository] = get_jobs
+
+    async def conversation():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            chat_id = (await client.post("/chats/")).json()["id"]
+            posted = await client.post(
+                f"/chats/{chat_id}/messages", json={"role": "user", "content": "hello"},
+                headers={"Idempotency-Key": "k1"},
+            )
+            poll = asyncio.create_task(client.get(posted.headers["Location"], params={"wait": 10}))
+            await asyncio.sleep(0.2)
+            assert not poll.done()
+            assert await _worker().step() is True
+            done = await poll
+            retried = await client.post(
+                f"/chats/{chat_id}/messages", json={"role": "user", "content": "hello"},
+                headers={"Idempotency-Key": "k1"},
+            )
+            missing = await client.get(f"/chats/{chat_id}/jobs/0")
+            return posted, done, retried, missing
+
+    agent_run.reply = "Hi from the worker"
+    try:
+        posted, done, retried, missing = run(conversation())
+    finally:
+        app.dependency_overrides.pop(get_job_repository)
+
+    assert posted.status_code == 202
+    assert posted.json()["status"] == "queued"
+    assert done.status_code == 200
+    assert done.json()["status"] == "done"
+    assert done.json()["reply"]["content"] == "Hi from the worker"
+    # A retried POST returns the same, finished job.
+    assert retried.status_code == 202
+    assert retried.json()["id"] == posted.json()["id"]
+    assert retried.json()["reply"]["id"] == done.json()["reply"]["id"]
+    assert missing.status_code == 404
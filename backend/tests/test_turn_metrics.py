@@ -0,0 +1,58 @@
+# backend/tests/test_turn_metrics.py
+"""Turn path and FSM transition counters only count turns that were saved."""
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.fsm.vaccine_fsm import VaccineConversation
+from app.repositories.base import ConcurrentTurnError
+from app.services.chat_service import ChatService
+from conftest import run
+from test_turn_connections import _open
+
+
+def _counts(state: str) -> tuple:
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0.0
+
+    return (
+        sample("chat_turn_path_total", state=state, path="fastpath"),
+        sample("fsm_transitions_total", state=state, trigger="affirm_intent", dest="asked_name"),
+    )
+
+
+def test_rolled_back_steps_are_not_counted():
+    conv = VaccineConversation(state="awaiting_intent")
+    before = _counts("awaiting_intent")
+    checkpoint = conv.checkpoint()
+    assert conv.affirm_intent()
+    conv.rollback(checkpoint)
+    conv.count_turn()
+    assert conv.state == "awaiting_intent"
+    assert _counts("awaiting_intent") == before
+
+
+@pytest.mark.parametrize("saved", [True, False], ids=["saved", "conflict"])
+def test_fast_path_turn_counted_once_saved(saved, agent_run):
+    async def turn():
+        repo, _, close = _open("sql_async")
+        try:
+            chat = await repo.create_chat()
+            await repo.save_conversation_state(chat.id, "awaiting_intent", {})
+            if not saved:
+                async def conflict(*args, **kwargs):
+                    raise ConcurrentTurnError("another worker saved first")
+                repo.commit_turn = conflict
+            before = _counts("awaiting_intent")
+            try:
+                await ChatService(repo).send_user_message(chat.id, "yes")
+            except ConcurrentTurnError:
+                pass
+            return before, _counts("awaiting_intent")
+        finally:
+            await close()
+
+    before, after = run(turn())
+    assert agent_run.calls == 0
+    expected = 1 if saved else 0
+    assert after == (before[0] + expected, before[1] + expected)
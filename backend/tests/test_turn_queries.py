@@ -0,0 +1,78 @@
+# backend/tests/test_turn_queries.py
+"""
+Database round trips of one ChatService.send_user_message turn (model stubbed out).
+
+A turn is two short transactions, so the connection goes back to the pool
+while the agent runs: BEGIN, chat+state, history, COMMIT, then BEGIN,
+messages (one batched INSERT), state, COMMIT. With CHAT_EVENTS_NOTIFY the
+write transaction also runs pg_notify.
+"""
+
+import pytest
+from sqlalchemy import event
+
+import app.repositories.sql as sql_repository
+import app.repositories.sql_async as sql_async_repository
+from app.services.chat_service import ChatService
+from conftest import run
+from test_turn_connections import _open
+
+TURN_READ_ROUND_TRIPS = 4
+TURN_WRITE_ROUND_TRIPS = 4
+NOTIFY_ROUND_TRIPS = 1
+
+
+class _RoundTrips:
+    """Statements sent plus transaction BEGIN/COMMIT/ROLLBACK on one engine."""
+
+    EVENTS = ("before_cursor_execute", "begin", "commit", "rollback")
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.sent: list[str] = []
+
+    def _statement(self, conn, cursor, statement, *args):
+        self.sent.append("NOTIFY" if "pg_notify" in statement else statement.split(None, 1)[0].upper())
+
+    def _transaction(self, name):
+        return lambda conn: self.sent.append(name.upper())
+
+    def __enter__(self):
+        self.listeners = [
+            (name, self._statement if name == "before_cursor_execute" else self._transaction(name))
+            for name in self.EVENTS
+        ]
+        for name, fn in self.listeners:
+            event.listen(self.engine, name, fn)
+        return self
+
+    def __exit__(self, *exc):
+        for name, fn in self.listeners:
+            event.remove(self.engine, name, fn)
+
+
+@pytest.mark.parametrize("notify", [False, True], ids=["local", "notify"])
+@pytest.mark.parametrize("backend", ["sql", "sql_async"])
+def test_turn_round_trip_budget(backend, notify, agent_run, monkeypatch):
+    monkeypatch.setattr(sql_repository, "CHAT_EVENTS_NOTIFY", notify)
+    monkeypatch.setattr(sql_async_repository, "CHAT_EVENTS_NOTIFY", notify)
+    budget = TURN_READ_ROUND_TRIPS + TURN_WRITE_ROUND_TRIPS + (NOTIFY_ROUND_TRIPS if notify else 0)
+    per_turn = []
+
+    async def turns():
+        repo, engine, close = _open(backend)
+        try:
+            chat = await repo.create_chat()
+            service = ChatService(repo)
+            # The first turn inserts the state row, later ones update it.
+            for i in range(3):
+                with _RoundTrips(engine) as trips:
+                    await service.send_user_message(chat.id, f"message {i}")
+                per_turn.append(trips.sent)
+        finally:
+            await close()
+
+    run(turns())
+    for i, sent in enumerate(per_turn):
+        assert len(sent) <= budget, f"turn {i + 1}: {len(sent)} round trips > {budget}: {sent}"
+        assert sent.count("NOTIFY") == (1 if notify else 0), sent